@@ -0,0 +1,94 @@
+# clock.py
+"""
+Zeitquellen für die Update-Schleife: Systemzeit auf dem PI, virtuelle Zeit in der Simulation,
+beschleunigte Wanduhr beim Nachspielen einer Fahrt.
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+
+class SystemClock:
+    """
+    Wanduhr: datetime.now(), time.monotonic() und echtes time.sleep().
+    """
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+
+class ScaledClock:
+    """
+    Wanduhr, die `factor`-mal so schnell läuft: sleep(s) wartet s / factor Sekunden, monotonic() und now()
+    laufen entsprechend schneller. Für das beschleunigte Nachspielen einer Fahrt in Echtzeit-Verhältnissen.
+    """
+
+    def __init__(self, factor: float) -> None:
+        """
+        :param factor: Zeitraffer, z. B. 10 für zehnfache Geschwindigkeit
+        """
+        if factor <= 0:
+            raise ValueError("factor muss positiv sein")
+        self.factor = factor
+        self._start_monotonic = time.monotonic()
+        self._start = datetime.now()
+
+    def now(self) -> datetime:
+        return self._start + timedelta(seconds=self.monotonic())
+
+    def monotonic(self) -> float:
+        return (time.monotonic() - self._start_monotonic) * self.factor
+
+    def time(self) -> float:
+        return self.now().timestamp()
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds / self.factor)
+
+
+class VirtualClock:
+    """
+    Virtuelle Uhr mit derselben Schnittstelle wie SystemClock. sleep() wartet nicht, sondern stellt die
+    Uhr vor und ruft dabei die registrierten Listener mit (Zeitpunkt vor dem Schritt, Schrittweite in
+    Sekunden) auf, z. B. um einen simulierten Radfahrer weiterzubewegen.
+    """
+
+    def __init__(self, start: datetime = datetime(2025, 1, 1, 8, 0, 0)) -> None:
+        """
+        :param start: Startzeitpunkt, fest für reproduzierbare Läufe
+        """
+        self._start = start
+        self._elapsed_ms = 0
+        self._listeners: List[Callable[[datetime, float], None]] = []
+
+    def add_listener(self, listener: Callable[[datetime, float], None]) -> None:
+        self._listeners.append(listener)
+
+    def now(self) -> datetime:
+        return self._start + timedelta(milliseconds=self._elapsed_ms)
+
+    def monotonic(self) -> float:
+        return self._elapsed_ms / 1000
+
+    def time(self) -> float:
+        return self.now().timestamp()
+
+    def sleep(self, seconds: float) -> None:
+        step_ms = round(seconds * 1000)
+        if step_ms <= 0:
+            return
+        before = self.now()
+        for listener in self._listeners:
+            listener(before, step_ms / 1000)
+        self._elapsed_ms += step_ms
@@ -1,10 +1,10 @@
-from typing import Tuple
+from typing import Optional, Tuple
 
-import RPi.GPIO as GPIO
 import gpsd
-from RPLCD import CharLCD
 
 import Speedometer
+from GpsReader import GpsFix, GpsReader
+from LcdDisplay import LcdDisplay, RplcdBackend
 
 
 class Cyclist:
@@ -24,18 +24,46 @@ class Cyclist:
         self.min_speed: float = min_speed
         self.max_speed: float = max_speed
         self.speedotmeter = speedometer
-        self.lcd = CharLCD(numbering_mode=GPIO.BOARD, cols=16, rows=2, pin_rs=37, pin_e=35, pins_data=[33, 31, 29, 23])
+        self.display = LcdDisplay(RplcdBackend(cols=16, rows=2, pin_rs=37, pin_e=35, pins_data=(33, 31, 29, 23)))
         gpsd.connect()
+        self.gps = GpsReader(self._poll_gpsd).start()
+
+    @staticmethod
+    def _poll_gpsd() -> Optional[Tuple[float, float, float]]:
+        packet = gpsd.get_current()
+        if packet.mode < 2:
+            # noch kein 2D-Fix
+            return None
+        return packet.lat, packet.lon, packet.hspeed
+
+    def get_fix(self) -> GpsFix:
+        """
+        Neuester GPS-Fix aus dem Hintergrund-Thread (ohne Socket-Zugriff), die Geschwindigkeit mit dem
+        Radsensor fusioniert.
+        """
+        fix = self.gps.latest()
+        return fix._replace(speed=self.speedotmeter.fuse(fix.speed * 3.6, not fix.stale) / 3.6)
 
     def get_current_position(self) -> Tuple[float, float]:
-        return (gpsd.get_current().lat, gpsd.get_current().lon)
+        return self.get_fix().position
 
     def get_current_speed(self) -> float:
-        return gpsd.get_current().hspeed * 3.6
-
-    def set_advicde_speed(self, adviced_speed, distance):
-        self.lcd.clear()
-        self.lcd.cursor_pos = (0, 0)
-        self.lcd.write_string(f"{self.get_current_speed():.2f}")
-        self.lcd.cursor_pos = (1, 0)
-        self.lcd.write_string(f"{adviced_speed:.2f} {distance:.2f}")
+        return self.get_fix().speed * 3.6
+
+    def get_wheel_speed(self) -> float:
+        """
+        Geschwindigkeit allein aus dem Radsensor in km/h (für das Fahrtprotokoll).
+        """
+        return self.speedotmeter.read_speed()
+
+    def set_advicde_speed(self, adviced_speed, distance, current_speed: Optional[float] = None):
+        """
+        :param current_speed: Geschwindigkeit in km/h aus dem Fix des Ticks; ohne Angabe ein neuer Fix
+        """
+        if current_speed is None:
+            current_speed = self.get_current_speed()
+        # kehrt sofort zurück, der Render-Thread schreibt nur die geänderten Zeichen
+        self.display.show(
+            f"{current_speed:.2f}",
+            f"{adviced_speed:.2f} {distance:.2f}"
+        )
@@ -0,0 +1,100 @@
+# gps_reader.py
+"""
+Liest GPS-Fixes in einem Hintergrund-Thread und hält den neuesten als unveränderlichen Schnappschuss.
+"""
+
+import threading
+import time
+from typing import Callable, NamedTuple, Optional, Tuple
+
+
+class GpsFix(NamedTuple):
+    lat: float
+    lon: float
+    speed: float        # m/s
+    timestamp: float    # monotone Zeit des Empfangs in Sekunden
+    stale: bool         # älter als max_age bzw. noch kein Fix
+
+    @property
+    def position(self) -> Tuple[float, float]:
+        return (self.lat, self.lon)
+
+
+NO_FIX = GpsFix(0.0, 0.0, 0.0, 0.0, True)
+
+
+class GpsReader:
+    """
+    Fragt `poll` im Abstand von `interval` Sekunden ab und ersetzt den gespeicherten Fix jeweils als
+    Ganzes. Leser bekommen mit latest() ohne Socket-Zugriff immer Position und Geschwindigkeit aus
+    demselben Fix. Die GPS-Quelle (z. B. gpsd) wird nur über `poll` angebunden.
+    """
+
+    def __init__(
+        self,
+        poll: Callable[[], Optional[Tuple[float, float, float]]],
+        interval: float = 0.2,
+        max_age: float = 2.0,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        :param poll: liefert (lat, lon, Geschwindigkeit in m/s) oder None ohne gültigen Fix
+        :param interval: Abstand der Abfragen in Sekunden
+        :param max_age: ab diesem Alter in Sekunden gilt ein Fix als veraltet
+        :param clock: monotone Zeitquelle
+        """
+        self._poll = poll
+        self.interval = interval
+        self.max_age = max_age
+        self._clock = clock
+        self._fix: GpsFix = NO_FIX
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Metriken
+        self.fixes = 0
+        self.errors = 0
+        self.last_error: Optional[Exception] = None
+
+    def start(self) -> "GpsReader":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="gps-reader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2 + 1.0)
+            self._thread = None
+
+    def poll_once(self) -> None:
+        """
+        Eine Abfrage der Quelle; wird vom Thread aufgerufen, kann ohne Thread auch direkt genutzt werden.
+        """
+        try:
+            sample = self._poll()
+        except Exception as e:
+            self.errors += 1
+            self.last_error = e
+            return
+        if sample is None:
+            return
+        lat, lon, speed = sample
+        # Referenz wird als Ganzes ersetzt, Leser sehen nie einen halb geschriebenen Fix
+        self._fix = GpsFix(float(lat), float(lon), float(speed), self._clock(), False)
+        self.fixes += 1
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.poll_once()
+            self._stop.wait(self.interval)
+
+    def latest(self) -> GpsFix:
+        """
+        Neuester Fix, `stale` ist gesetzt, wenn er älter als max_age ist.
+        """
+        fix = self._fix
+        if not fix.stale and self._clock() - fix.timestamp > self.max_age:
+            return fix._replace(stale=True)
+        return fix
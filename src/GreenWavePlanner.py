@@ -0,0 +1,187 @@
+# green_wave_planner.py
+"""
+Plant ein Geschwindigkeitsprofil über die nächsten K Ampeln (grüne Welle) per Intervallpropagation.
+"""
+
+import math
+from datetime import timedelta
+from typing import List, NamedTuple, Optional, Sequence
+
+from TrafficLight import TrafficLight
+
+_MS = timedelta(milliseconds=1)
+
+
+class PlannedPass(NamedTuple):
+    light: TrafficLight
+    arrival: float       # Sekunden ab jetzt
+    departure: float     # Sekunden ab jetzt, > arrival nur bei Halt an Rot
+    speed: float         # Geschwindigkeit auf dem Abschnitt bis zu dieser Ampel (m/s)
+    green: bool          # Ampel wird bei Grün passiert
+    window_start: float  # Beginn des genutzten Grünfensters (Sekunden ab jetzt)
+
+
+class _State(NamedTuple):
+    lo: float            # früheste Abfahrt an der Ampel
+    hi: float            # späteste Abfahrt an der Ampel
+    greens: int          # bisher bei Grün passierte Ampeln
+    parent: Optional["_State"]
+    green: bool
+    window_start: float
+
+
+class GreenWavePlanner:
+    """
+    Propagiert je Ampel die Menge der erreichbaren Passierzeiten als Intervalle: aus einem Intervall
+    [lo, hi] an Ampel i wird mit dem Geschwindigkeitsband [min_speed, max_speed] das Ankunftsintervall an
+    Ampel i+1, das mit deren Grünfenstern geschnitten wird. Zusätzlich gibt es je Ampel den Zustand
+    "Halt an Rot, Abfahrt beim nächsten Grünstart". Gewählt wird der Zustand mit den meisten grün
+    passierten Ampeln; die Passierzeiten werden rückwärts möglichst nahe an preferred_speed gelegt.
+
+    Aufwand je Aufruf O(K · max_states · max_windows), unabhängig von der Routenlänge.
+    """
+
+    def __init__(self, max_windows: int = 3, max_states: int = 12, end_margin: float = 1.0) -> None:
+        """
+        :param max_windows: betrachtete Grünfenster je Ampel und Zustand
+        :param max_states: maximal behaltene Zustände je Ampel
+        :param end_margin: Sicherheitsabstand in Sekunden vor dem Ende einer Grünphase
+        """
+        self.max_windows = max_windows
+        self.max_states = max_states
+        self.end_margin = end_margin
+
+    def plan(
+        self,
+        lights: Sequence[TrafficLight],
+        distances: Sequence[float],
+        now: timedelta,
+        preferred_speed: float,
+        min_speed: float,
+        max_speed: float
+    ) -> List[PlannedPass]:
+        """
+        :param lights: die nächsten Ampeln in Fahrtreihenfolge
+        :param distances: Distanz entlang der Route von der aktuellen Position zu jeder Ampel (aufsteigend)
+        :param now: aktuelle Zeit (Zeitbasis der Ampelzyklen)
+        :return: je Ampel ein PlannedPass, leer ohne Ampeln
+        """
+        if not lights or max_speed <= 0:
+            return []
+        now_s = (now // _MS) / 1000
+
+        states = [_State(0.0, 0.0, 0, None, True, 0.0)]
+        prev_dist = 0.0
+        for light, dist in zip(lights, distances):
+            leg = max(0.0, dist - prev_dist)
+            prev_dist = dist
+            states = self._advance(states, light, leg, now_s, min_speed, max_speed)
+
+        t_pref_total = prev_dist / preferred_speed if preferred_speed > 0 else 0.0
+
+        def deviation(state: _State) -> float:
+            return max(state.lo - t_pref_total, t_pref_total - state.hi, 0.0)
+
+        best = min(states, key=lambda s: (-s.greens, deviation(s), s.lo))
+        return self._backtrack(best, lights, distances, preferred_speed, min_speed, max_speed)
+
+    def _advance(
+        self,
+        states: List[_State],
+        light: TrafficLight,
+        leg: float,
+        now_s: float,
+        min_speed: float,
+        max_speed: float
+    ) -> List[_State]:
+        cycle = light.cycle_ms / 1000
+        green = light.green_ms / 1000
+        offset = light.offset_ms / 1000
+        margin = min(self.end_margin, green / 2)
+
+        successors: List[_State] = []
+        for state in states:
+            reach_lo = state.lo + leg / max_speed
+            reach_hi = state.hi + leg / min_speed if min_speed > 0 else math.inf
+            if cycle <= 0:
+                successors.append(_State(reach_lo, reach_hi, state.greens + 1, state, True, reach_lo))
+                continue
+            # Warten über mehr als max_windows Zyklen lohnt nicht
+            reach_hi = min(reach_hi, reach_lo + self.max_windows * cycle)
+
+            # Grünfenster, das bei reach_lo läuft oder zuletzt begonnen hat
+            first_start = reach_lo - (now_s + reach_lo - offset) % cycle
+            for k in range(self.max_windows + 1):
+                ws = first_start + k * cycle
+                if ws > reach_hi:
+                    break
+                lo = max(ws, reach_lo)
+                hi = min(ws + green - margin, reach_hi)
+                if lo <= hi:
+                    successors.append(_State(lo, hi, state.greens + 1, state, True, ws))
+
+            # Halt an Rot: frühestens ankommen, Abfahrt beim nächsten Grünstart
+            if reach_lo > first_start + green - margin:
+                ws = first_start + cycle
+                successors.append(_State(ws, ws, state.greens, state, False, ws))
+
+        # Beschneiden: zuerst mehr grüne Ampeln, dann frühere Abfahrt
+        successors.sort(key=lambda s: (-s.greens, s.lo, -s.hi))
+        return successors[:self.max_states]
+
+    @staticmethod
+    def _backtrack(
+        best: _State,
+        lights: Sequence[TrafficLight],
+        distances: Sequence[float],
+        preferred_speed: float,
+        min_speed: float,
+        max_speed: float
+    ) -> List[PlannedPass]:
+        chain: List[_State] = []
+        state: Optional[_State] = best
+        while state is not None and state.parent is not None:
+            chain.append(state)
+            state = state.parent
+        chain.reverse()
+
+        legs = [d - p for d, p in zip(distances, [0.0] + list(distances[:-1]))]
+        total = distances[len(chain) - 1]
+        t_pref_total = total / preferred_speed if preferred_speed > 0 else chain[-1].lo
+
+        # Rückwärts: Passierzeiten im jeweiligen Intervall möglichst nahe am Wunschtempo
+        times = [0.0] * len(chain)
+        target = t_pref_total
+        for i in range(len(chain) - 1, -1, -1):
+            s = chain[i]
+            if not s.green:
+                # Halt an Rot: Abfahrt ist fest, Ankunft davor
+                times[i] = s.lo
+            else:
+                lo, hi = s.lo, s.hi
+                if i + 1 < len(chain):
+                    nxt_leg = legs[i + 1]
+                    if chain[i + 1].green:
+                        lo = max(lo, times[i + 1] - (nxt_leg / min_speed if min_speed > 0 else math.inf))
+                    # times[i + 1] ist bei Halt an Rot die Abfahrt, ankommen darf man beliebig früher
+                    hi = min(hi, times[i + 1] - nxt_leg / max_speed)
+                # nie außerhalb des eigenen Grünfensters, auch wenn die Nachbarschranken sich widersprechen
+                times[i] = min(max(min(max(target, lo), max(lo, hi)), s.lo), s.hi)
+            target = times[i] - legs[i] / preferred_speed if preferred_speed > 0 else times[i]
+
+        passes: List[PlannedPass] = []
+        prev_time = 0.0
+        for i, s in enumerate(chain):
+            leg = legs[i]
+            if s.green:
+                arrival = times[i]
+            else:
+                # So spät wie möglich ankommen, um kurz zu warten
+                slowest = leg / min_speed if min_speed > 0 else math.inf
+                arrival = min(times[i], prev_time + slowest)
+            travel = arrival - prev_time
+            speed = leg / travel if travel > 0 else max_speed
+            speed = max(min_speed, min(speed, max_speed))
+            passes.append(PlannedPass(lights[i], arrival, times[i], speed, s.green, s.window_start))
+            prev_time = times[i]
+        return passes
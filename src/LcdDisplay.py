@@ -0,0 +1,161 @@
+# lcd_display.py
+"""
+Ansteuerung des 16×2-LCD über einen Framebuffer: geschrieben werden nur geänderte Zeichen, und zwar
+in einem eigenen Thread, damit die Update-Schleife nicht auf die GPIO-Ausgabe wartet.
+"""
+
+import threading
+from typing import List, Optional, Tuple
+
+from RideLog import get_logger
+
+log = get_logger("lcd")
+
+
+class FakeLcdBackend:
+    """
+    LCD im Speicher, zum Testen ohne PI. Zählt Schreibvorgänge und geschriebene Zeichen.
+    """
+
+    def __init__(self, cols: int = 16, rows: int = 2) -> None:
+        self.cells: List[List[str]] = [[" "] * cols for _ in range(rows)]
+        self.writes = 0
+        self.chars_written = 0
+
+    def write(self, row: int, col: int, text: str) -> None:
+        self.cells[row][col:col + len(text)] = list(text)
+        self.writes += 1
+        self.chars_written += len(text)
+
+    def lines(self) -> List[str]:
+        return ["".join(row) for row in self.cells]
+
+    def close(self) -> None:
+        pass
+
+
+class RplcdBackend:
+    """
+    HD44780 über RPLCD (GPIO, 4-Bit-Modus). RPLCD und RPi.GPIO werden erst hier importiert.
+    """
+
+    def __init__(
+        self,
+        cols: int = 16,
+        rows: int = 2,
+        pin_rs: int = 37,
+        pin_e: int = 35,
+        pins_data: Tuple[int, ...] = (33, 31, 29, 23)
+    ) -> None:
+        import RPi.GPIO as GPIO
+        from RPLCD import CharLCD
+
+        self.lcd = CharLCD(numbering_mode=GPIO.BOARD, cols=cols, rows=rows,
+                           pin_rs=pin_rs, pin_e=pin_e, pins_data=list(pins_data))
+        # einmalig beim Start, danach nur noch gezielte Schreibvorgänge
+        self.lcd.clear()
+
+    def write(self, row: int, col: int, text: str) -> None:
+        self.lcd.cursor_pos = (row, col)
+        self.lcd.write_string(text)
+
+    def close(self) -> None:
+        self.lcd.close(clear=False)
+
+
+class LcdDisplay:
+    """
+    Hält den angezeigten und den gewünschten Frame. show() legt nur den gewünschten Frame ab und kehrt
+    sofort zurück; der Render-Thread vergleicht mit dem angezeigten und schreibt zusammenhängende Läufe
+    geänderter Zeichen. Kommen mehrere Frames, bevor der Thread fertig ist, wird nur der neueste
+    gezeichnet (coalesced).
+    """
+
+    def __init__(self, backend, cols: int = 16, rows: int = 2, threaded: bool = True, max_gap: int = 2) -> None:
+        """
+        :param backend: Objekt mit write(row, col, text), z. B. RplcdBackend oder FakeLcdBackend
+        :param threaded: eigener Render-Thread; False zeichnet erst bei flush()
+        :param max_gap: Läufe, zwischen denen höchstens so viele unveränderte Zeichen liegen, werden
+                        zusammengefasst (eine Cursor-Positionierung kostet etwa so viel wie ein Zeichen)
+        """
+        self.backend = backend
+        self.cols = cols
+        self.rows = rows
+        self.max_gap = max_gap
+        self._shown: List[str] = [" " * cols] * rows
+        self._pending: Optional[List[str]] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+
+        # Metriken
+        self.frames_requested = 0
+        self.frames_rendered = 0
+        self.frames_coalesced = 0
+        self.writes = 0
+
+        self._thread: Optional[threading.Thread] = None
+        if threaded:
+            self._thread = threading.Thread(target=self._run, name="lcd-render", daemon=True)
+            self._thread.start()
+
+    def show(self, *lines: str) -> None:
+        """
+        Setzt den Inhalt (eine Zeichenkette je Zeile, zu lang wird abgeschnitten, fehlend bleibt leer).
+        """
+        frame = [(lines[r] if r < len(lines) else "")[:self.cols].ljust(self.cols) for r in range(self.rows)]
+        with self._lock:
+            if self._pending is not None:
+                self.frames_coalesced += 1
+            self._pending = frame
+            self.frames_requested += 1
+        self._wake.set()
+
+    def flush(self) -> None:
+        """
+        Zeichnet einen offenen Frame sofort im aufrufenden Thread.
+        """
+        with self._lock:
+            frame, self._pending = self._pending, None
+        if frame is not None:
+            self._render(frame)
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._closed:
+                return
+            try:
+                self.flush()
+            except Exception as e:
+                log.warning("LCD-Ausgabe fehlgeschlagen: %s", e, extra={"stage": "display"})
+
+    def _render(self, frame: List[str]) -> None:
+        for row, (old, new) in enumerate(zip(self._shown, frame)):
+            for col, text in self._changed_runs(old, new):
+                self.backend.write(row, col, text)
+                self.writes += 1
+        self._shown = frame
+        self.frames_rendered += 1
+
+    def _changed_runs(self, old: str, new: str) -> List[Tuple[int, str]]:
+        """
+        Zusammenhängende Bereiche geänderter Zeichen als (Startspalte, neuer Text).
+        """
+        runs: List[Tuple[int, int]] = []
+        for col, (a, b) in enumerate(zip(old, new)):
+            if a == b:
+                continue
+            if runs and col - runs[-1][1] <= self.max_gap + 1:
+                runs[-1] = (runs[-1][0], col)
+            else:
+                runs.append((col, col))
+        return [(start, new[start:end + 1]) for start, end in runs]
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self.backend.close()
@@ -1,5 +1,8 @@
+import time
 from typing import Tuple
 
+from GpsReader import GpsFix
+
 
 class MockedCyclist:
     """
@@ -20,6 +23,9 @@ class MockedCyclist:
         self.min_speed: float = min_speed
         self.max_speed: float = max_speed
 
+    def get_fix(self) -> GpsFix:
+        return GpsFix(self.current_position[0], self.current_position[1], self.current_speed, time.monotonic(), False)
+
     def get_current_position(self) -> Tuple[float, float]:
         return self.current_position
 
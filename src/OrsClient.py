@@ -0,0 +1,229 @@
+# ors_client.py
+"""
+Langlebiger Client für den OpenRouteService-Directions-Endpunkt.
+
+- Eine requests.Session mit Verbindungspool hält TCP/TLS-Verbindungen offen (Keep-alive), Antworten kommen
+  gzip-komprimiert.
+- Verbindungsfehler, Timeouts, 429 und 5xx werden begrenzt oft wiederholt, mit exponentiellem Backoff und
+  zufälligem Jitter; andere 4xx-Fehler sofort gemeldet.
+- Ein Circuit Breaker öffnet nach `failure_threshold` fehlgeschlagenen Aufrufen in Folge und weist dann
+  `reset_timeout` Sekunden lang sofort ab; danach darf ein Probeaufruf durch (halb offen).
+- Gleiche gleichzeitige Anfragen werden zusammengefasst: nur eine geht ans Netz, die anderen warten auf ihr
+  Ergebnis.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from RideLog import get_logger
+from utils import as_route_array
+
+log = get_logger("ors")
+
+# Statuscodes, bei denen sich eine Wiederholung lohnt
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class OrsError(RuntimeError):
+    """
+    Route konnte nicht geholt werden (Netz, HTTP-Fehler, ungültige Antwort oder offener Circuit Breaker).
+    """
+
+
+class OrsClient:
+    """
+    Holt Routen zwischen zwei Punkten; thread-sicher, eine Instanz für die ganze Laufzeit.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str],
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        pool_size: int = 2,
+        session: Optional[requests.Session] = None,
+        sleep: Callable[[float], None] = time.sleep
+    ) -> None:
+        """
+        :param base_url: Directions-Endpunkt, z. B. https://api.openrouteservice.org/v2/directions/driving-car
+        :param api_key: ORS-API-Schlüssel
+        :param retries: Wiederholungen nach dem ersten Versuch
+        :param backoff: Grundwartezeit in Sekunden, verdoppelt je Wiederholung; gewartet wird zufällig
+                        zwischen 0 und diesem Wert (Full Jitter)
+        :param max_backoff: Obergrenze einer Wartezeit in Sekunden, auch für Retry-After
+        :param failure_threshold: fehlgeschlagene Aufrufe in Folge, nach denen der Circuit Breaker öffnet
+        :param reset_timeout: Sekunden, die der offene Circuit Breaker sofort abweist
+        :param pool_size: offen gehaltene Verbindungen
+        :param session: eigene Session; sonst wird eine angelegt
+        :param sleep: Wartefunktion zwischen Wiederholungen
+        """
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._sleep = sleep
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        session.headers.update({"Accept-Encoding": "gzip", "Accept": "application/geo+json, application/json"})
+        if api_key is not None:
+            # als Header statt Query-Parameter, damit der Schlüssel nicht in URLs und Fehlermeldungen landet
+            session.headers["Authorization"] = api_key
+        self._session = session
+
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Tuple[str, str], Future] = {}
+        self._failures = 0
+        self._open_until = 0.0
+        self._probing = False
+
+        # Metriken
+        self.calls = 0
+        self.coalesced = 0
+        self.attempts = 0
+        self.retried = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def circuit_open(self) -> bool:
+        return self._failures >= self.failure_threshold and time.monotonic() < self._open_until
+
+    def directions(self, start: Tuple[float, float], end: Tuple[float, float]) -> np.ndarray:
+        """
+        :param start: (lat, lon)
+        :param end: (lat, lon)
+        :return: Wegpunkte als N×2-Array von (lat, lon)
+        :raises OrsError: wenn alle Versuche fehlschlagen oder der Circuit Breaker offen ist
+        """
+        # OpenRouteService erwartet lon,lat
+        key = (f"{start[1]},{start[0]}", f"{end[1]},{end[0]}")
+        with self._lock:
+            self.calls += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            route = self._request(*key)
+            future.set_result(route)
+            return route
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _admit(self) -> None:
+        # Circuit Breaker: offen -> abweisen, nach Ablauf genau einen Probeaufruf durchlassen
+        with self._lock:
+            if self._failures < self.failure_threshold:
+                return
+            if time.monotonic() < self._open_until or self._probing:
+                self.rejected += 1
+                raise OrsError("ORS vorübergehend gesperrt nach wiederholten Fehlern")
+            self._probing = True
+
+    def _record(self, success: bool) -> None:
+        with self._lock:
+            self._probing = False
+            if success:
+                self._failures = 0
+                return
+            self.failed += 1
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._open_until = time.monotonic() + self.reset_timeout
+                log.warning("ORS-Circuit-Breaker offen für %.0f s", self.reset_timeout, extra={"stage": "route"})
+
+    def _delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after is not None:
+            try:
+                return min(self.max_backoff, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        return random.uniform(0.0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _request(self, start: str, end: str) -> np.ndarray:
+        self._admit()
+        params = {"start": start, "end": end}
+        error: Exception = OrsError("kein Versuch")
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt > 0:
+                    self.retried += 1
+                self.attempts += 1
+                retry_after = None
+                try:
+                    resp = self._session.get(self.base_url, params=params, timeout=self.timeout)
+                    if resp.status_code in RETRY_STATUS:
+                        retry_after = resp.headers.get("Retry-After")
+                        error = OrsError(f"ORS antwortet {resp.status_code}")
+                    elif resp.status_code >= 400:
+                        # übrige 4xx: Wiederholen ändert nichts
+                        self._record(False)
+                        raise OrsError(f"ORS antwortet {resp.status_code}")
+                    else:
+                        # GeoJSON FeatureCollection → erstes Feature → geometry.coordinates, lon,lat → lat,lon
+                        coords = resp.json()["features"][0]["geometry"]["coordinates"]
+                        route = as_route_array(coords)[:, ::-1].copy()
+                        self._record(True)
+                        return route
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+                except (requests.RequestException, ValueError, KeyError, IndexError, TypeError) as e:
+                    # unbrauchbare Antwort
+                    self._record(False)
+                    raise OrsError(f"Ungültige ORS-Antwort: {type(e).__name__}") from e
+
+                if attempt < self.retries:
+                    delay = self._delay(attempt, retry_after)
+                    log.info("ORS-Versuch %d fehlgeschlagen (%s), neuer Versuch in %.1f s", attempt + 1, error, delay,
+                             extra={"stage": "route"})
+                    self._sleep(delay)
+
+            self._record(False)
+            raise OrsError(f"Fehler beim ORS-Request nach {self.retries + 1} Versuchen: {error}") from error
+        finally:
+            # auch bei unerwarteten Ausnahmen darf der Circuit Breaker nicht im Probeaufruf hängen bleiben
+            with self._lock:
+                self._probing = False
+
+    def get_metrics(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "attempts": self.attempts,
+            "retried": self.retried,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "circuit_open": int(self.circuit_open),
+        }
+
+    def close(self) -> None:
+        self._session.close()
@@ -0,0 +1,164 @@
+# parameter_sweep.py
+"""
+Parameterstudie über simulierte Fahrten: Geschwindigkeitsbänder × Ampelversätze × Startzeitpunkte
+(× Planer), verteilt auf einen Prozesspool. Ergebnisse werden spaltenweise als .npz (und optional CSV)
+gespeichert.
+
+Aufruf:  python ParameterSweep.py --speed-bands 0:5:7 0:6:8 --offset-steps=-20:20:5 --start-times 0:110:1
+(negative Bereiche mit "=" anhängen, sonst hält argparse sie für eine Option)
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from RideSimulator import default_route, simulate_ride
+from TrafficLightFetcher import TrafficLightFetcher
+
+# Eingabe- und Ergebnisspalten in der Reihenfolge der Arrays
+PARAM_COLUMNS = ("min_speed", "preferred_speed", "max_speed", "offset_step", "start_time", "green_wave")
+RESULT_COLUMNS = ("travel_time", "stops", "wait_time", "greens", "finished")
+
+# Zustand je Worker-Prozess, einmalig im Initializer geladen
+_fetcher: Optional[TrafficLightFetcher] = None
+_route: Optional[np.ndarray] = None
+
+
+def _init_worker(lights_file: str, route: Optional[np.ndarray]) -> None:
+    global _fetcher, _route
+    _fetcher = TrafficLightFetcher()
+    if not _fetcher.load_from_json(lights_file):
+        raise RuntimeError(f"Konnte {lights_file} nicht laden.")
+    _route = route if route is not None else default_route(_fetcher)
+
+
+def _run_chunk(params: np.ndarray) -> np.ndarray:
+    """
+    Simuliert alle Zeilen von params (Spalten wie PARAM_COLUMNS) und liefert die Ergebnisse (RESULT_COLUMNS).
+    """
+    results = np.empty((len(params), len(RESULT_COLUMNS)), dtype=np.float64)
+    for row, (v_min, v_pref, v_max, offset_step, start_time, green_wave) in enumerate(params.tolist()):
+        result = simulate_ride(
+            _fetcher, _route,
+            preferred_speed=v_pref,
+            min_speed=v_min,
+            max_speed=v_max,
+            green_wave_lights=int(green_wave),
+            # Späterer Start entspricht früher verschobenen Ampelzyklen
+            offset_shift=-start_time,
+            offset_step=offset_step
+        )
+        results[row] = (result.travel_time, result.stops, result.wait_time, result.greens, result.finished)
+    return results
+
+
+def build_grid(
+    speed_bands: Sequence[Tuple[float, float, float]],
+    offset_steps: Sequence[float],
+    start_times: Sequence[float],
+    green_wave: Sequence[int]
+) -> np.ndarray:
+    """
+    Kartesisches Produkt aller Parameter als Array mit den Spalten PARAM_COLUMNS.
+    """
+    rows = [
+        (*band, step, start, k)
+        for band, step, start, k in itertools.product(speed_bands, offset_steps, start_times, green_wave)
+    ]
+    return np.array(rows, dtype=np.float64).reshape(-1, len(PARAM_COLUMNS))
+
+
+def run_sweep(
+    grid: np.ndarray,
+    lights_file: str,
+    route: Optional[np.ndarray] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = 64
+) -> np.ndarray:
+    """
+    Verteilt die Zeilen von grid in Blöcken auf einen Prozesspool.
+    :return: Ergebnisse mit den Spalten RESULT_COLUMNS, Zeilen in derselben Reihenfolge wie grid
+    """
+    chunks = [grid[i:i + chunk_size] for i in range(0, len(grid), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(lights_file, route)) as pool:
+        parts = list(pool.map(_run_chunk, chunks))
+    return np.concatenate(parts) if parts else np.empty((0, len(RESULT_COLUMNS)))
+
+
+def save_results(filename: str, grid: np.ndarray, results: np.ndarray, csv: bool = False) -> None:
+    """
+    Speichert jede Spalte als eigenes Array in einer .npz-Datei, optional zusätzlich als CSV daneben.
+    """
+    columns: Dict[str, np.ndarray] = {name: grid[:, i] for i, name in enumerate(PARAM_COLUMNS)}
+    columns.update({name: results[:, i] for i, name in enumerate(RESULT_COLUMNS)})
+    np.savez_compressed(filename, **columns)
+    if csv:
+        np.savetxt(
+            os.path.splitext(filename)[0] + ".csv",
+            np.column_stack(list(columns.values())),
+            delimiter=",", header=",".join(columns), comments="", fmt="%.6g"
+        )
+
+
+def summarize(grid: np.ndarray, results: np.ndarray) -> None:
+    """
+    Gibt Mittelwerte je Geschwindigkeitsband und Planer aus.
+    """
+    keys = np.unique(grid[:, [0, 1, 2, 5]], axis=0)
+    print("v_min v_pref v_max  K | Fahrzeit  Halte  Wartezeit  grün")
+    for v_min, v_pref, v_max, k in keys:
+        mask = (grid[:, 0] == v_min) & (grid[:, 1] == v_pref) & (grid[:, 2] == v_max) & (grid[:, 5] == k)
+        travel, stops, wait, greens, _ = results[mask].mean(axis=0)
+        print(f"{v_min:5.1f} {v_pref:6.1f} {v_max:5.1f} {int(k):2d} | "
+              f"{travel:8.1f} {stops:6.2f} {wait:10.1f} {greens:5.2f}")
+
+
+def _parse_range(text: str) -> List[float]:
+    """
+    "a:b:s" → a, a+s, ... (ohne b), einzelne Zahl → [Zahl]
+    """
+    if ":" not in text:
+        return [float(text)]
+    start, stop, step = (float(x) for x in text.split(":"))
+    return np.arange(start, stop, step).tolist()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Parameterstudie über simulierte Fahrten.")
+    parser.add_argument("--lights", default="traffic_lights_venloer_bis_aachener.json")
+    parser.add_argument("--speed-bands", nargs="+", default=["0:5:7", "0:6:8", "2:7:9"],
+                        help="Bänder min:bevorzugt:max in m/s")
+    parser.add_argument("--offset-steps", default="-20:21:10", help="Versatz je Ampel in s, a:b:schritt; negativ mit '=': --offset-steps=-20:21:10")
+    parser.add_argument("--start-times", default="0:110:10", help="Startzeitpunkte in s, a:b:schritt")
+    parser.add_argument("--green-wave", nargs="+", type=int, default=[0], help="0: SpeedAdvisor, K: GreenWavePlanner")
+    parser.add_argument("--workers", type=int, default=None, help="Prozesse, Standard: alle Kerne")
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--out", default="sweep_results.npz")
+    parser.add_argument("--csv", action="store_true", help="zusätzlich CSV schreiben")
+    args = parser.parse_args(argv)
+
+    speed_bands = [tuple(float(x) for x in band.split(":")) for band in args.speed_bands]
+    if any(len(band) != 3 for band in speed_bands):
+        print("Geschwindigkeitsbänder bitte als min:bevorzugt:max angeben.", file=sys.stderr)
+        sys.exit(2)
+    grid = build_grid(speed_bands, _parse_range(args.offset_steps), _parse_range(args.start_times), args.green_wave)
+    print(f"{len(grid)} Kombinationen auf {args.workers or os.cpu_count()} Prozessen")
+
+    wall_start = time.perf_counter()
+    results = run_sweep(grid, args.lights, workers=args.workers, chunk_size=args.chunk_size)
+    wall = time.perf_counter() - wall_start
+    print(f"fertig in {wall:.1f} s ({len(grid) / wall:.0f} Fahrten/s)")
+
+    save_results(args.out, grid, results, csv=args.csv)
+    print(f"Ergebnisse in {args.out}")
+    summarize(grid, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+# phase_fitter.py
+"""
+Bestimmt Grünphase, Rotphase und Versatz von Ampeln aus Klick-Protokollen (App "Clickr", siehe
+phase_measurements/*.csv mit den Spalten Date, Time, Value; Value +1 = Beginn Grün, -1 = Beginn Rot) und
+schreibt sie als Zeitentabelle, die TrafficLightFetcher beim Laden übernimmt.
+
+Der Dateiname endet mit der OSM-Knotennummer der Ampel, z. B. Venloer_4279001084.csv. Die Dateien werden
+in Blöcken auf einen Prozesspool verteilt, jeder Block wird gemeinsam über groupby ausgewertet.
+
+Aufruf:  python PhaseFitter.py ../phase_measurements [--reference 4279001084] [--cycle 110]
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from TrafficLightFetcher import SIGNAL_TIMINGS_FILE
+
+# Spalten des Ergebnisses von fit_events, Index ist die Knotennummer
+FIT_COLUMNS = ("green_s", "red_s", "cycle_s", "green_start", "jitter_s", "cycles")
+
+
+def light_key(path: Path) -> Optional[Tuple[str, str]]:
+    """
+    (Knotennummer, Name) aus einem Dateinamen wie "Venloer_4279001084.csv", None ohne Knotennummer.
+    """
+    name, _, node = path.stem.rpartition("_")
+    if not node.isdigit():
+        return None
+    return node, name
+
+
+def read_events(paths: Sequence[Path]) -> pd.DataFrame:
+    """
+    Liest die Protokolle in einen DataFrame mit den Spalten node, t (Sekunden) und value (+1/-1).
+    Einträge mit Value 0 und Dateien ohne Knotennummer im Namen werden übergangen.
+    """
+    frames = []
+    for path in paths:
+        key = light_key(path)
+        if key is None:
+            continue
+        df = pd.read_csv(path, usecols=["Date", "Time", "Value"], dtype={"Date": str, "Time": str})
+        df = df[df["Value"] != 0]
+        stamps = pd.to_datetime(df["Date"] + " " + df["Time"], format="%d/%m/%Y %H:%M:%S")
+        frames.append(pd.DataFrame({
+            "node": key[0],
+            "t": (stamps - pd.Timestamp(0)).dt.total_seconds().to_numpy(),
+            "value": np.sign(df["Value"].to_numpy()).astype(np.int8),
+        }))
+    if not frames:
+        return pd.DataFrame({"node": pd.Series(dtype=str), "t": pd.Series(dtype=float),
+                             "value": pd.Series(dtype=np.int8)})
+    return pd.concat(frames, ignore_index=True)
+
+
+def fit_events(
+    events: pd.DataFrame,
+    cycle: Optional[float] = None,
+    tolerance: float = 0.2,
+    double_click: float = 5.0
+) -> pd.DataFrame:
+    """
+    Schätzt die Zyklusparameter aller Ampeln in events gemeinsam (vektorisiert über groupby).
+
+    - Phasendauern sind die Abstände aufeinanderfolgender Umschaltungen. Doppelte Klicks (gleicher Wert
+      innerhalb von `double_click` Sekunden) werden verworfen, ebenso Dauern über eine verpasste Umschaltung
+      hinweg und Dauern mit mehr als `tolerance` · Zyklus Abweichung vom Median.
+    - Die Zykluslänge kommt aus den Abständen gleichartiger Umschaltungen, geteilt durch die Zahl der
+      dazwischenliegenden Zyklen; so zählen auch Messungen mit Lücken.
+    - Die Phase ist der zirkuläre Mittelwert der Grünbeginne modulo Zyklus relativ zum ersten Grünbeginn
+      (robust gegen den Umbruch bei 0).
+
+    :param events: Spalten node, t, value wie von read_events
+    :param cycle: gemeinsame Zykluslänge in Sekunden für alle Ampeln (koordinierte Strecke), None = je Ampel schätzen
+    :return: DataFrame mit den Spalten FIT_COLUMNS je Knoten; green_start ist ein geschätzter Grünbeginn
+             nahe dem Anfang der Messung in Sekunden seit 1970
+    """
+    ev = events.sort_values(["node", "t"], kind="mergesort").reset_index(drop=True)
+    by_node = ev.groupby("node")
+    repeated = (ev["value"] == by_node["value"].shift()) & (ev["t"] - by_node["t"].shift() < double_click)
+    ev = ev[~repeated].reset_index(drop=True)
+    by_node = ev.groupby("node")
+
+    # Dauer bis zur nächsten Umschaltung, nur wenn diese die andere Phase beginnt
+    ev["dur"] = (by_node["t"].shift(-1) - ev["t"]).where(by_node["value"].shift(-1) == -ev["value"])
+    medians = ev.groupby(["node", "value"])["dur"].median().unstack("value").reindex(columns=[1, -1])
+    cycle0 = medians[1] + medians[-1]
+    if cycle is not None:
+        cycle0[:] = cycle
+
+    ev_cycle0 = ev["node"].map(cycle0)
+    ev_median = pd.Series(medians.stack().reindex(pd.MultiIndex.from_arrays([ev["node"], ev["value"]])).to_numpy())
+    valid = (ev["dur"] - ev_median).abs() <= tolerance * ev_cycle0
+    durations = ev[valid].groupby(["node", "value"])["dur"].agg(["mean", "count"]).unstack("value")
+    green = durations[("mean", 1)]
+    red = durations[("mean", -1)]
+
+    if cycle is None:
+        # Abstände gleichartiger Umschaltungen als Vielfache des Zyklus
+        interval = ev.groupby(["node", "value"])["t"].diff()
+        k = (interval / ev_cycle0).round()
+        ok = (k >= 1) & ((interval - k * ev_cycle0).abs() <= tolerance * ev_cycle0)
+        sums = pd.DataFrame({"node": ev["node"], "interval": interval.where(ok), "k": k.where(ok)}).groupby("node").sum()
+        fitted = (sums["interval"] / sums["k"]).replace([np.inf], np.nan)
+        cycle_s = fitted.fillna(green + red)
+    else:
+        cycle_s = pd.Series(float(cycle), index=cycle0.index)
+    # Rot als Rest des Zyklus, damit green + red = cycle gilt
+    red_s = (cycle_s - green).where(green.notna(), red)
+    green_s = green.fillna(cycle_s - red_s)
+
+    starts = ev[ev["value"] == 1]
+    c = starts["node"].map(cycle_s)
+    # relativ zum ersten Grünbeginn rechnen: modulo Zyklus auf Sekunden seit 1970 verstärkt jeden Fehler der Zykluslänge
+    first_green = starts.groupby("node")["t"].min()
+    since_first = starts["t"] - starts["node"].map(first_green)
+    angle = 2 * np.pi * np.mod(since_first, c) / c
+    trig = pd.DataFrame({"node": starts["node"], "cos": np.cos(angle), "sin": np.sin(angle)}).groupby("node").mean()
+    shift = np.arctan2(trig["sin"], trig["cos"]) / (2 * np.pi) * cycle_s
+    green_start = first_green + shift
+    # Streuung der Grünbeginne um die geschätzte Phase
+    residual = np.mod(since_first - starts["node"].map(shift) + c / 2, c) - c / 2
+    jitter_s = residual.groupby(starts["node"]).std(ddof=0)
+
+    return pd.DataFrame({
+        "green_s": green_s,
+        "red_s": red_s,
+        "cycle_s": cycle_s,
+        "green_start": green_start,
+        "jitter_s": jitter_s,
+        "cycles": durations[("count", 1)].fillna(0).astype(int),
+    }, columns=list(FIT_COLUMNS)).dropna(subset=["green_s", "red_s", "green_start"])
+
+
+def _fit_files(paths: List[Path], cycle: Optional[float]) -> pd.DataFrame:
+    return fit_events(read_events(paths), cycle=cycle)
+
+
+def fit_directory(
+    directory: str,
+    pattern: str = "*.csv",
+    cycle: Optional[float] = None,
+    workers: Optional[int] = None,
+    chunk_files: int = 32
+) -> Tuple[pd.DataFrame, Dict[str, Tuple[str, str]]]:
+    """
+    Wertet alle passenden Dateien eines Verzeichnisses aus, blockweise auf einem Prozesspool.
+    :return: (Ergebnis von fit_events über alle Dateien, Knotennummer -> (Name, Dateiname))
+    """
+    paths = sorted(Path(directory).glob(pattern))
+    names = {}
+    for path in paths:
+        key = light_key(path)
+        if key is None:
+            print(f"Übergehe {path.name}: keine Knotennummer im Dateinamen", file=sys.stderr)
+            continue
+        names[key[0]] = (key[1], path.name)
+
+    chunks = [paths[i:i + chunk_files] for i in range(0, len(paths), chunk_files)]
+    if len(chunks) <= 1 or workers == 1:
+        parts = [_fit_files(chunk, cycle) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_fit_files, chunks, [cycle] * len(chunks)))
+    fits = pd.concat(parts) if parts else pd.DataFrame(columns=list(FIT_COLUMNS))
+    return fits, names
+
+
+def relative_offsets(fits: pd.DataFrame, reference: str) -> pd.Series:
+    """
+    Versatz jeder Ampel in Sekunden relativ zum geschätzten Grünbeginn der Referenzampel, wie ihn
+    TrafficLight erwartet (Grün im Intervall [offset, offset + green) des Zyklus).
+    """
+    t0 = fits.at[reference, "green_start"]
+    return np.mod(fits["green_start"] - t0, fits["cycle_s"])
+
+
+def timing_table(
+    fits: pd.DataFrame,
+    names: Dict[str, Tuple[str, str]],
+    reference: Optional[str] = None
+) -> dict:
+    """
+    Zeitentabelle für TrafficLightFetcher.load_timings.
+    :param reference: Knotennummer der Referenzampel (Versatz 0), Standard: die mit den meisten Zyklen
+    """
+    if reference is None:
+        reference = str(fits["cycles"].idxmax())
+    offsets = relative_offsets(fits, reference)
+    lights = {}
+    for node, row in fits.iterrows():
+        name, source = names.get(node, ("", ""))
+        lights[node] = {
+            "name": name,
+            "green_s": round(float(row["green_s"]), 2),
+            "red_s": round(float(row["red_s"]), 2),
+            "offset_s": round(float(offsets[node]), 2),
+            "jitter_s": round(float(row["jitter_s"]), 2),
+            "cycles": int(row["cycles"]),
+            "source": source,
+        }
+    return {"reference": reference, "lights": lights}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Ampelphasen aus Klick-Protokollen bestimmen.")
+    parser.add_argument("directory", nargs="?", default=os.path.join("..", "phase_measurements"))
+    parser.add_argument("--pattern", default="*.csv")
+    parser.add_argument("--reference", help="Knotennummer der Referenzampel (Versatz 0)")
+    parser.add_argument("--cycle", type=float, help="gemeinsame Zykluslänge in s, sonst je Ampel geschätzt")
+    parser.add_argument("--workers", type=int, default=None, help="Prozesse, Standard: alle Kerne")
+    parser.add_argument("--out", default=SIGNAL_TIMINGS_FILE)
+    args = parser.parse_args(argv)
+
+    fits, names = fit_directory(args.directory, args.pattern, cycle=args.cycle, workers=args.workers)
+    if fits.empty:
+        print(f"Keine auswertbaren Messungen in {args.directory}.", file=sys.stderr)
+        sys.exit(1)
+    if args.reference is not None and args.reference not in fits.index:
+        print(f"Referenzampel {args.reference} wurde nicht gemessen.", file=sys.stderr)
+        sys.exit(2)
+
+    table = timing_table(fits, names, args.reference)
+    tmp = f"{args.out}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(table, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, args.out)
+
+    print(f"{len(table['lights'])} Ampeln nach {args.out} geschrieben (Referenz {table['reference']}):")
+    for node, light in table["lights"].items():
+        print(f"  {node:>12s} {light['name']:14s} grün {light['green_s']:6.1f} s  rot {light['red_s']:6.1f} s  "
+              f"Versatz {light['offset_s']:6.1f} s  Streuung {light['jitter_s']:4.1f} s  ({light['cycles']} Zyklen)")
+
+
+if __name__ == "__main__":
+    main()
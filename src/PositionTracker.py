@@ -1,15 +1,84 @@
+from bisect import bisect_right
 from datetime import timedelta
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
-from utils import haversine
+import numpy as np
+
+from utils import RouteLike, as_route_array, cumulative_distances
 
 
 class PositionTracker:
+    """
+    Simuliert die Position entlang einer Route. Die akkumulierten Distanzen werden einmal pro Route
+    berechnet; eine Abfrage kostet dann O(log n) per Bisektion bzw. O(1) beim Vorwärtsfahren.
+    """
+
+    def __init__(self) -> None:
+        self._route_key: Optional[RouteLike] = None
+        self._route: np.ndarray = np.zeros((0, 2))
+        self._cum: List[float] = []
+        self._segment = 0
+        self.along = 0.0
+
+    def set_route(self, route: RouteLike, cum_distances: Optional[np.ndarray] = None) -> None:
+        """
+        :param route: Wegpunkte (latitude, longitude)
+        :param cum_distances: bereits berechnete akkumulierte Distanzen, werden sonst berechnet
+        """
+        self._route_key = route
+        self._route = as_route_array(route)
+        if cum_distances is None:
+            cum_distances = cumulative_distances(self._route) if len(self._route) else np.zeros(0)
+        self._cum = cum_distances.tolist()
+        self._segment = 0
+        self.along = 0.0
+
+    @property
+    def total_length(self) -> float:
+        return self._cum[-1] if self._cum else 0.0
+
+    def position_at(self, along: float) -> Tuple[float, float]:
+        """
+        Interpolierte Position nach `along` Metern auf der Route.
+        """
+        # Keine Route: Nullpunkt
+        if len(self._route) == 0:
+            return (0.0, 0.0)
+        # Ein-Punkt-Route: Konstante Position
+        if len(self._route) == 1:
+            return tuple(self._route[0])
+
+        # Wenn Route zu Ende gefahren, letzten Punkt zurückgeben
+        if along >= self._cum[-1]:
+            self._segment = len(self._cum) - 2
+            return tuple(self._route[-1])
+
+        i = self._segment
+        if not self._cum[i] <= along < self._cum[i + 1]:
+            if along >= self._cum[i + 1] and (i + 2 >= len(self._cum) or along < self._cum[i + 2]):
+                # häufigster Fall beim Fahren: ins nächste Segment
+                i += 1
+            else:
+                i = min(max(bisect_right(self._cum, along) - 1, 0), len(self._cum) - 2)
+            self._segment = i
+
+        # Restdistanz berechnen und interpolieren
+        segment_dist = self._cum[i + 1] - self._cum[i]
+        fraction = (along - self._cum[i]) / segment_dist if segment_dist > 0 else 0.0
+        (lat1, lon1), (lat2, lon2) = self._route[i], self._route[i + 1]
+        return (float(lat1 + (lat2 - lat1) * fraction), float(lon1 + (lon2 - lon1) * fraction))
+
+    def advance(self, speed: float, dt: float) -> Tuple[float, float]:
+        """
+        Inkrementell: fährt von der letzten Position mit `speed` (m/s) für `dt` Sekunden weiter.
+        """
+        self.along = min(max(self.along + speed * dt, 0.0), self.total_length)
+        return self.position_at(self.along)
 
     def get_current_position(
             self,
             cyclist,
-            route: List[Tuple[float, float]],
+            route: RouteLike,
             time_elapsed: timedelta  # elapsed time as timedelta
     ) -> Tuple[float, float]:
         """
@@ -19,32 +88,12 @@ class PositionTracker:
         :param time_elapsed: elapsed time since start as timedelta
         :return: Tuple (latitude, longitude) of the current position along the route
         """
-        # Keine Route: Nullpunkt
-        if not route:
-            return (0.0, 0.0)
-        # Ein-Punkt-Route: Konstante Position
-        if len(route) == 1:
-            return route[0]
+        if route is not self._route_key:
+            self.set_route(route)
 
         # Geschwindigkeit in m/s vom mockedcyclist holen
-
         speed = cyclist.get_current_speed()
 
-        # Gesamtdistanz basierend auf aktueller Geschwindigkeit
-        total_distance = time_elapsed.seconds * speed
-        traveled = 0.0
-
-        # Durch Geopunkte iterieren
-        for start, end in zip(route, route[1:]):
-            segment_dist = haversine(start, end)
-            if traveled + segment_dist >= total_distance:
-                # Restdistanz berechnen und interpolieren
-                remaining = total_distance - traveled
-                fraction = remaining / segment_dist if segment_dist > 0 else 0.0
-                lat = start[0] + (end[0] - start[0]) * fraction
-                lon = start[1] + (end[1] - start[1]) * fraction
-                return (lat, lon)
-            traveled += segment_dist
-
-        # Wenn Route zu Ende gefahren, letzten Punkt zurückgeben
-        return route[-1]
+        # Gesamtdistanz basierend auf aktueller Geschwindigkeit, millisekundengenau
+        self.along = time_elapsed.total_seconds() * speed
+        return self.position_at(self.along)
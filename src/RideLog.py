@@ -0,0 +1,205 @@
+# ride_log.py
+"""
+Asynchrones, strukturiertes Logging für die Update-Schleife.
+
+Die Schleife schreibt nie selbst auf Konsole oder Platte: ein QueueHandler legt die Records nicht
+blockierend in eine begrenzte Queue (bei voller Queue wird verworfen und gezählt), ein QueueListener-Thread
+formatiert und schreibt sie. Jeder Record trägt die Tick-Nummer und die Stufe; zusätzliche Werte
+werden als `extra={"data": {...}}` übergeben und landen als Felder im JSON.
+
+Nutzung:
+    log = get_logger("controller")
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Empfehlung", extra={"stage": "advice", "data": {"v_opt": v_opt}})
+"""
+
+import atexit
+import json
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+ROOT_LOGGER = "ridesync"
+
+_current_tick = 0
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def set_tick(tick: int) -> None:
+    """
+    Setzt die Tick-Nummer, die allen folgenden Records mitgegeben wird.
+    """
+    global _current_tick
+    _current_tick = tick
+
+
+class TickFilter(logging.Filter):
+    """
+    Ergänzt tick, stage und data, solange der Aufrufer sie nicht selbst setzt.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "tick"):
+            record.tick = _current_tick
+        if not hasattr(record, "stage"):
+            record.stage = ""
+        if not hasattr(record, "data"):
+            record.data = None
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lässt dieselbe Meldung (Logger + Format-String) höchstens einmal pro `interval` Sekunden durch.
+    Die Zahl der dazwischen unterdrückten Wiederholungen wird an die nächste durchgelassene angehängt.
+    Gedrosselt werden nur Records ab `level` (sich wiederholende Warnungen wie ein veralteter GPS-Fix);
+    DEBUG- und INFO-Records je Tick sind die Daten des Fahrtprotokolls und gehen alle durch.
+    """
+
+    def __init__(self, interval: float = 10.0, max_keys: int = 1000, level: int = logging.WARNING) -> None:
+        super().__init__()
+        self.interval = interval
+        self.max_keys = max_keys
+        self.level = level
+        self._last: Dict[Tuple[str, str], Tuple[float, int]] = {}
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        last, count = self._last.get(key, (None, 0))
+        if last is not None and now - last < self.interval:
+            self._last[key] = (last, count + 1)
+            self.suppressed += 1
+            return False
+        if len(self._last) >= self.max_keys:
+            self._last.clear()
+        self._last[key] = (now, 0)
+        if count:
+            record.suppressed = count
+        return True
+
+
+class DropQueueHandler(QueueHandler):
+    """
+    QueueHandler, der bei voller Queue nicht blockiert, sondern den Record verwirft und mitzählt.
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class ConsoleFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{self.formatTime(record, '%H:%M:%S')} {record.levelname:7s} [{record.tick}"
+        line += f"/{record.stage}] " if record.stage else "] "
+        line += record.getMessage()
+        if record.data:
+            line += " " + " ".join(f"{k}={_short(v)}" for k, v in record.data.items())
+        if getattr(record, "suppressed", 0):
+            line += f" ({record.suppressed}x unterdrückt)"
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Eine Zeile JSON je Record, zum späteren Auswerten einer Fahrt.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "tick": record.tick,
+            "stage": record.stage,
+            "msg": record.getMessage(),
+        }
+        if record.data:
+            entry.update(record.data)
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _short(value) -> str:
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[DropQueueHandler] = None
+
+
+def setup_logging(
+    level: int = logging.INFO,
+    log_file: Optional[str] = None,
+    console: bool = True,
+    queue_size: int = 10000,
+    rate_limit: float = 10.0
+) -> DropQueueHandler:
+    """
+    Richtet den Logger "ridesync" mit Queue und Hintergrund-Schreiber ein (ersetzt eine vorherige Einrichtung).
+
+    :param level: Mindest-Level; darunter liegende Aufrufe kosten nur den isEnabledFor-Test
+    :param log_file: JSON-Lines-Datei, None für keine Datei
+    :param console: lesbare Ausgabe auf stderr
+    :param queue_size: maximale Anzahl wartender Records, darüber wird verworfen
+    :param rate_limit: Mindestabstand in Sekunden zwischen gleichen Warnungen und Fehlern, 0 schaltet ab
+    :return: der QueueHandler (Zähler `dropped`)
+    """
+    global _listener, _queue_handler
+    shutdown_logging()
+
+    handlers = []
+    if console:
+        stream = logging.StreamHandler()
+        stream.setFormatter(ConsoleFormatter())
+        handlers.append(stream)
+    if log_file:
+        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = DropQueueHandler(log_queue)
+    _queue_handler.addFilter(TickFilter())
+    if rate_limit > 0:
+        _queue_handler.addFilter(RateLimitFilter(rate_limit))
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(level)
+    root.propagate = False
+    root.handlers = [_queue_handler]
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _queue_handler
+
+
+def shutdown_logging() -> None:
+    """
+    Schreibt alle wartenden Records und beendet den Hintergrund-Schreiber.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,203 @@
+# ride_replay.py
+"""
+Spielt ein mit TelemetryRecorder aufgezeichnetes Fahrtprotokoll durch den echten UpdateLoopController,
+z. B. um die Pipeline auf echten Spuren am Desktop zu profilieren oder Empfehlungen nach einer Änderung
+mit der Aufzeichnung zu vergleichen.
+
+Aufruf:  python RideReplay.py fahrt.rtl [--speed 10] [--profile]
+"""
+
+import argparse
+import logging
+import math
+import sys
+import time
+from datetime import timedelta
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from Clock import ScaledClock, VirtualClock
+from DestinationManager import DestinationManager
+from GpsReader import GpsFix
+from RideLog import setup_logging
+from RideSimulator import fixed_route_provider
+from TelemetryRecorder import FLAG_ADVICE, FLAG_STALE, TelemetryLog
+from TickProfiler import TickProfiler
+from TrafficLightFetcher import TrafficLightFetcher
+from UpdateLoopController import UpdateLoopController
+from utils import as_route_array
+
+
+class ReplayCyclist:
+    """
+    Ersetzt Cyclist beim Nachspielen: get_fix() liefert den aufgezeichneten Datensatz zur aktuellen Fahrtzeit
+    der Uhr, set_advicde_speed() sammelt die neuen Empfehlungen zum Vergleich mit den aufgezeichneten.
+    """
+
+    def __init__(self, log: TelemetryLog, clock) -> None:
+        """
+        :param log: geöffnetes Fahrtprotokoll
+        :param clock: Uhr des Controllers (VirtualClock oder ScaledClock)
+        """
+        self.log = log
+        self.preferred_speed: float = log.preferred_speed
+        self.min_speed: float = log.min_speed
+        self.max_speed: float = log.max_speed
+        self._clock = clock
+        self._t: np.ndarray = log.records["t"]
+        self._origin: Optional[float] = None
+        self.index = 0
+        # (Datensatz-Index, Empfehlung in m/s, Distanz in m)
+        self.advice: List[Tuple[int, float, float]] = []
+
+    def _elapsed(self) -> float:
+        now = self._clock.monotonic()
+        if self._origin is None:
+            self._origin = now
+        return now - self._origin + float(self._t[0])
+
+    @property
+    def finished(self) -> bool:
+        return len(self._t) == 0 or self._elapsed() > self._t[-1]
+
+    def get_fix(self) -> GpsFix:
+        # letzter Datensatz, dessen Fahrtzeit erreicht ist
+        self.index = max(0, int(np.searchsorted(self._t, self._elapsed(), side="right")) - 1)
+        record = self.log.records[self.index]
+        return GpsFix(float(record["lat"]), float(record["lon"]), float(record["speed"]),
+                      float(record["t"]), bool(record["flags"] & FLAG_STALE))
+
+    def get_current_position(self) -> Tuple[float, float]:
+        return self.get_fix().position
+
+    def get_current_speed(self) -> float:
+        return self.get_fix().speed * 3.6
+
+    def get_wheel_speed(self) -> float:
+        wheel = float(self.log.records["wheel_speed"][self.index])
+        return wheel * 3.6 if not math.isnan(wheel) else 0.0
+
+    def set_advicde_speed(self, adviced_speed: float, distance: float, current_speed: Optional[float] = None) -> None:
+        """
+        :param adviced_speed: Empfehlung in km/h (wie bei Cyclist)
+        """
+        self.advice.append((self.index, adviced_speed / 3.6, distance))
+
+
+class ReplayResult(NamedTuple):
+    ticks: int              # Durchläufe der Update-Schleife
+    advice: int             # Ticks mit neuer Empfehlung
+    compared: int           # davon mit aufgezeichneter Empfehlung im selben Datensatz
+    mean_diff_kmh: float    # mittlere Abweichung neu gegen aufgezeichnet in km/h
+    max_diff_kmh: float
+    differing: int          # Vergleiche mit mehr als 0.5 km/h Abweichung
+    wall_time: float        # Sekunden Rechenzeit
+
+
+def trace_route(log: TelemetryLog) -> np.ndarray:
+    """
+    Route aus den gültigen Fixes des Protokolls (aufeinanderfolgende gleiche Positionen zusammengefasst)
+    und, falls aufgezeichnet, gerade weiter bis zum Ziel, damit ohne ORS nachgespielt werden kann.
+    """
+    records = log.records[(log.records["flags"] & FLAG_STALE) == 0]
+    points = np.column_stack([records["lat"], records["lon"]])
+    points = points[(points != 0.0).all(axis=1)]
+    if log.destination is not None:
+        points = np.vstack([points, log.destination])
+    if len(points) > 1:
+        keep = np.ones(len(points), dtype=bool)
+        keep[1:] = (np.diff(points, axis=0) != 0).any(axis=1)
+        points = points[keep]
+    return as_route_array(points)
+
+
+def replay_ride(
+    log: TelemetryLog,
+    fetcher: TrafficLightFetcher,
+    speed: float = 0.0,
+    route=None,
+    green_wave_lights: int = 0,
+    time_step: float = 1.0,
+    profiler: Optional[TickProfiler] = None
+) -> ReplayResult:
+    """
+    :param log: geöffnetes Fahrtprotokoll
+    :param fetcher: geladener TrafficLightFetcher
+    :param speed: Zeitraffer (10: zehnfach), 0 so schnell wie möglich mit virtueller Zeit
+    :param route: feste Route, ohne Angabe die aufgezeichnete Spur; ORS wird nicht gefragt
+    :param green_wave_lights: wie im UpdateLoopController
+    :param time_step: Tick der Update-Schleife in Sekunden (Fahrtzeit)
+    :param profiler: misst die Stufen jedes Ticks
+    """
+    clock = VirtualClock() if speed <= 0 else ScaledClock(speed)
+    route = trace_route(log) if route is None else as_route_array(route)
+    if len(route) < 2:
+        raise ValueError("Protokoll enthält keine Spur mit mindestens zwei Positionen")
+    DestinationManager.set_destination(tuple(route[-1]))
+
+    cyclist = ReplayCyclist(log, clock)
+    controller = UpdateLoopController(
+        fetcher, cyclist,
+        green_wave_lights=green_wave_lights,
+        clock=clock,
+        route_provider=fixed_route_provider(route),
+        interactive=False,
+        background_refresh=False,
+        profiler=profiler
+    )
+
+    wall_start = time.perf_counter()
+    controller.start_loop(stop_condition=lambda: cyclist.finished, time_step=timedelta(seconds=time_step))
+    wall = time.perf_counter() - wall_start
+
+    records = log.records
+    diffs = [
+        abs(v_opt - float(records["v_opt"][i])) * 3.6
+        for i, v_opt, _ in cyclist.advice
+        if records["flags"][i] & FLAG_ADVICE
+    ]
+    return ReplayResult(
+        ticks=controller.tick_id,
+        advice=len(cyclist.advice),
+        compared=len(diffs),
+        mean_diff_kmh=float(np.mean(diffs)) if diffs else 0.0,
+        max_diff_kmh=max(diffs, default=0.0),
+        differing=sum(1 for d in diffs if d > 0.5),
+        wall_time=wall
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Spielt ein Fahrtprotokoll durch die Update-Schleife.")
+    parser.add_argument("telemetry", help="mit TelemetryRecorder geschriebene Datei")
+    parser.add_argument("--lights", default="traffic_lights_venloer_bis_aachener.json")
+    parser.add_argument("--speed", type=float, default=0.0, help="Zeitraffer, 0: so schnell wie möglich")
+    parser.add_argument("--green-wave", type=int, default=0, help="Ampeln für den GreenWavePlanner")
+    parser.add_argument("--verbose", action="store_true", help="Debug-Log des Controllers anzeigen")
+    parser.add_argument("--profile", action="store_true", help="Stufenzeiten der Ticks ausgeben")
+    args = parser.parse_args(argv)
+    setup_logging(logging.DEBUG if args.verbose else logging.WARNING, rate_limit=0 if args.verbose else 10.0)
+
+    try:
+        log = TelemetryLog(args.telemetry)
+    except (OSError, ValueError) as e:
+        print(f"Konnte {args.telemetry} nicht lesen: {e}", file=sys.stderr)
+        sys.exit(1)
+    fetcher = TrafficLightFetcher()
+    if not fetcher.load_from_json(args.lights):
+        print(f"Konnte {args.lights} nicht laden.", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Protokoll: {log.summary()}")
+    profiler = TickProfiler() if args.profile else None
+    result = replay_ride(log, fetcher, speed=args.speed, green_wave_lights=args.green_wave, profiler=profiler)
+    print(f"{result.ticks} Ticks in {result.wall_time:.2f} s, {result.advice} Empfehlungen, "
+          f"{result.compared} verglichen: Abweichung Ø {result.mean_diff_kmh:.2f} km/h, "
+          f"max {result.max_diff_kmh:.2f} km/h, {result.differing} über 0.5 km/h")
+    if profiler is not None:
+        print("\n".join(profiler.format_summary()))
+
+
+if __name__ == "__main__":
+    main()
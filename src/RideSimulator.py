@@ -0,0 +1,328 @@
+# ride_simulator.py
+"""
+Deterministische Simulation kompletter Fahrten mit virtueller Zeit.
+
+Der echte UpdateLoopController (mit Selector, Fetcher und Advisor) wird mit einer VirtualClock und einem
+VirtualCyclist betrieben: sleep() stellt nur die Uhr vor, der Radfahrer folgt der Empfehlung und hält an
+roten Ampeln. Eine Fahrt über die Venloer Straße dauert so Millisekunden statt Minuten.
+
+Aufruf:  python RideSimulator.py --rides 100 --green-wave 5
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import math
+import sys
+import time
+from datetime import timedelta
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from Clock import VirtualClock
+from DestinationManager import DestinationManager
+from GpsReader import GpsFix
+from PositionTracker import PositionTracker
+from RideLog import setup_logging
+from RouteCorridor import RouteCorridor
+from TelemetryRecorder import TelemetryRecorder
+from TrafficLight import TrafficLight
+from TickProfiler import TickProfiler
+from TrafficLightFetcher import TrafficLightFetcher
+from UpdateLoopController import UpdateLoopController
+from ors_stub_server import straight_route
+from utils import as_route_array, cumulative_distances
+
+_MS = timedelta(milliseconds=1)
+
+
+class VirtualCyclist:
+    """
+    Simulierter Radfahrer mit derselben Schnittstelle wie Cyclist. Fährt entlang der Route, passt die
+    Geschwindigkeit mit begrenzter Beschleunigung an die letzte Empfehlung an und hält an roten Ampeln
+    (ohne Bremsweg) bis zum nächsten Grün.
+    """
+
+    def __init__(
+        self,
+        corridor: RouteCorridor,
+        preferred_speed: float = 6.0,
+        min_speed: float = 0.0,
+        max_speed: float = 8.0,
+        acceleration: float = 1.0,
+        crawl_speed: float = 0.5
+    ) -> None:
+        """
+        :param corridor: Korridor der gefahrenen Route, seine Ampeln bestimmen die Halte
+        :param preferred_speed: Wunschgeschwindigkeit in m/s, gefahren solange keine Empfehlung vorliegt
+        :param acceleration: maximale Geschwindigkeitsänderung in m/s²
+        :param crawl_speed: Mindestgeschwindigkeit beim Rollen in m/s, damit der Fahrer nie stehen bleibt
+        """
+        self.preferred_speed: float = preferred_speed
+        self.min_speed: float = min_speed
+        self.max_speed: float = max_speed
+        self.acceleration = acceleration
+        self.crawl_speed = crawl_speed
+
+        self._tracker = PositionTracker()
+        self._tracker.set_route(corridor.route, corridor.cum_distances)
+        self.total_length: float = self._tracker.total_length
+        self._lights: List[TrafficLight] = corridor.lights
+        self._offsets: List[float] = corridor.offsets.tolist()
+
+        self.along = 0.0
+        self.speed = preferred_speed
+        self.target_speed = preferred_speed
+        self.waiting = False
+        self._next_light = 0
+
+        # Statistik
+        self.ride_time = 0.0
+        self.stops = 0
+        self.wait_time = 0.0
+        self.greens = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.along >= self.total_length
+
+    def get_fix(self) -> GpsFix:
+        lat, lon = self._tracker.position_at(self.along)
+        return GpsFix(lat, lon, self.speed, self.ride_time, False)
+
+    def get_current_position(self) -> Tuple[float, float]:
+        return self._tracker.position_at(self.along)
+
+    def get_current_speed(self) -> float:
+        # wie Cyclist: km/h
+        return self.speed * 3.6
+
+    def set_advicde_speed(self, adviced_speed: float, distance: float, current_speed: Optional[float] = None) -> None:
+        """
+        :param adviced_speed: Empfehlung in km/h (wie bei Cyclist)
+        """
+        self.target_speed = max(self.min_speed, self.crawl_speed, min(adviced_speed / 3.6, self.max_speed))
+
+    def advance(self, now: timedelta, dt: float) -> None:
+        """
+        Bewegt den Fahrer um dt Sekunden ab der Fahrtzeit now (Zeitbasis der Ampelzyklen).
+        """
+        now_ms = now // _MS
+        while dt > 1e-9 and not self.finished:
+            if self.waiting:
+                is_green, remaining_ms = self._lights[self._next_light].get_phase_ms(now_ms)
+                if not is_green:
+                    wait = min(dt, remaining_ms / 1000)
+                    self.wait_time += wait
+                    self.ride_time += wait
+                    dt -= wait
+                    now_ms += round(wait * 1000)
+                    continue
+                self.waiting = False
+                self._next_light += 1
+
+            # Geschwindigkeit in Richtung Empfehlung ändern, Weg über mittlere Geschwindigkeit
+            delta = max(-self.acceleration * dt, min(self.target_speed - self.speed, self.acceleration * dt))
+            new_speed = self.speed + delta
+            step = (self.speed + new_speed) / 2 * dt
+
+            limit = self._offsets[self._next_light] if self._next_light < len(self._lights) else self.total_length
+            if self.along + step < limit or step <= 0:
+                self.along += step
+                self.speed = new_speed
+                self.ride_time += dt
+                return
+
+            # Ampel bzw. Ziel wird in diesem Schritt erreicht
+            used = dt * (limit - self.along) / step
+            self.along = limit
+            self.speed = self.speed + delta * used / dt
+            self.ride_time += used
+            dt -= used
+            now_ms += round(used * 1000)
+            if self._next_light >= len(self._lights):
+                return
+            is_green, _ = self._lights[self._next_light].get_phase_ms(now_ms)
+            if is_green:
+                self.greens += 1
+                self._next_light += 1
+            else:
+                self.stops += 1
+                self.waiting = True
+                self.speed = 0.0
+
+
+class RideResult(NamedTuple):
+    travel_time: float   # Sekunden bis zum Ziel
+    stops: int           # Halte an roten Ampeln
+    wait_time: float     # Sekunden an roten Ampeln
+    greens: int          # bei Grün passierte Ampeln
+    lights: int          # Ampeln auf der Route
+    ticks: int           # Durchläufe der Update-Schleife
+    finished: bool       # Ziel innerhalb von max_time erreicht
+
+
+def fixed_route_provider(route) -> Callable[[Tuple[float, float], Tuple[float, float]], np.ndarray]:
+    """
+    Route-Provider, der unabhängig von Start und Ziel immer dieselbe Route liefert (ohne ORS).
+    """
+    route = as_route_array(route)
+    return lambda start, end: route
+
+
+def route_through(points: Sequence[Tuple[float, float]], step: float = 20.0) -> np.ndarray:
+    """
+    Polylinie durch die gegebenen Punkte, alle `step` Meter ein Wegpunkt.
+    """
+    route: List[List[float]] = []
+    for a, b in zip(points, points[1:]):
+        leg = [[lat, lon] for lon, lat in straight_route(a, b, step)]  # ORS-Format [lon, lat]
+        route.extend(leg if not route else leg[1:])
+    return as_route_array(route)
+
+
+def default_route(fetcher: TrafficLightFetcher, start: Tuple[float, float] = (50.948172, 6.932064)) -> np.ndarray:
+    """
+    Route ohne ORS: vom Standardstart über alle geladenen Ampeln (nach Entfernung sortiert) bis zur letzten.
+    """
+    lights = sorted(
+        (fetcher._all_traffic_lights[i].get_location() for i in range(len(fetcher._all_traffic_lights))),
+        key=lambda loc: math.dist(loc, start)
+    )
+    return route_through([start, *lights])
+
+
+def simulate_ride(
+    fetcher: TrafficLightFetcher,
+    route,
+    preferred_speed: float = 6.0,
+    min_speed: float = 0.0,
+    max_speed: float = 8.0,
+    green_wave_lights: int = 0,
+    offset_shift: float = 0.0,
+    offset_step: float = 0.0,
+    time_step: float = 1.0,
+    max_time: float = 3600.0,
+    quiet: bool = True,
+    profiler: Optional[TickProfiler] = None,
+    recorder: Optional[TelemetryRecorder] = None
+) -> RideResult:
+    """
+    Fährt die Route einmal komplett mit virtueller Zeit und dem echten UpdateLoopController ab.
+
+    :param fetcher: geladener TrafficLightFetcher
+    :param route: Wegpunkte der Fahrt, dienen auch als Ergebnis jeder Routen-Neuberechnung
+    :param offset_shift: Sekunden, um die alle Ampelzyklen für diese Fahrt verschoben werden
+                         (entspricht einem anderen Startzeitpunkt der Fahrt)
+    :param offset_step: zusätzlicher Versatz in Sekunden je Ampel in Fahrtreihenfolge (i-te Ampel: i · offset_step)
+    :param time_step: Tick der Update-Schleife in Sekunden
+    :param max_time: Abbruch nach dieser Fahrtzeit in Sekunden
+    :param quiet: Ausgaben des Controllers unterdrücken
+    :param profiler: misst die Stufen jedes Ticks (Rechenzeit, nicht virtuelle Zeit)
+    :param recorder: schreibt die Fahrt als Protokoll zum Nachspielen (RideReplay)
+    """
+    route = as_route_array(route)
+    clock = VirtualClock()
+    output = contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+    with output:
+        corridor = fetcher.build_corridor(route, cum_distances=cumulative_distances(route))
+        # Die Simulation braucht die Zyklen aller Ampeln von Anfang an, nicht erst wenn sie "nächste" werden
+        for light in corridor.lights:
+            UpdateLoopController.ensure_timing(light)
+        saved_offsets = [light.offset_ms for light in corridor.lights]
+        for i, light in enumerate(corridor.lights):
+            shift_ms = round((offset_shift + i * offset_step) * 1000)
+            light.set_timing_ms(light.green_ms, light.red_ms, light.offset_ms + shift_ms)
+
+        cyclist = VirtualCyclist(corridor, preferred_speed, min_speed, max_speed)
+        DestinationManager.set_destination(tuple(route[-1]))
+        controller = UpdateLoopController(
+            fetcher, cyclist,
+            green_wave_lights=green_wave_lights,
+            clock=clock,
+            route_provider=fixed_route_provider(route),
+            interactive=False,
+            background_refresh=False,
+            profiler=profiler,
+            recorder=recorder
+        )
+        clock.add_listener(lambda before, dt: cyclist.advance(before - controller.initTime, dt))
+
+        ticks = 0
+
+        def done() -> bool:
+            nonlocal ticks
+            ticks += 1
+            return cyclist.finished or cyclist.ride_time >= max_time
+
+        try:
+            controller.start_loop(stop_condition=done, time_step=timedelta(seconds=time_step))
+        finally:
+            for light, offset_ms in zip(corridor.lights, saved_offsets):
+                light.set_timing_ms(light.green_ms, light.red_ms, offset_ms)
+
+    return RideResult(
+        travel_time=cyclist.ride_time,
+        stops=cyclist.stops,
+        wait_time=cyclist.wait_time,
+        greens=cyclist.greens,
+        lights=len(corridor.lights),
+        ticks=ticks - 1,
+        finished=cyclist.finished
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Simuliert Fahrten mit virtueller Zeit.")
+    parser.add_argument("--lights", default="traffic_lights_venloer_bis_aachener.json")
+    parser.add_argument("--rides", type=int, default=1, help="Anzahl Fahrten, jede um eine Sekunde später gestartet")
+    parser.add_argument("--green-wave", type=int, default=0, help="Ampeln für den GreenWavePlanner (0: SpeedAdvisor)")
+    parser.add_argument("--speed", type=float, default=6.0, help="Wunschgeschwindigkeit in m/s")
+    parser.add_argument("--verbose", action="store_true", help="Ausgaben und Debug-Log des Controllers anzeigen")
+    parser.add_argument("--profile", action="store_true", help="Stufenzeiten der Ticks ausgeben")
+    parser.add_argument("--record", help="Fahrtprotokoll der ersten Fahrt in diese Datei schreiben")
+    args = parser.parse_args(argv)
+    setup_logging(logging.DEBUG if args.verbose else logging.WARNING, rate_limit=0 if args.verbose else 10.0)
+
+    fetcher = TrafficLightFetcher()
+    if not fetcher.load_from_json(args.lights):
+        print(f"Konnte {args.lights} nicht laden.", file=sys.stderr)
+        sys.exit(1)
+
+    route = default_route(fetcher)
+
+    profiler = TickProfiler() if args.profile else None
+    wall_start = time.perf_counter()
+    results = []
+    for ride in range(args.rides):
+        recorder = None
+        if args.record and ride == 0:
+            recorder = TelemetryRecorder(args.record, args.speed, destination=tuple(route[-1]))
+        result = simulate_ride(
+            fetcher, route,
+            preferred_speed=args.speed,
+            green_wave_lights=args.green_wave,
+            offset_shift=-ride,
+            quiet=not args.verbose,
+            profiler=profiler,
+            recorder=recorder
+        )
+        if recorder is not None:
+            recorder.close()
+        results.append(result)
+    wall = time.perf_counter() - wall_start
+
+    simulated = sum(r.travel_time for r in results)
+    print(f"{len(results)} Fahrten, {simulated:.0f} s simuliert in {wall:.2f} s ({simulated / wall:.0f}x Echtzeit)")
+    print(f"Fahrzeit Ø {simulated / len(results):.1f} s, "
+          f"Halte Ø {sum(r.stops for r in results) / len(results):.2f}, "
+          f"Wartezeit Ø {sum(r.wait_time for r in results) / len(results):.1f} s, "
+          f"grün passiert Ø {sum(r.greens for r in results) / len(results):.2f}/{results[0].lights}")
+    if profiler is not None:
+        print("\n".join(profiler.format_summary()))
+
+
+if __name__ == "__main__":
+    main()
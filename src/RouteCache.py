@@ -0,0 +1,129 @@
+# route_cache.py
+"""
+Persistenter Routen-Cache auf der Festplatte, Schlüssel sind gerasterte Start-/Zielzellen.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from math import cos, floor, radians
+from typing import Optional, Tuple
+
+import numpy as np
+
+from RideLog import get_logger
+from utils import as_route_array
+
+log = get_logger("route_cache")
+
+METERS_PER_DEG_LAT = 111320.0
+
+
+class RouteCache:
+    """
+    LRU-Cache für Routen mit Größenlimit und TTL, der als JSON-Datei gespeichert wird.
+    Start und Ziel werden auf Zellen von `cell_size` Metern gerastert, sodass dieselbe Pendelstrecke
+    auch bei leicht abweichender GPS-Position wieder gefunden wird.
+    """
+
+    def __init__(
+        self,
+        filename: Optional[str],
+        cell_size: float = 50.0,
+        max_entries: int = 64,
+        ttl: float = 7 * 24 * 3600.0
+    ) -> None:
+        """
+        :param filename: Pfad der Cache-Datei, None für einen reinen In-Memory-Cache
+        :param cell_size: Kantenlänge der Rasterzellen in Metern
+        :param max_entries: maximale Anzahl gespeicherter Routen (älteste Nutzung fliegt zuerst)
+        :param ttl: Gültigkeit eines Eintrags in Sekunden
+        """
+        self.filename = filename
+        self.cell_size = cell_size
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._load()
+
+    def _cell(self, point: Tuple[float, float]) -> Tuple[int, int]:
+        lat_step = self.cell_size / METERS_PER_DEG_LAT
+        row = floor(point[0] / lat_step)
+        lon_step = self.cell_size / (METERS_PER_DEG_LAT * cos(radians(row * lat_step)))
+        return row, floor(point[1] / lon_step)
+
+    def key(self, start: Tuple[float, float], end: Tuple[float, float]) -> str:
+        (r1, c1), (r2, c2) = self._cell(start), self._cell(end)
+        return f"{r1},{c1}|{r2},{c2}"
+
+    def get(
+        self,
+        start: Tuple[float, float],
+        end: Tuple[float, float],
+        allow_stale: bool = False
+    ) -> Optional[np.ndarray]:
+        """
+        Liefert die gecachte Route zwischen den Zellen von start und end.
+        :param allow_stale: auch abgelaufene Einträge liefern (Offline-Fallback)
+        :return: N×2-Array oder None
+        """
+        key = self.key(start, end)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expired = time.time() - entry["created"] > self.ttl
+            if expired and not allow_stale:
+                self.misses += 1
+                return None
+            if expired:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            self._entries.move_to_end(key)
+            route = entry["route"]
+        return as_route_array(route)
+
+    def put(self, start: Tuple[float, float], end: Tuple[float, float], route: np.ndarray) -> None:
+        """
+        Speichert eine Route und schreibt den Cache auf die Festplatte.
+        """
+        key = self.key(start, end)
+        with self._lock:
+            self._entries[key] = {"created": time.time(), "route": as_route_array(route).tolist()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def _load(self) -> None:
+        if not self.filename:
+            return
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        for key, entry in data.get("entries", []):
+            self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _save(self) -> None:
+        if not self.filename:
+            return
+        # Erst in temporäre Datei schreiben, dann atomar ersetzen
+        tmp = f"{self.filename}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({"entries": list(self._entries.items())}, f)
+            os.replace(tmp, self.filename)
+        except OSError as e:
+            log.warning("Route-Cache konnte nicht gespeichert werden: %s", e)
@@ -0,0 +1,78 @@
+# route_corridor.py
+"""
+Einmal pro Route berechneter Korridor: relevante Ampeln in Fahrtreihenfolge mit ihren Routen-Offsets.
+"""
+
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from TrafficLight import TrafficLight
+from utils import as_route_array, cumulative_distances
+
+
+class RouteCorridor:
+    """
+    Hält für eine Route die sortierten Ampeln, je Ampel Segmentindex, Parameter t auf dem Segment
+    und die Distanz ab Routenanfang. Wird nur bei einer neuen Route neu gebaut.
+    """
+
+    def __init__(
+        self,
+        route: np.ndarray,
+        lights: List[TrafficLight],
+        segments: List[int],
+        ts: List[float],
+        cum_distances: Optional[np.ndarray] = None
+    ) -> None:
+        """
+        :param route: N×2-Array der Wegpunkte
+        :param lights: Ampeln sortiert nach (Segment, t)
+        :param segments: Segmentindex je Ampel
+        :param ts: Parameter t in [0, 1] je Ampel
+        :param cum_distances: akkumulierte Distanzen je Wegpunkt, werden sonst berechnet
+        """
+        self.route: np.ndarray = as_route_array(route)
+        self.cum_distances: np.ndarray = (
+            cum_distances if cum_distances is not None else cumulative_distances(self.route)
+        )
+        self.lights: List[TrafficLight] = lights
+        self.segments: np.ndarray = np.asarray(segments, dtype=np.int64)
+        self.ts: np.ndarray = np.asarray(ts, dtype=np.float64)
+
+        if len(self.lights):
+            seg_len = self.cum_distances[self.segments + 1] - self.cum_distances[self.segments]
+            self.offsets: np.ndarray = self.cum_distances[self.segments] + self.ts * seg_len
+        else:
+            self.offsets = np.zeros(0, dtype=np.float64)
+        self._offset_list: List[float] = self.offsets.tolist()
+        self._offset_by_id: Dict[str, float] = {
+            light.id: off for light, off in zip(self.lights, self._offset_list)
+        }
+
+    def __len__(self) -> int:
+        return len(self.lights)
+
+    def offset_of(self, light: TrafficLight) -> Optional[float]:
+        """
+        Distanz der Ampel ab Routenanfang in Metern, None falls sie nicht im Korridor liegt.
+        """
+        return self._offset_by_id.get(light.id)
+
+    def next_index(self, position_along: float) -> int:
+        """
+        Index der ersten Ampel mit Offset größer als die gegebene Position (len(self), falls alle passiert).
+        """
+        return bisect_right(self._offset_list, position_along)
+
+    def upcoming(self, position_along: float, count: int) -> Tuple[List[TrafficLight], List[float]]:
+        """
+        Die nächsten `count` noch nicht passierten Ampeln mit ihrer Restdistanz entlang der Route.
+        """
+        start = self.next_index(position_along)
+        stop = min(start + count, len(self.lights))
+        return (
+            self.lights[start:stop],
+            [off - position_along for off in self._offset_list[start:stop]]
+        )
@@ -0,0 +1,73 @@
+# route_cursor.py
+"""
+Inkrementelles Map-Matching: merkt sich das zuletzt zugeordnete Routensegment.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+from utils import project_onto_route
+
+
+class RouteCursor:
+    """
+    Ordnet Positionen einer Route zu und sucht dabei nur in einem kleinen Fenster um das zuletzt
+    gefundene Segment. Springt die Position zu weit (z. B. GPS-Aussetzer oder neue Route), wird
+    einmal die ganze Route durchsucht.
+    """
+
+    def __init__(
+        self,
+        route: np.ndarray,
+        cum_distances: np.ndarray,
+        window_back: int = 1,
+        window_ahead: int = 8,
+        max_offset: float = 25.0
+    ) -> None:
+        """
+        :param route: N×2-Array der Wegpunkte
+        :param cum_distances: akkumulierte Distanzen je Wegpunkt
+        :param window_back: Segmente hinter dem letzten Treffer, die mitgeprüft werden
+        :param window_ahead: Segmente vor dem letzten Treffer, die mitgeprüft werden
+        :param max_offset: seitlicher Abstand in Metern, ab dem das Fenster als verfehlt gilt
+        """
+        self.route = route
+        self.cum_distances = cum_distances
+        self.window_back = window_back
+        self.window_ahead = window_ahead
+        self.max_offset = max_offset
+        self.segment: int = -1  # -1: noch keine Zuordnung
+        self.full_searches: int = 0
+
+    def reset(self) -> None:
+        self.segment = -1
+
+    def locate(self, point: Tuple[float, float]) -> float:
+        """
+        Projiziert den Punkt auf die Route und gibt die Distanz ab Routenanfang zurück.
+        :param point: (lat, lon)
+        :return: Distanz entlang der Route in Metern
+        """
+        n_segments = len(self.route) - 1
+        if n_segments < 1:
+            return 0.0
+
+        if self.segment >= 0:
+            lo = max(0, self.segment - self.window_back)
+            hi = min(n_segments, self.segment + self.window_ahead + 1)
+            seg, t, along, offset = project_onto_route(
+                [point], self.route, self.cum_distances, lo, hi
+            )
+            seg_i, t_i = int(seg[0]), float(t[0])
+            # Treffer am Fensterrand ist nicht eindeutig → volle Suche
+            at_edge = (seg_i == hi - 1 and t_i >= 1.0 and hi < n_segments) or \
+                      (seg_i == lo and t_i <= 0.0 and lo > 0)
+            if offset[0] <= self.max_offset and not at_edge:
+                self.segment = seg_i
+                return float(along[0])
+
+        self.full_searches += 1
+        seg, _, along, _ = project_onto_route([point], self.route, self.cum_distances)
+        self.segment = int(seg[0])
+        return float(along[0])
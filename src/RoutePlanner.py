@@ -1,45 +1,74 @@
 # route_planner.py
 """
 Nutzt die OpenRouteService API, um eine echte Route zu holen.
+Routen werden in einem persistenten Cache abgelegt und ohne Netz von dort geliefert.
+Die Requests laufen über einen langlebigen OrsClient (Keep-alive, Wiederholungen, Circuit Breaker).
 """
 
-from typing import List, Tuple
+from typing import Dict, Tuple
 
-import requests
+import numpy as np
 import os
 
-ORS_BASE_URL = "https://api.openrouteservice.org/v2/directions/driving-car"
+from OrsClient import OrsClient, OrsError
+from RideLog import get_logger
+from RouteCache import RouteCache
+
+ORS_BASE_URL = os.environ.get("ORS_BASE_URL", "https://api.openrouteservice.org/v2/directions/driving-car")
 ORS_API_KEY = os.environ.get("ORS_API_KEY")
+ROUTE_CACHE_FILE = os.environ.get("ROUTE_CACHE_FILE", "route_cache.json")
+
+_route_cache = RouteCache(ROUTE_CACHE_FILE or None)
+# eine Session für alle Routen: Verbindungen bleiben offen, Wiederholungen und Circuit Breaker im Client
+_ors_client = OrsClient(ORS_BASE_URL, ORS_API_KEY)
+
+log = get_logger("route")
+
 
-def compute_route(start: Tuple[float, float], end: Tuple[float, float]) -> List[Tuple[float, float]]:
+def compute_route(start: Tuple[float, float], end: Tuple[float, float], cache: bool = True) -> np.ndarray:
     """
-    Ruft die ORS-API auf und gibt eine Liste von (lat, lon)-Punkten zurück.
+    Ruft die ORS-API auf und gibt die Route als kompaktes N×2-Array von (lat, lon)-Punkten zurück.
+    Liegt für Start- und Zielzelle eine gültige Route im Cache, wird diese sofort geliefert;
+    schlägt der Request auch nach Wiederholungen fehl, wird auch eine abgelaufene Route aus dem Cache genutzt.
     :param start: (lat, lon)
     :param end:   (lat, lon)
-    :return: Liste von Wegpunkten
+    :param cache: neue Route im Cache ablegen; nur für Routen ab Fahrtbeginn sinnvoll, siehe refresh_route
+    :return: Wegpunkte als float64-Array der Form (N, 2)
     """
+    cached = _route_cache.get(start, end)
+    if cached is not None:
+        return cached
+
     if ORS_API_KEY is None:
+        stale = _route_cache.get(start, end, allow_stale=True)
+        if stale is not None:
+            return stale
         raise RuntimeError("OpenRouteService API key nicht gesetzt in ORS_API_KEY")
 
-    # OpenRouteService erwartet lon,lat
-    start_str = f"{start[1]},{start[0]}"
-    end_str = f"{end[1]},{end[0]}"
-
-    params = {
-        "api_key": ORS_API_KEY,
-        "start": start_str,
-        "end": end_str
-    }
     try:
-        resp = requests.get(ORS_BASE_URL, params=params, timeout=10)
-        resp.raise_for_status()
-    except requests.RequestException as e:
-        raise RuntimeError(f"Fehler beim ORS-Request: {e}")
+        route = _ors_client.directions(start, end)
+    except OrsError as e:
+        # Offline oder ORS gestört: letzte bekannte Route nutzen, auch wenn sie abgelaufen ist
+        stale = _route_cache.get(start, end, allow_stale=True)
+        if stale is not None:
+            log.warning("ORS nicht erreichbar, nutze gecachte Route: %s", e, extra={"stage": "route"})
+            return stale
+        raise
+    if cache:
+        _route_cache.put(start, end, route)
+    return route
 
-    data = resp.json()
 
-    # GeoJSON FeatureCollection → erstes Feature → geometry.coordinates
-    coords: List[List[float]] = data["features"][0]["geometry"]["coordinates"]
-    # Umwandeln in List[Tuple[lat, lon]]
-    route: List[Tuple[float, float]] = [(lat, lon) for lon, lat in coords]
-    return route
+def refresh_route(start: Tuple[float, float], end: Tuple[float, float]) -> np.ndarray:
+    """
+    Neuberechnung unterwegs: wie compute_route, legt die Route aber nicht im Cache ab. Sonst verdrängten
+    die Zellen entlang der Strecke die Pendelrouten und die Datei würde alle 30 Ticks neu geschrieben.
+    """
+    return compute_route(start, end, cache=False)
+
+
+def ors_metrics() -> Dict[str, float]:
+    """
+    Kennzahlen des gemeinsamen OrsClient (Aufrufe, Wiederholungen, Fehler, Circuit Breaker).
+    """
+    return _ors_client.get_metrics()
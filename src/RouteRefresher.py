@@ -0,0 +1,168 @@
+# route_refresher.py
+"""
+Berechnet Routen im Hintergrund neu, damit die Update-Schleife nicht auf ORS warten muss.
+"""
+
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from RideLog import get_logger
+from RoutePlanner import refresh_route
+from TrafficLightSelector import TrafficLightSelector
+
+log = get_logger("refresher")
+
+class RouteRefresher:
+    """
+    Führt refresh_route in einem Worker-Thread aus und bereitet dort mit `prepare` auch den
+    routenabhängigen Zustand (Korridor, Selector) vor. Die Update-Schleife fragt pro Tick mit poll()
+    nach und tauscht Route und Zustand gemeinsam aus.
+
+    Es läuft höchstens eine Neuberechnung gleichzeitig: Anfragen während einer laufenden Berechnung
+    werden verworfen (dropped). Ergebnisse einer durch invalidate() oder eine neue Anfrage überholten
+    Berechnung werden nicht übernommen (superseded).
+    """
+
+    def __init__(
+        self,
+        route_provider: Callable[[Tuple[float, float], Tuple[float, float]], np.ndarray] = refresh_route,
+        prepare: Optional[Callable[[np.ndarray], Any]] = None,
+        latency_samples: int = 100,
+        background: bool = True
+    ) -> None:
+        """
+        :param route_provider: berechnet die Route zwischen Start und Ziel
+        :param prepare: baut aus der neuen Route den Zustand für die Schleife, Standard: ein TrafficLightSelector
+        :param latency_samples: Anzahl der für die Metriken gespeicherten Latenzen
+        :param background: False rechnet direkt in request() (reproduzierbar, z. B. für die Simulation);
+                           das Ergebnis wird trotzdem erst beim nächsten poll() übernommen
+        """
+        self._route_provider = route_provider
+        self._prepare = prepare if prepare is not None else self._selector_for
+        self._executor: Optional[ThreadPoolExecutor] = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="route-refresh") if background else None
+        )
+        self._future: Optional[Future] = None
+        self._generation = 0
+
+        # Metriken
+        self.latencies: deque = deque(maxlen=latency_samples)
+        self.last_latency: Optional[float] = None
+        self.requested = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.superseded = 0
+
+    @property
+    def pending(self) -> bool:
+        """
+        True, solange eine Berechnung läuft oder ihr Ergebnis noch nicht mit poll() abgeholt wurde.
+        """
+        return self._future is not None
+
+    def request(
+        self,
+        start: Tuple[float, float],
+        destination: Tuple[float, float],
+        provider: Optional[Callable[[Tuple[float, float], Tuple[float, float]], np.ndarray]] = None
+    ) -> bool:
+        """
+        Startet eine Neuberechnung im Hintergrund.
+        :param provider: abweichende Routenquelle nur für diese Anfrage, z. B. die Route ab Fahrtbeginn über den
+                         Routen-Cache
+        :return: False, wenn bereits eine Berechnung läuft und die Anfrage verworfen wurde
+        """
+        if self._future is not None:
+            if not self._future.done():
+                self.dropped += 1
+                return False
+            # fertig, aber nie mit poll() abgeholt: wird von dieser Anfrage überholt
+            self.superseded += 1
+        self._generation += 1
+        self.requested += 1
+        provider = provider if provider is not None else self._route_provider
+        if self._executor is None:
+            self._future = Future()
+            try:
+                self._future.set_result(self._compute(self._generation, time.monotonic(), provider, start, destination))
+            except Exception as e:
+                self._future.set_exception(e)
+            return True
+        self._future = self._executor.submit(
+            self._compute, self._generation, time.monotonic(), provider, start, destination
+        )
+        return True
+
+    def _compute(
+        self,
+        generation: int,
+        submitted: float,
+        provider: Callable[[Tuple[float, float], Tuple[float, float]], np.ndarray],
+        start: Tuple[float, float],
+        destination: Tuple[float, float]
+    ) -> Tuple[int, float, float, np.ndarray, Any]:
+        route = provider(start, destination)
+        prepared = self._prepare(route)
+        # Latenz bis zum Ende der Arbeit, nicht bis zum nächsten poll() der Schleife
+        return generation, submitted, time.monotonic(), route, prepared
+
+    @staticmethod
+    def _selector_for(route: np.ndarray) -> TrafficLightSelector:
+        selector = TrafficLightSelector()
+        selector.set_route(route)
+        return selector
+
+    def invalidate(self) -> None:
+        """
+        Markiert eine eventuell laufende Berechnung als überholt, z. B. nach einer synchron gesetzten Route.
+        """
+        self._generation += 1
+
+    def poll(self) -> Optional[Tuple[np.ndarray, Any]]:
+        """
+        Nicht blockierend: liefert (Route, vorbereiteter Zustand), sobald eine aktuelle Neuberechnung
+        fertig ist, sonst None.
+        """
+        if self._future is None or not self._future.done():
+            return None
+        future, self._future = self._future, None
+        try:
+            generation, submitted, finished, route, prepared = future.result()
+        except Exception as e:
+            self.failed += 1
+            log.warning("Routen-Neuberechnung fehlgeschlagen, behalte alte Route: %s", e, extra={"stage": "route"})
+            return None
+
+        self.last_latency = finished - submitted
+        self.latencies.append(self.last_latency)
+        if generation != self._generation:
+            self.superseded += 1
+            return None
+        self.completed += 1
+        return route, prepared
+
+    def get_metrics(self) -> Dict[str, float]:
+        """
+        Kennzahlen zu Latenz (Sekunden) und Anzahl der Neuberechnungen.
+        """
+        samples = sorted(self.latencies)
+        return {
+            "requested": self.requested,
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "superseded": self.superseded,
+            "in_flight": int(self._future is not None and not self._future.done()),
+            "latency_last_s": self.last_latency if self.last_latency is not None else float('nan'),
+            "latency_p50_s": samples[len(samples) // 2] if samples else float('nan'),
+            "latency_max_s": samples[-1] if samples else float('nan'),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
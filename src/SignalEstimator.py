@@ -0,0 +1,477 @@
+# signal_estimator.py
+"""
+Lernt Zykluslänge, Versatz und Grünanteil einzelner Ampeln aus dem, was der Fahrer an ihnen erlebt:
+Anhalten (rot), Anfahren nach dem Halt (Grünbeginn) und Durchfahren (grün).
+
+Ein Fahrer sieht eine Ampel meist nur einmal pro Fahrt, zwischen zwei Grünbeginnen liegen also Stunden oder
+Tage und damit unbekannt viele Zyklen. Deshalb wird die Zykluslänge nicht nachgeführt, sondern aus einem
+festen Raster von Kandidaten (min_cycle..max_cycle in Schritten von cycle_step) gewählt: Für jeden Kandidaten
+ergibt sich aus den Grünbeginnen modulo Zyklus eine Phase und deren Streuung, Halt und Durchfahrt müssen in
+Rot bzw. Grün fallen und die Wartezeit nach einem Halt muss in den Zyklus passen. Vielfache und Teiler des
+wahren Zyklus passen zu den Grünbeginnen ebenso gut und scheiden erst über Halt und Durchfahrt aus; solange
+ein anderer Kandidat fast ebenso gut passt, bleibt die Konfidenz niedrig.
+
+Je Ampel werden nur die letzten `window` Ereignisse jeder Art gehalten, der Aufwand je Ereignis ist also
+durch Kandidaten × Fenster beschränkt und wächst nicht mit der Zahl der Fahrten. Trotzdem sind das einige
+Millisekunden je Ereignis; Anpassung und Speichern laufen deshalb in einem eigenen Worker-Thread auf Kopien
+der Ereignisse, der Tick übernimmt fertige Ergebnisse mit poll(). Die Ereignisse werden in
+Sekunden seit 1970 geführt und als JSON gespeichert, so dass sie über Fahrten hinweg gelten; in die
+TrafficLight-Parameter (Zeitbasis: Fahrtzeit) werden sie beim Übernehmen umgerechnet.
+"""
+
+import json
+import math
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from RideLog import get_logger
+from TrafficLight import TrafficLight
+
+log = get_logger("estimator")
+
+SIGNAL_ESTIMATES_FILE = "signal_estimates.json"
+
+
+class LightEstimate:
+    """
+    Beobachtungen und Schätzung für eine Ampel. Alle Zeiten in Sekunden, Zeitpunkte in Sekunden seit 1970.
+    """
+
+    __slots__ = ("starts", "reds", "passes", "gaps", "anchor", "cycle", "green", "spread", "confidence", "updated")
+
+    def __init__(self) -> None:
+        self.starts: List[float] = []   # beobachtete Grünbeginne
+        self.reds: List[float] = []     # Halt an der Ampel (rot)
+        self.passes: List[float] = []   # Durchfahrt ohne Halt (grün)
+        self.gaps: List[float] = []     # Wartezeit vom Halt bis zum Grünbeginn
+        # Ergebnis der letzten Anpassung, cycle = 0 ohne Schätzung
+        self.anchor = 0.0               # geschätzter Grünbeginn nahe dem letzten beobachteten
+        self.cycle = 0.0
+        self.green = 0.0
+        self.spread = 0.0               # RMS-Abweichung der Grünbeginne von der Schätzung
+        self.confidence = 0.0
+        self.updated = 0.0
+
+    @property
+    def count(self) -> int:
+        return len(self.starts)
+
+    def position_in_cycle(self, t: float) -> float:
+        """
+        Sekunden seit dem letzten geschätzten Grünbeginn vor t.
+        """
+        return (t - self.anchor) % self.cycle
+
+    def to_dict(self) -> dict:
+        # Listen kopiert, damit der Worker beim Speichern nicht die Listen liest, an die der Tick anhängt
+        return {name: list(value) if isinstance(value, list) else value
+                for name, value in ((name, getattr(self, name)) for name in self.__slots__)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LightEstimate":
+        estimate = cls()
+        for name in cls.__slots__:
+            if name in data:
+                setattr(estimate, name, data[name])
+        return estimate
+
+
+class _Fit(NamedTuple):
+    anchor: float
+    cycle: float
+    green: float
+    spread: float
+    confidence: float
+
+
+class SignalEstimator:
+    """
+    Erkennt Halt/Anfahren/Durchfahren aus den Werten je Tick (observe) und passt danach die Schätzung der
+    betroffenen Ampel neu an.
+    """
+
+    def __init__(
+        self,
+        filename: Optional[str] = None,
+        min_cycle: float = 20.0,
+        max_cycle: float = 180.0,
+        cycle_step: float = 0.1,
+        window: int = 32,
+        min_starts: int = 3,
+        start_tolerance: float = 4.0,
+        jitter: float = 1.5,
+        violation_cost: float = 2.0,
+        min_green: float = 5.0,
+        min_confidence: float = 0.5,
+        go_delay: float = 2.0,
+        stop_distance: float = 30.0,
+        stop_speed: float = 1.0,
+        go_speed: float = 2.0,
+        pass_distance: float = 50.0,
+        save_interval: float = 30.0,
+        background: bool = True
+    ) -> None:
+        """
+        :param filename: JSON-Datei für die Schätzungen, wird beim Start gelesen; None hält sie nur im Speicher
+        :param min_cycle: kürzester Kandidat für die Zykluslänge in s
+        :param max_cycle: längster Kandidat in s
+        :param cycle_step: Rasterweite der Kandidaten in s (Festzeitsteuerungen laufen in ganzen Sekunden)
+        :param window: gehaltene Ereignisse je Art und Ampel
+        :param min_starts: Grünbeginne, ab denen geschätzt wird
+        :param start_tolerance: Grünbeginne, die weiter als so viele Sekunden von der Phase eines Kandidaten
+                                liegen, zählen für ihn als Widerspruch
+        :param jitter: erwartete Streuung erkannter Grünbeginne in s (Reaktion, GPS)
+        :param violation_cost: Gewicht eines Widerspruchs gegenüber der Streuung der Grünbeginne
+        :param min_green: kürzeste Grün- bzw. Rotphase in s
+        :param min_confidence: ab dieser Konfidenz wird eine Schätzung in die Ampel übernommen
+        :param go_delay: Sekunden zwischen Grünbeginn und erkanntem Anfahren (Reaktion und Beschleunigung)
+        :param stop_distance: Halt zählt nur bis zu dieser Entfernung zur Ampel in m
+        :param stop_speed: darunter gilt der Fahrer als stehend (m/s)
+        :param go_speed: darüber gilt er nach einem Halt als angefahren (m/s)
+        :param pass_distance: Wechsel der nächsten Ampel zählt als Durchfahrt, wenn die vorige so nah war (m)
+        :param save_interval: Mindestabstand zwischen zwei Schreibvorgängen der Datei in Sekunden
+        :param background: Anpassung und Speichern im Worker-Thread, übernommen wird mit poll(); False rechnet
+                           direkt beim Ereignis (reproduzierbar, z. B. für die Simulation)
+        """
+        self.filename = filename
+        self.candidates = np.arange(min_cycle, max_cycle + cycle_step / 2, cycle_step)
+        self.cycle_step = cycle_step
+        self.window = window
+        self.min_starts = min_starts
+        self.start_tolerance = start_tolerance
+        self.jitter = jitter
+        self.violation_cost = violation_cost
+        self.min_green = min_green
+        self.min_confidence = min_confidence
+        self.go_delay = go_delay
+        self.stop_distance = stop_distance
+        self.stop_speed = stop_speed
+        self.go_speed = go_speed
+        self.pass_distance = pass_distance
+        self.save_interval = save_interval
+
+        self._estimates: Dict[str, LightEstimate] = {}
+        self._ride_start = 0.0
+        self._light: Optional[TrafficLight] = None
+        self._last_distance = math.inf
+        self._stopped_at: Optional[float] = None
+        self._dirty = False
+        self._last_save = -math.inf
+        self._executor: Optional[ThreadPoolExecutor] = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="signal-fit") if background else None
+        )
+        # Ampel-ID -> (Ampel, laufende Anpassung); IDs mit neuen Ereignissen während einer laufenden Anpassung
+        self._pending: Dict[str, Tuple[TrafficLight, Future]] = {}
+        self._refit: set = set()
+        self._saving: Optional[Future] = None
+
+        # Metriken
+        self.events = 0
+        self.fits = 0
+
+        if filename is not None:
+            self.load(filename)
+
+    def start_ride(self, epoch: float) -> None:
+        """
+        :param epoch: Wanduhrzeit (Sekunden seit 1970) zur Fahrtzeit 0
+        """
+        self._ride_start = epoch
+        self._light = None
+        self._stopped_at = None
+
+    def get(self, light_id: str) -> Optional[LightEstimate]:
+        return self._estimates.get(light_id)
+
+    # === Ereigniserkennung je Tick ===
+
+    def observe(self, light: TrafficLight, distance: float, speed: float, ride_time: float) -> None:
+        """
+        Wertet einen Tick aus: nächste Ampel, Entfernung dazu in m, Geschwindigkeit in m/s, Fahrtzeit in s.
+        """
+        t = self._ride_start + ride_time
+        if (light is not self._light and self._light is not None
+                and self._last_distance <= self.stop_distance and speed < self.stop_speed):
+            # steht an der Haltelinie der eben als passiert gemeldeten Ampel (Position am Mast, GPS-Streuung)
+            light, distance = self._light, 0.0
+        if light is not self._light:
+            previous = self._light
+            if previous is not None and self._last_distance <= self.pass_distance:
+                # vorige Ampel passiert: nach einem Halt direkt an der Haltelinie ist das das Anfahren
+                if self._stopped_at is not None:
+                    self.on_green_start(previous, t - self.go_delay, self._stopped_at)
+                else:
+                    self.on_green(previous, t)
+            self._light = light
+            self._stopped_at = None
+
+        if self._stopped_at is None:
+            if distance <= self.stop_distance and speed < self.stop_speed:
+                self._stopped_at = t
+                self.on_red(light, t)
+        elif speed > self.go_speed:
+            stopped_at, self._stopped_at = self._stopped_at, None
+            self.on_green_start(light, t - self.go_delay, stopped_at)
+        self._last_distance = distance
+
+    # === Ereignisse ===
+
+    def on_green_start(self, light: TrafficLight, t: float, stopped_at: Optional[float] = None) -> None:
+        """
+        Grünbeginn zur Wanduhrzeit t beobachtet, nach einem Halt seit stopped_at.
+        """
+        estimate = self._estimate(light)
+        self._append(estimate.starts, t)
+        if stopped_at is not None:
+            self._append(estimate.gaps, t - stopped_at)
+        self._changed(light, estimate, t)
+
+    def on_red(self, light: TrafficLight, t: float) -> None:
+        """
+        Rot zur Wanduhrzeit t beobachtet (Halt an der Ampel).
+        """
+        estimate = self._estimate(light)
+        self._append(estimate.reds, t)
+        self._changed(light, estimate, t)
+
+    def on_green(self, light: TrafficLight, t: float) -> None:
+        """
+        Grün zur Wanduhrzeit t beobachtet (Durchfahrt ohne Halt).
+        """
+        estimate = self._estimate(light)
+        self._append(estimate.passes, t)
+        self._changed(light, estimate, t)
+
+    def _estimate(self, light: TrafficLight) -> LightEstimate:
+        self.events += 1
+        estimate = self._estimates.get(light.get_id())
+        if estimate is None:
+            estimate = self._estimates[light.get_id()] = LightEstimate()
+        return estimate
+
+    def _append(self, events: List[float], t: float) -> None:
+        events.append(round(t, 2))
+        del events[:-self.window]
+
+    def _changed(self, light: TrafficLight, estimate: LightEstimate, t: float) -> None:
+        estimate.updated = t
+        self._dirty = True
+        if self._executor is None:
+            self.fit(estimate)
+            self.apply(light)
+        elif light.get_id() in self._pending:
+            # läuft schon: danach mit den neuen Ereignissen noch einmal
+            self._refit.add(light.get_id())
+        else:
+            self._submit(light, estimate)
+        if self.filename is not None and t - self._last_save >= self.save_interval:
+            self._last_save = t
+            self.save(wait=False)
+
+    def _submit(self, light: TrafficLight, estimate: LightEstimate) -> None:
+        self._pending[light.get_id()] = (light, self._executor.submit(
+            self._fit_events, tuple(estimate.starts), tuple(estimate.reds), tuple(estimate.passes),
+            tuple(estimate.gaps)
+        ))
+
+    def poll(self) -> int:
+        """
+        Übernimmt fertige Anpassungen aus dem Worker in die Schätzungen und ihre Ampeln. Nicht blockierend,
+        gehört in den Tick.
+        :return: Anzahl übernommener Anpassungen
+        """
+        done = [light_id for light_id, (_, future) in self._pending.items() if future.done()]
+        for light_id in done:
+            light, future = self._pending.pop(light_id)
+            estimate = self._estimates[light_id]
+            try:
+                self._store(estimate, future.result())
+            except Exception as e:
+                log.warning("Anpassung für %s fehlgeschlagen: %s", light_id, e, extra={"stage": "estimator"})
+                continue
+            self.apply(light)
+            if light_id in self._refit:
+                self._refit.discard(light_id)
+                self._submit(light, estimate)
+        return len(done)
+
+    # === Anpassung ===
+
+    def fit(self, estimate: LightEstimate) -> None:
+        """
+        Passt die Schätzung direkt an die gehaltenen Ereignisse an (ohne Worker).
+        """
+        self._store(estimate, self._fit_events(estimate.starts, estimate.reds, estimate.passes, estimate.gaps))
+
+    @staticmethod
+    def _store(estimate: LightEstimate, result: Optional[_Fit]) -> None:
+        if result is None:
+            estimate.confidence = 0.0
+            return
+        estimate.anchor, estimate.cycle, estimate.green, estimate.spread, estimate.confidence = result
+
+    def _fit_events(
+        self,
+        starts: Sequence[float],
+        reds: Sequence[float],
+        passes: Sequence[float],
+        gaps: Sequence[float]
+    ) -> Optional[_Fit]:
+        """
+        Wählt Zykluslänge, Phase und Grünanteil, die am besten zu den Ereignissen passen. Liest nur die
+        übergebenen Folgen, läuft also auch im Worker auf Kopien.
+
+        Kosten eines Kandidaten: violation_cost je Widerspruch (Grünbeginn abseits der Phase, Wartezeit länger
+        als der Zyklus erlaubt, Halt in Grün bzw. Durchfahrt in Rot bei bester Grün-Rot-Grenze) plus die
+        quadrierten Abweichungen der übrigen Grünbeginne in Einheiten von jitter. Die Konfidenz fällt mit
+        der Streuung und mit dem Kostenabstand zum besten Kandidaten, der nicht direkt benachbart ist.
+        :return: None bei zu wenigen Grünbeginnen
+        """
+        if len(starts) < self.min_starts:
+            return None
+        self.fits += 1
+        cycles = self.candidates
+        starts = np.asarray(starts)
+        # relativ zum letzten Grünbeginn rechnen, Sekunden seit 1970 sind für die Winkel zu groß
+        reference = starts[-1]
+        rel = starts - reference
+
+        # Phase je Kandidat aus dem zirkulären Mittel, dann am Mittel der nahen Grünbeginne nachgeschärft
+        angles = (2 * np.pi / cycles)[:, None] * rel[None, :]
+        phase = np.angle(np.exp(1j * angles).mean(axis=1)) / (2 * np.pi) * cycles
+        resid = self._residuals(rel, phase, cycles)
+        inlier = np.abs(resid) <= self.start_tolerance
+        shift = np.where(inlier, resid, 0.0).sum(axis=1) / np.maximum(inlier.sum(axis=1), 1)
+        phase = phase + shift
+        resid = self._residuals(rel, phase, cycles)
+        inlier = np.abs(resid) <= self.start_tolerance
+
+        violations = (~inlier).sum(axis=1)
+        if len(gaps):
+            violations += (np.asarray(gaps)[None, :] > (cycles - self.min_green)[:, None]).sum(axis=1)
+        sq = np.where(inlier, resid * resid, 0.0).sum(axis=1)
+        cost = self.violation_cost * violations + sq / (2 * self.jitter ** 2)
+
+        # Grün-Rot-Grenze nur für die aussichtsreichsten Kandidaten suchen
+        passes = np.asarray(passes, dtype=float)
+        reds = np.asarray(reds, dtype=float)
+        best_first = np.argsort(cost)[:48]
+        greens = np.full(len(cycles), np.nan)
+        for k in best_first:
+            spread_k = math.sqrt(sq[k] / max(int(inlier[k].sum()), 1))
+            split_violations, greens[k] = self._split(
+                passes, reds, reference + phase[k], cycles[k], max(3.0, 2.0 * spread_k)
+            )
+            cost[k] += self.violation_cost * split_violations
+        # für die übrigen Kandidaten ist die Kostenschätzung ohne Grenze eine untere Schranke: sie zählen
+        # beim Abstand mit, gewählt werden kann nur ein vollständig bewerteter Kandidat
+        best = int(best_first[np.argmin(cost[best_first])])
+        others = np.abs(cycles - cycles[best]) > 1.5 * self.cycle_step
+        margin = max(0.0, float((cost[others] - cost[best]).min())) if others.any() else math.inf
+
+        n = int(inlier[best].sum())
+        cycle = float(cycles[best])
+        spread = math.sqrt(sq[best] / max(n, 1))
+        uniqueness = 1.0 - math.exp(-margin / 2)
+        # bei wenigen Grünbeginnen passt unter vielen Kandidaten auch einer zufällig: erwartete Zahl solcher
+        # Zufallstreffer (alle Grünbeginne im Fenster von 4 · Streuung um die Phase)
+        width = 4.0 * max(spread, self.jitter)
+        chance = float(np.sum(np.minimum(1.0, width / cycles) ** max(n - 1, 1)))
+        confidence = n / (n + 2) * max(0.0, 1.0 - spread / (0.25 * cycle)) * uniqueness / (1.0 + chance)
+        return _Fit(float(reference + phase[best]), cycle, float(greens[best]), spread, confidence)
+
+    @staticmethod
+    def _residuals(rel: np.ndarray, phase: np.ndarray, cycles: np.ndarray) -> np.ndarray:
+        # Abstand jedes Grünbeginns zum nächsten geschätzten, in (-Zyklus/2, Zyklus/2]
+        half = (cycles / 2)[:, None]
+        return np.mod(rel[None, :] - phase[:, None] + half, cycles[:, None]) - half
+
+    def _split(self, passes: Sequence[float], reds: Sequence[float], anchor: float, cycle: float, margin: float):
+        """
+        Beste Grenze zwischen Grün und Rot für einen Kandidaten.
+        :return: (Zahl der Halte in Grün und Durchfahrten in Rot, Grünphase in s als Mitte der besten Grenzen)
+        """
+        passes = np.mod(np.asarray(passes) - anchor, cycle)
+        reds = np.mod(np.asarray(reds) - anchor, cycle)
+        # knapp vor bzw. nach dem geschätzten Grünbeginn widerspricht nichts, die Phase ist nur so genau
+        passes = np.where(passes > cycle - margin, 0.0, passes)
+        reds = reds[reds >= margin]
+        bounds = np.arange(self.min_green, cycle - self.min_green + 0.25, 0.5)
+        passes.sort()
+        reds.sort()
+        violations = (len(passes) - np.searchsorted(passes, bounds, side="left")
+                      + np.searchsorted(reds, bounds, side="left"))
+        best = violations.min()
+        return int(best), float(bounds[violations == best].mean())
+
+    # === Übernahme und Speicherung ===
+
+    def apply(self, light: TrafficLight) -> bool:
+        """
+        Schreibt eine ausreichend sichere Schätzung in die Ampel (Versatz in Fahrtzeit dieser Fahrt).
+        :return: True, wenn übernommen
+        """
+        estimate = self._estimates.get(light.get_id())
+        if estimate is None or estimate.confidence < self.min_confidence:
+            return False
+        offset = (estimate.anchor - self._ride_start) % estimate.cycle
+        light.set_timing(estimate.green, estimate.cycle - estimate.green, offset)
+        light.mock_initialized = True
+        return True
+
+    def load(self, filename: str) -> int:
+        """
+        :return: Anzahl geladener Schätzungen (0, wenn die Datei fehlt oder unlesbar ist)
+        """
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._estimates = {
+                light_id: LightEstimate.from_dict(entry) for light_id, entry in data.get("lights", {}).items()
+            }
+        except (OSError, json.JSONDecodeError, KeyError, TypeError, AttributeError):
+            return 0
+        return len(self._estimates)
+
+    def save(self, wait: bool = True) -> None:
+        """
+        Schreibt alle Schätzungen atomar, falls sich seit dem letzten Speichern etwas geändert hat.
+        :param wait: False übergibt das Schreiben dem Worker (aus dem Tick), der Stand wird vorher kopiert
+        """
+        if self.filename is None or not self._dirty:
+            return
+        data = {"lights": {k: v.to_dict() for k, v in self._estimates.items()}}
+        self._dirty = False
+        if self._executor is None or wait:
+            self._write(data)
+        elif self._saving is None or self._saving.done():
+            self._saving = self._executor.submit(self._write, data)
+        else:
+            # voriges Schreiben läuft noch, beim nächsten Mal
+            self._dirty = True
+
+    def _write(self, data: dict) -> None:
+        tmp = f"{self.filename}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp, self.filename)
+        except OSError as e:
+            self._dirty = True
+            log.warning("Ampelschätzungen konnten nicht gespeichert werden: %s", e)
+
+    def close(self) -> None:
+        """
+        Wartet auf laufende Anpassungen, übernimmt sie, speichert und beendet den Worker.
+        """
+        if self._executor is not None:
+            while self._pending:
+                for _, future in list(self._pending.values()):
+                    future.exception()
+                self.poll()
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.save()
@@ -0,0 +1,261 @@
+# signal_timing_provider.py
+"""
+Quellen für Ampelzeiten (Grün, Rot, Versatz) hinter einer gemeinsamen Schnittstelle und ein Cache davor.
+
+- StaticTimingProvider liest die Zeitentabelle aus PhaseFitter.py.
+- HttpTimingProvider fragt einen SPaT-artigen Dienst (GET <url>?ids=a,b,c, siehe timing_stub_server.py) und
+  bündelt dabei alle Ampeln eines Korridors in wenigen Requests über eine Keep-alive-Session.
+- TimingCache hält die Zeiten mit TTL und LRU-Verdrängung im Speicher. Geholt wird nur in prefetch() beim
+  Aufbau eines Korridors (im Worker des RouteRefresher), der Tick liest mit apply() nur aus dem Speicher.
+
+Antwortformat beider Quellen wie die Zeitentabelle: {"lights": {<id>: {"green_s", "red_s", "offset_s"}}},
+optional mit "epoch": dann beginnt Grün um epoch + offset_s + k · Zyklus (Sekunden seit 1970), sonst gilt
+offset_s direkt als Versatz in Fahrtzeit wie bei TrafficLightFetcher.load_timings.
+"""
+
+import abc
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from RideLog import get_logger
+from TrafficLight import TrafficLight
+
+log = get_logger("timings")
+
+
+class SignalTiming(NamedTuple):
+    green_s: float
+    red_s: float
+    offset_s: float
+    epoch: Optional[float] = None   # Bezugszeitpunkt des Versatzes, None = Fahrtzeit
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SignalTiming":
+        epoch = data.get("epoch")
+        return cls(float(data["green_s"]), float(data["red_s"]), float(data["offset_s"]),
+                   float(epoch) if epoch is not None else None)
+
+    def ride_offset(self, ride_start: float) -> float:
+        """
+        Versatz in Fahrtzeit einer Fahrt, die zur Wanduhrzeit ride_start (Sekunden seit 1970) begann.
+        """
+        if self.epoch is None:
+            return self.offset_s
+        return (self.epoch + self.offset_s - ride_start) % (self.green_s + self.red_s)
+
+
+def _node(light_id: str) -> str:
+    # OSM-Knotennummer am Ende der ID ("venloer/4279001084" -> "4279001084")
+    return light_id.rpartition("/")[2]
+
+
+def parse_timings(data: dict, light_ids: Iterable[str]) -> Dict[str, SignalTiming]:
+    """
+    Sucht die Ampeln in einer Antwort bzw. Zeitentabelle, über die volle ID oder die Knotennummer.
+    Unvollständige Einträge werden übergangen.
+    """
+    lights = data.get("lights", {})
+    result = {}
+    for light_id in light_ids:
+        entry = lights.get(light_id, lights.get(_node(light_id)))
+        if entry is None:
+            continue
+        try:
+            result[light_id] = SignalTiming.from_dict(entry)
+        except (KeyError, TypeError, ValueError):
+            log.warning("Ungültige Ampelzeiten für %s: %s", light_id, entry)
+    return result
+
+
+class TimingProvider(abc.ABC):
+    """
+    Schnittstelle: liefert die bekannten Zeiten zu mehreren Ampeln mit einem Aufruf.
+    """
+
+    @abc.abstractmethod
+    def fetch(self, light_ids: Sequence[str]) -> Dict[str, SignalTiming]:
+        """
+        :return: Ampel-ID -> Zeiten, fehlende Ampeln sind nicht enthalten; Fehler der Quelle ergeben {}
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class StaticTimingProvider(TimingProvider):
+    """
+    Zeitentabelle aus einer JSON-Datei (Format von PhaseFitter.py), einmal gelesen. Eine fehlende Datei ergibt
+    eine leere Tabelle ohne Warnung, PhaseFitter.py legt sie erst nach den ersten Messfahrten an.
+    """
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self._data: dict = {}
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, json.JSONDecodeError) as e:
+            log.warning("Zeitentabelle %s nicht lesbar: %s", filename, e)
+            return
+        if isinstance(data, dict):
+            self._data = data
+        else:
+            log.warning("Zeitentabelle %s hat kein gültiges Format", filename)
+
+    def fetch(self, light_ids: Sequence[str]) -> Dict[str, SignalTiming]:
+        return parse_timings(self._data, light_ids)
+
+
+class HttpTimingProvider(TimingProvider):
+    """
+    Fragt einen Zeiten-Dienst per HTTP. Die IDs gehen in Blöcken von `batch_size` als Query-Parameter
+    ids=a,b,c an die URL; die Session hält die Verbindungen offen (Keep-alive, Verbindungspool).
+    """
+
+    def __init__(
+        self,
+        url: str,
+        batch_size: int = 50,
+        timeout: float = 3.0,
+        pool_size: int = 4,
+        session: Optional[requests.Session] = None
+    ) -> None:
+        """
+        :param url: Endpunkt, z. B. http://127.0.0.1:8098/v1/timings
+        :param batch_size: Ampeln je Request (begrenzt die URL-Länge)
+        :param timeout: Verbindungs- und Lese-Timeout je Request in Sekunden
+        :param pool_size: offen gehaltene Verbindungen
+        :param session: eigene Session, z. B. mit Authentifizierung; sonst wird eine angelegt
+        """
+        self.url = url
+        self.batch_size = batch_size
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self._session = session
+
+        # Metriken
+        self.requests = 0
+        self.errors = 0
+
+    def fetch(self, light_ids: Sequence[str]) -> Dict[str, SignalTiming]:
+        result: Dict[str, SignalTiming] = {}
+        for i in range(0, len(light_ids), self.batch_size):
+            batch = light_ids[i:i + self.batch_size]
+            self.requests += 1
+            try:
+                resp = self._session.get(self.url, params={"ids": ",".join(batch)}, timeout=self.timeout)
+                resp.raise_for_status()
+                result.update(parse_timings(resp.json(), batch))
+            except (requests.RequestException, ValueError) as e:
+                self.errors += 1
+                log.warning("Ampelzeiten nicht abrufbar: %s", e, extra={"stage": "timings"})
+        return result
+
+    def close(self) -> None:
+        self._session.close()
+
+
+class TimingCache:
+    """
+    LRU-Cache mit TTL vor einem TimingProvider. prefetch() holt fehlende und abgelaufene Einträge gebündelt,
+    apply() schreibt gültige Einträge ohne Netzwerkzugriff in die Ampel.
+    """
+
+    def __init__(self, provider: TimingProvider, ttl: float = 300.0, max_entries: int = 512) -> None:
+        """
+        :param provider: Quelle der Zeiten
+        :param ttl: Gültigkeit eines Eintrags in Sekunden, danach wird er beim nächsten prefetch() neu geholt
+        :param max_entries: maximale Anzahl Einträge (älteste Nutzung fliegt zuerst)
+        """
+        self.provider = provider
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Ampel-ID -> (Zeitpunkt des Abrufs, Zeiten)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metriken
+        self.hits = 0
+        self.misses = 0
+        self.fetched = 0
+        self.evicted = 0
+
+    def _valid(self, light_id: str, now: float) -> Optional[SignalTiming]:
+        entry = self._entries.get(light_id)
+        if entry is None or now - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def get(self, light_id: str) -> Optional[SignalTiming]:
+        """
+        Gültiger Eintrag aus dem Speicher, None wenn keiner da oder abgelaufen.
+        """
+        with self._lock:
+            timing = self._valid(light_id, time.monotonic())
+            if timing is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(light_id)
+            return timing
+
+    def prefetch(self, lights: Iterable[TrafficLight]) -> int:
+        """
+        Holt die Zeiten aller Ampeln ohne gültigen Eintrag mit einem gebündelten Abruf. Blockiert für die
+        Dauer des Abrufs, gehört also in den Routenaufbau, nicht in den Tick.
+        :return: Anzahl neu geholter Einträge
+        """
+        now = time.monotonic()
+        with self._lock:
+            missing: List[str] = list(dict.fromkeys(
+                light.get_id() for light in lights if self._valid(light.get_id(), now) is None
+            ))
+        if not missing:
+            return 0
+
+        timings = self.provider.fetch(missing)
+        fetched_at = time.monotonic()
+        with self._lock:
+            for light_id, timing in timings.items():
+                self._entries[light_id] = (fetched_at, timing)
+                self._entries.move_to_end(light_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+        self.fetched += len(timings)
+        log.debug("Ampelzeiten geholt", extra={"stage": "timings", "data": {
+            "requested": len(missing), "received": len(timings)
+        }})
+        return len(timings)
+
+    def apply(self, light: TrafficLight, ride_start: float) -> bool:
+        """
+        Schreibt den gültigen Eintrag in die Ampel, falls er von ihren Zeiten abweicht.
+        :param ride_start: Wanduhrzeit zur Fahrtzeit 0 (Sekunden seit 1970)
+        :return: True, wenn ein gültiger Eintrag vorliegt
+        """
+        timing = self.get(light.get_id())
+        if timing is None:
+            return False
+        green_ms = round(timing.green_s * 1000)
+        red_ms = round(timing.red_s * 1000)
+        offset_ms = round(timing.ride_offset(ride_start) * 1000)
+        if (light.green_ms, light.red_ms, light.offset_ms) != (green_ms, red_ms, offset_ms):
+            light.set_timing_ms(green_ms, red_ms, offset_ms)
+        light.mock_initialized = True
+        return True
+
+    def close(self) -> None:
+        self.provider.close()
@@ -1,76 +1,85 @@
+import math
 from datetime import timedelta
-from typing import Tuple, List
+from typing import Optional, Tuple
 
 from TrafficLight import TrafficLight
 from utils import haversine
 
+_MS = timedelta(milliseconds=1)
+
 
 class SpeedAdvisor:
     """
     Ermittelt die optimale Geschwindigkeit, um eine bestimmte Grünphase einer Ampel zu erreichen.
     """
 
-    def __init__(self):
+    def __init__(self, end_margin: float = 1.0):
         """
         Initialisiert den SpeedAdvisor.
+        :param end_margin: Sicherheitsabstand in Sekunden vor dem Ende einer Grünphase
         """
-        pass
+        self.end_margin = end_margin
 
     def choose_best_phase_and_speed(
         self,
         current_position: Tuple[float, float],
         next_light: TrafficLight,
-        green_starts: List[timedelta],
         now: timedelta,
         preferred_speed: float,
         min_speed: float,
-        max_speed: float
+        max_speed: float,
+        distance: Optional[float] = None
     ) -> Tuple[timedelta, float, float]:
         """
-        Wählt die beste erreichbare Phase, prüft zuerst die aktuelle Phase.
+        Wählt analytisch das Grünfenster und den Ankunftszeitpunkt darin, dessen Geschwindigkeit am
+        nächsten an preferred_speed liegt. Da die Geschwindigkeit monoton mit der Ankunftszeit fällt,
+        kommen nur drei Zeitpunkte in Frage: die Ankunft mit preferred_speed (falls dann grün), das
+        Ende des davor liegenden Grünfensters und der Beginn des nächsten. Aufwand O(1).
 
         Gibt zurück:
         - Verzögerung bis Beginn der gewählten Grünphase (0 für aktuelle Grünphase)
         - Empfohlene Geschwindigkeit (m/s)
+        - Entfernung zur Ampel (m)
         """
         # Entfernung zur Ampel (in Metern)
-        distance = haversine(current_position, next_light.get_location())
+        if distance is None:
+            distance = haversine(current_position, next_light.get_location())
+        if distance <= 0 or preferred_speed <= 0 or next_light.cycle_ms <= 0:
+            return timedelta(seconds=0), preferred_speed, distance
 
-        # 1. Prüfe aktuelle Phase
-        phase, remaining = next_light.get_phase(now)
-        if phase == 'green' and remaining.total_seconds() > 0:
-            max_time = remaining.total_seconds()
+        cycle = next_light.cycle_ms / 1000
+        green = next_light.green_ms / 1000
+        margin = min(self.end_margin, green / 2)
 
-            # Wie lange bräuchte man mit preferred_speed?
-            time_with_preferred = distance / preferred_speed
+        # Zulässige Ankunftszeiten (Sekunden ab jetzt) aus dem Geschwindigkeitsband
+        t_min = distance / max_speed if max_speed > 0 else 0.0
+        t_max = distance / min_speed if min_speed > 0 else math.inf
+        t_pref = distance / preferred_speed
 
-            if time_with_preferred <= max_time:
-                # preferred_speed reicht aus – perfekt!
-                return timedelta(seconds=0), preferred_speed, distance
-            else:
-                # Prüfe, ob man überhaupt noch rechtzeitig ankommen kann
-                time_with_max_speed = distance / max_speed
-                if time_with_max_speed <= max_time:
-                    # Mit max_speed gerade noch erreichbar
-                    speed_required = distance / max_time
-                    return timedelta(seconds=0), max(min_speed, min(speed_required, max_speed)), distance
-                # → Ansonsten: aktuelle Grünphase nicht mehr erreichbar – weiter mit zukünftigen Phasen
+        # Grünfenster, das bei Ankunft mit preferred_speed läuft bzw. zuletzt begonnen hat
+        time_in_cycle = ((now // _MS) / 1000 + t_pref - next_light.offset_ms / 1000) % cycle
+        window_start = t_pref - time_in_cycle
+        window_end = window_start + green
 
-        # 2. Sonst prüfe kommende Grünphasen
-        candidates: List[Tuple[float, timedelta, float]] = []  # (Abweichung, delay, speed_required)
-        for delay in green_starts:
-            if delay.total_seconds() <= 0:
-                continue
-            speed_required = distance / delay.total_seconds()
-            deviation = abs(speed_required - preferred_speed)
-            candidates.append((deviation, delay, speed_required))
+        if t_pref <= window_end - margin:
+            # preferred_speed reicht aus – perfekt!
+            return timedelta(seconds=max(0.0, window_start)), preferred_speed, distance
 
-        if not candidates:
-            # Keine kommenden Phasen: Behalte preferred_speed
-            return timedelta(seconds=0), preferred_speed, distance
+        # Kandidat A: schneller fahren, kurz vor Ende dieses Grünfensters ankommen
+        # Kandidat B: langsamer fahren, zu Beginn des nächsten Grünfensters ankommen
+        candidates = []
+        t_a = window_end - margin
+        if t_a > 0 and t_a >= t_min:
+            candidates.append((abs(distance / t_a - preferred_speed), window_start, t_a))
+        t_b = window_start + cycle
+        if t_b <= t_max:
+            candidates.append((abs(distance / t_b - preferred_speed), t_b, t_b))
+
+        if candidates:
+            _, start, arrival = min(candidates)
+        else:
+            # Kein Grünfenster im Geschwindigkeitsband: auf das nächste zufahren und ggf. warten
+            start, arrival = t_b, t_b
 
-        # Wähle Phase mit geringster Abweichung
-        _, best_delay, best_speed = min(candidates, key=lambda x: x[0])
-        # Auf min/max begrenzen
-        chosen_speed = max(min_speed, min(best_speed, max_speed))
-        return best_delay, chosen_speed, distance
+        chosen_speed = max(min_speed, min(distance / arrival, max_speed))
+        return timedelta(seconds=max(0.0, start)), chosen_speed, distance
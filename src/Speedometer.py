@@ -1,47 +1,121 @@
 import time
-
-import RPi.GPIO as GPIO
+from typing import Callable, List
 
 
 class Speedometer:
+    """
+    Geschwindigkeit aus den Impulsen des Radsensors.
+
+    Der GPIO-Callback ist der einzige Schreiber: er legt den Zeitstempel jedes Impulses in einem Ringpuffer
+    fester Größe ab und erhöht danach den Zähler. Leser nehmen sich erst den Zähler und dann die Zeitstempel
+    davor – dafür ist kein Lock nötig. Die Geschwindigkeit wird erst beim Lesen über ein Zeitfenster
+    berechnet und fällt ohne Impulse auf 0.
+    """
     PULSE_PIN = 11  # Class variable for the pin number
 
-    def __init__(self, wheel_circumference: float):
+    def __init__(
+        self,
+        wheel_circumference: float,
+        window: float = 2.0,
+        timeout: float = 3.0,
+        capacity: int = 32,
+        clock: Callable[[], float] = time.monotonic,
+        setup_gpio: bool = True
+    ):
+        """
+        :param wheel_circumference: Radumfang in Metern
+        :param window: Zeitfenster in Sekunden, über das die Impulse gemittelt werden
+        :param timeout: ohne Impuls in dieser Zeit gilt das Rad als stehend
+        :param capacity: Größe des Ringpuffers (Impulse)
+        :param clock: monotone Zeitquelle
+        :param setup_gpio: Pin einrichten und Callback registrieren (False z. B. für Tests ohne PI)
+        """
         self.wheel_circumference = wheel_circumference
-        self.last_time = time.time()  # Instance variable for the last pulse time
-        self.speed_kph = 0.00  # Instance variable for the current speed
+        self.window = window
+        self.timeout = timeout
+        self._clock = clock
+        self._capacity = capacity
+        self._stamps: List[float] = [0.0] * capacity
+        self._count = 0  # Anzahl bisher gespeicherter Impulse, nur der Callback schreibt
+
+        if setup_gpio:
+            import RPi.GPIO as GPIO
 
-        # Set up GPIO - these should be done in the constructor
-        GPIO.setmode(GPIO.BOARD)
-        GPIO.setup(self.PULSE_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        GPIO.add_event_detect(self.PULSE_PIN, GPIO.FALLING, callback=self._pulse_detected_callback, bouncetime=50)
+            # Set up GPIO - these should be done in the constructor
+            GPIO.setmode(GPIO.BOARD)
+            GPIO.setup(self.PULSE_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+            GPIO.add_event_detect(self.PULSE_PIN, GPIO.FALLING, callback=self._pulse_detected_callback, bouncetime=50)
 
     # Renamed to a private-like method since it's an internal callback
     def _pulse_detected_callback(self, channel):
         # The 'channel' argument is passed by RPi.GPIO, but we don't use it here.
-        now = time.time()
-        dt = now - self.last_time
-        self.last_time = now
-
-        if dt > 0.01:  # debounce: ignore pulses < 10 ms apart (a more typical debounce for this)
-            # Calculate speed in meters/second, then convert to km/h
-            # wheel_circumference is in meters, dt in seconds
-            speed_mps = self.wheel_circumference / dt
-            self.speed_kph = speed_mps * 3.6
-        else:
-            # If the debounce condition is met, it means it was likely a bounce,
-            # so we might want to reset speed or ignore this pulse's effect on speed calculation
-            # For simplicity, we just won't update speed if it's a bounce
-            pass
+        now = self._clock()
+        count = self._count
+        if count and now - self._stamps[(count - 1) % self._capacity] <= 0.01:
+            # debounce: ignore pulses < 10 ms apart
+            return
+        self._stamps[count % self._capacity] = now
+        # erst schreiben, dann veröffentlichen
+        self._count = count + 1
+
+    def _recent_stamps(self) -> List[float]:
+        """
+        Zeitstempel der gespeicherten Impulse, älteste zuerst.
+        """
+        count = self._count
+        n = min(count, self._capacity - 1)  # ein Platz Reserve für einen parallel schreibenden Callback
+        return [self._stamps[i % self._capacity] for i in range(count - n, count)]
 
     def read_speed(self) -> float:
         """
         Returns the current calculated speed in kilometers per hour.
+
+        Mittelwert über die Impulse im Zeitfenster, begrenzt durch Radumfang / Zeit seit dem letzten Impuls:
+        dreht sich das Rad nicht mehr, sinkt die Anzeige sofort und ist nach `timeout` Sekunden 0.
         """
-        return self.speed_kph
+        stamps = self._recent_stamps()
+        if len(stamps) < 2:
+            # ein einzelner Impuls seit dem Start sagt nichts über die Geschwindigkeit, Radumfang / Zeit seit
+            # diesem Impuls ergäbe direkt danach Hunderte km/h
+            return 0.0
+        now = self._clock()
+        since_last = now - stamps[-1]
+        if since_last >= self.timeout:
+            return 0.0
+
+        in_window = [t for t in stamps if t >= stamps[-1] - self.window]
+        if len(in_window) < 2:
+            # nur ein Impuls im Fenster: Obergrenze aus der Zeit seit dem vorletzten Impuls
+            elapsed = now - stamps[-2]
+            return self.wheel_circumference / elapsed * 3.6 if elapsed > 0 else 0.0
+
+        speed_mps = self.wheel_circumference * (len(in_window) - 1) / (in_window[-1] - in_window[0])
+        if since_last > 0:
+            speed_mps = min(speed_mps, self.wheel_circumference / since_last)
+        return speed_mps * 3.6
+
+    def has_pulses(self) -> bool:
+        """
+        True, sobald der Sensor mindestens zwei Impulse geliefert hat, also eine Radgeschwindigkeit messbar ist.
+        """
+        return self._count >= 2
+
+    def fuse(self, gps_speed_kph: float, gps_valid: bool = True, wheel_weight: float = 0.8) -> float:
+        """
+        Kombiniert Rad- und GPS-Geschwindigkeit (km/h). Ohne zwei Impulse seit dem Start (Sensor fehlt,
+        defekt oder Rad erst eine Umdrehung gedreht) zählt nur GPS, ohne gültigen GPS-Fix nur der Radsensor.
+        """
+        if not self.has_pulses():
+            return gps_speed_kph if gps_valid else 0.0
+        wheel = self.read_speed()
+        if not gps_valid:
+            return wheel
+        return wheel_weight * wheel + (1.0 - wheel_weight) * gps_speed_kph
 
     def cleanup(self):
         """
         Cleans up the GPIO settings. Should be called when the program exits.
         """
+        import RPi.GPIO as GPIO
+
         GPIO.cleanup()
@@ -0,0 +1,225 @@
+# telemetry_recorder.py
+"""
+Binäres Fahrtprotokoll: ein Datensatz fester Größe pro Tick der Update-Schleife, damit eine Fahrt
+später nachgespielt werden kann (siehe RideReplay).
+
+Aufbau (little endian):
+    Header (64 Byte): magic "RSTM", Version (u32), Datensatzgröße (u32), reserviert (u32),
+                      Wunsch-, Mindest- und Höchstgeschwindigkeit des Fahrers (f8, m/s),
+                      Ziel lat/lon (f8, 0/0 unbekannt), Nullbytes
+    Datensätze (RECORD_DTYPE, je 56 Byte):
+        t            f8   Fahrtzeit in Sekunden (Zeitbasis der Ampelzyklen)
+        tick         u4   Tick-Nummer des Controllers
+        flags        u4   FLAG_STALE | FLAG_DEGRADED | FLAG_ADVICE
+        lat, lon     f8   Position des GPS-Fix
+        speed        f4   Geschwindigkeit des Fix in m/s (wie vom Controller genutzt, ggf. fusioniert)
+        wheel_speed  f4   Radsensor in m/s, NaN ohne Sensor
+        light        i4   Index der gewählten Ampel in der ID-Datei, -1 ohne Empfehlung
+        v_opt        f4   empfohlene Geschwindigkeit in m/s, NaN ohne Empfehlung
+        distance     f4   Distanz zur Ampel in m
+        delay        f4   Verzögerung bis zur genutzten Grünphase in s
+
+Die Ampel-IDs stehen zeilenweise in einer Begleitdatei `<datei>.lights`; ein Datensatz verweist über
+seinen Index darauf. Ein beim Absturz halb geschriebener letzter Datensatz wird beim Lesen ignoriert.
+"""
+
+import math
+import mmap
+import struct
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from GpsReader import GpsFix
+from RideLog import get_logger
+
+log = get_logger("telemetry")
+
+MAGIC = b"RSTM"
+VERSION = 1
+HEADER_SIZE = 64
+_HEADER = struct.Struct("<4sIIIddddd")
+_RECORD = struct.Struct("<dIIddffifff")
+
+RECORD_DTYPE = np.dtype([
+    ("t", "<f8"),
+    ("tick", "<u4"),
+    ("flags", "<u4"),
+    ("lat", "<f8"),
+    ("lon", "<f8"),
+    ("speed", "<f4"),
+    ("wheel_speed", "<f4"),
+    ("light", "<i4"),
+    ("v_opt", "<f4"),
+    ("distance", "<f4"),
+    ("delay", "<f4"),
+])
+assert RECORD_DTYPE.itemsize == _RECORD.size
+
+FLAG_STALE = 1
+FLAG_DEGRADED = 2
+FLAG_ADVICE = 4
+
+
+def lights_file(filename: str) -> str:
+    return f"{filename}.lights"
+
+
+class TelemetryRecorder:
+    """
+    Hängt Datensätze gepuffert an die Protokolldatei an. record() kostet ein struct.pack und ein
+    Schreiben in den Dateipuffer; auf die Platte geht es alle `flush_every` Datensätze.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        preferred_speed: float = 6.0,
+        min_speed: float = 0.0,
+        max_speed: float = 8.0,
+        destination: Optional[Tuple[float, float]] = None,
+        flush_every: int = 10
+    ) -> None:
+        """
+        :param filename: Protokolldatei, wird neu angelegt (eine Datei je Fahrt)
+        :param preferred_speed: Fahrerparameter, werden für das Nachspielen im Header abgelegt
+        :param destination: Ziel der Fahrt, damit beim Nachspielen die Route bis dorthin reicht
+        :param flush_every: Anzahl Datensätze zwischen zwei Schreibvorgängen auf die Platte
+        """
+        self.filename = filename
+        self.flush_every = flush_every
+        self._file: BinaryIO = open(filename, "wb")
+        dest_lat, dest_lon = destination if destination is not None else (0.0, 0.0)
+        self._file.write(_HEADER.pack(
+            MAGIC, VERSION, _RECORD.size, 0, preferred_speed, min_speed, max_speed, dest_lat, dest_lon
+        ))
+        self._file.write(b"\0" * (HEADER_SIZE - _HEADER.size))
+        self._lights_file = open(lights_file(filename), "w", encoding="utf-8")
+        self._light_index: Dict[str, int] = {}
+        self._pending = 0
+
+        self.records = 0
+        self.errors = 0
+
+    def _light(self, light_id: Optional[str]) -> int:
+        if light_id is None:
+            return -1
+        index = self._light_index.get(light_id)
+        if index is None:
+            index = self._light_index[light_id] = len(self._light_index)
+            # sofort schreiben, damit kein gespeicherter Datensatz auf eine fehlende ID zeigt
+            self._lights_file.write(light_id + "\n")
+            self._lights_file.flush()
+        return index
+
+    def record(
+        self,
+        t: float,
+        tick: int,
+        fix: GpsFix,
+        wheel_speed: float = math.nan,
+        light_id: Optional[str] = None,
+        v_opt: float = math.nan,
+        distance: float = math.nan,
+        delay: float = math.nan,
+        degraded: bool = False
+    ) -> None:
+        """
+        Schreibt den Datensatz eines Ticks.
+        :param t: Fahrtzeit in Sekunden
+        :param fix: vom Controller genutzter GPS-Fix
+        :param wheel_speed: Geschwindigkeit des Radsensors in m/s
+        :param light_id: ID der Ampel, für die empfohlen wurde, None ohne Empfehlung
+        :param v_opt: Empfehlung in m/s
+        """
+        flags = (FLAG_STALE if fix.stale else 0) | (FLAG_DEGRADED if degraded else 0)
+        if light_id is not None:
+            flags |= FLAG_ADVICE
+        try:
+            self._file.write(_RECORD.pack(
+                t, tick, flags, fix.lat, fix.lon, fix.speed, wheel_speed,
+                self._light(light_id), v_opt, distance, delay
+            ))
+            self.records += 1
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self.flush()
+        except OSError as e:
+            self.errors += 1
+            log.warning("Telemetrie konnte nicht geschrieben werden: %s", e)
+
+    def flush(self) -> None:
+        self._file.flush()
+        self._pending = 0
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+            self._lights_file.close()
+
+    def __enter__(self) -> "TelemetryRecorder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class TelemetryLog:
+    """
+    Liest ein Fahrtprotokoll per mmap. `records` ist ein strukturiertes NumPy-Array (RECORD_DTYPE) direkt
+    auf der Datei, z. B. log.records["v_opt"] oder log.records[log.records["flags"] & FLAG_ADVICE != 0].
+    """
+
+    def __init__(self, filename: str) -> None:
+        """
+        :param filename: mit TelemetryRecorder geschriebene Datei
+        :raises ValueError: bei falschem Format oder falscher Version
+        """
+        with open(filename, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mm) < HEADER_SIZE:
+            raise ValueError(f"{filename} ist kein Fahrtprotokoll")
+        magic, version, record_size, _, preferred, minimum, maximum, dest_lat, dest_lon = \
+            _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"{filename} ist kein Fahrtprotokoll (Version {VERSION})")
+        self.preferred_speed: float = preferred
+        self.min_speed: float = minimum
+        self.max_speed: float = maximum
+        self.destination: Optional[Tuple[float, float]] = None
+        if (dest_lat, dest_lon) != (0.0, 0.0):
+            self.destination = (dest_lat, dest_lon)
+
+        count = (len(self._mm) - HEADER_SIZE) // record_size
+        self.records: np.ndarray = np.frombuffer(self._mm, dtype=RECORD_DTYPE, count=count, offset=HEADER_SIZE)
+
+        try:
+            with open(lights_file(filename), "r", encoding="utf-8") as f:
+                self.light_ids: List[str] = f.read().splitlines()
+        except OSError:
+            self.light_ids = []
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def light_id(self, i: int) -> Optional[str]:
+        """
+        ID der Ampel aus Datensatz i, None ohne Empfehlung.
+        """
+        index = int(self.records["light"][i])
+        return self.light_ids[index] if 0 <= index < len(self.light_ids) else None
+
+    def summary(self) -> Dict[str, float]:
+        records = self.records
+        if len(records) == 0:
+            return {"records": 0}
+        advice = (records["flags"] & FLAG_ADVICE) != 0
+        return {
+            "records": len(records),
+            "duration_s": float(records["t"][-1] - records["t"][0]),
+            "advice": int(advice.sum()),
+            "stale": int(((records["flags"] & FLAG_STALE) != 0).sum()),
+            "lights": len(set(records["light"][advice].tolist())),
+        }
@@ -0,0 +1,198 @@
+# tick_profiler.py
+"""
+Misst die Dauer der einzelnen Stufen jedes Ticks der Update-Schleife.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from RideLog import get_logger
+
+log = get_logger("profiler")
+
+_NS = 1_000_000_000
+
+
+class TickProfiler:
+    """
+    Zeitmessung pro Stufe mit time.perf_counter_ns (monoton). Die letzten `capacity` Ticks liegen in einem
+    Ringpuffer fester Größe; daraus werden p50/p95/p99 berechnet. Ticks über dem Budget werden gezählt.
+
+    Nutzung je Tick:  start_tick(), nach jeder Stufe mark("name"), am Ende end_tick().
+
+    Die regelmäßige Dateiausgabe kopiert im Tick nur den Ringpuffer; Perzentile und Schreiben laufen in einem
+    Worker-Thread, damit weder die Platte noch die Auswertung den gemessenen Tick verlängern.
+    """
+
+    MAX_STAGES = 16
+
+    def __init__(
+        self,
+        capacity: int = 600,
+        budget: float = 1.0,
+        dump_file: Optional[str] = None,
+        dump_interval: float = 60.0
+    ) -> None:
+        """
+        :param capacity: Anzahl der gespeicherten Ticks
+        :param budget: Budget eines Ticks in Sekunden, darüber zählt der Tick als Überlauf
+        :param dump_file: JSON-Datei, in die die Zusammenfassung regelmäßig geschrieben wird (im Worker-Thread,
+                          zum Schluss mit close())
+        :param dump_interval: Abstand der Dateiausgaben in Sekunden
+        """
+        self.capacity = capacity
+        self.budget_ns = int(budget * _NS)
+        self.dump_file = dump_file
+        self.dump_interval_ns = int(dump_interval * _NS)
+
+        # Spalte 0: ganzer Tick, danach je Stufe; -1 = Stufe in diesem Tick nicht erreicht
+        self._samples = np.full((capacity, self.MAX_STAGES + 1), -1, dtype=np.int64)
+        self._stages: Dict[str, int] = {}
+        self._row = 0
+        self._count = 0
+        self._tick_start = 0
+        self._last_mark = 0
+        self._last_dump = time.perf_counter_ns()
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._writing: Optional[Future] = None
+
+        self.ticks = 0
+        self.overruns = 0
+        self.last_tick_ns = 0
+
+    def start_tick(self) -> None:
+        self._samples[self._row] = -1
+        self._tick_start = self._last_mark = time.perf_counter_ns()
+
+    def mark(self, stage: str) -> None:
+        """
+        Beendet die Stufe `stage`: Zeit seit start_tick() bzw. dem letzten mark().
+        """
+        now = time.perf_counter_ns()
+        column = self._stages.get(stage)
+        if column is None:
+            if len(self._stages) >= self.MAX_STAGES:
+                self._last_mark = now
+                return
+            column = self._stages[stage] = len(self._stages) + 1
+        self._samples[self._row, column] = now - self._last_mark
+        self._last_mark = now
+
+    def end_tick(self) -> None:
+        now = time.perf_counter_ns()
+        self.last_tick_ns = now - self._tick_start
+        self._samples[self._row, 0] = self.last_tick_ns
+        self._row = (self._row + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+        self.ticks += 1
+        if self.last_tick_ns > self.budget_ns:
+            self.overruns += 1
+        if self.dump_file is not None and now - self._last_dump >= self.dump_interval_ns:
+            self._last_dump = now
+            self._dump_async(self.dump_file)
+
+    def _dump_async(self, filename: str) -> None:
+        if self._writing is not None and not self._writing.done():
+            # voriges Schreiben hängt noch (langsame Platte), dieses Intervall auslassen
+            return
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tick-profile")
+        self._writing = self._writer.submit(self._write, filename, self._snapshot())
+
+    def _snapshot(self) -> Tuple[np.ndarray, Dict[str, int], int, int]:
+        return self._samples[:self._count].copy(), dict(self._stages), self.ticks, self.overruns
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        :return: Stufe -> {count, p50_ms, p95_ms, p99_ms, max_ms} über die gespeicherten Ticks;
+                 "tick" enthält zusätzlich ticks und overruns seit Start
+        """
+        return self._summarize(*self._snapshot())
+
+    @staticmethod
+    def _summarize(
+        filled: np.ndarray,
+        stages: Dict[str, int],
+        ticks: int,
+        overruns: int
+    ) -> Dict[str, Dict[str, float]]:
+        result: Dict[str, Dict[str, float]] = {}
+        for name, column in [("tick", 0), *stages.items()]:
+            values = filled[:, column]
+            values = values[values >= 0] / 1e6
+            if len(values) == 0:
+                continue
+            p50, p95, p99 = np.percentile(values, [50, 95, 99]).tolist()
+            result[name] = {
+                "count": int(len(values)),
+                "p50_ms": p50,
+                "p95_ms": p95,
+                "p99_ms": p99,
+                "max_ms": float(values.max()),
+            }
+        result.setdefault("tick", {}).update({"ticks": ticks, "overruns": overruns})
+        return result
+
+    def dump(self, filename: str) -> None:
+        """
+        Schreibt die Zusammenfassung atomar als JSON, sofort und im aufrufenden Thread (nicht aus dem Tick).
+        """
+        self._write(filename, self._snapshot())
+
+    def _write(self, filename: str, snapshot: Tuple[np.ndarray, Dict[str, int], int, int]) -> None:
+        tmp = f"{filename}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._summarize(*snapshot), f, indent=2)
+            os.replace(tmp, filename)
+        except OSError as e:
+            log.warning("Tick-Profil konnte nicht geschrieben werden: %s", e)
+
+    def close(self) -> None:
+        """
+        Wartet auf eine laufende Dateiausgabe, schreibt den Endstand und beendet den Worker.
+        """
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        if self.dump_file is not None:
+            self.dump(self.dump_file)
+
+    def format_summary(self) -> List[str]:
+        lines = []
+        for name, stats in self.summary().items():
+            if "p50_ms" in stats:
+                lines.append(f"{name:14s} p50 {stats['p50_ms']:8.3f} ms  p95 {stats['p95_ms']:8.3f} ms  "
+                             f"p99 {stats['p99_ms']:8.3f} ms  max {stats['max_ms']:8.3f} ms")
+        lines.append(f"Ticks: {self.ticks}, über Budget: {self.overruns}")
+        return lines
+
+
+class NullTickProfiler:
+    """
+    Abgeschaltete Messung mit derselben Schnittstelle: jede Methode kehrt sofort zurück.
+    """
+
+    ticks = 0
+    overruns = 0
+    last_tick_ns = 0
+
+    def start_tick(self) -> None:
+        pass
+
+    def mark(self, stage: str) -> None:
+        pass
+
+    def end_tick(self) -> None:
+        pass
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {}
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,114 @@
+# tick_scheduler.py
+"""
+Taktgeber für die Update-Schleife mit fester Rate auf Basis einer monotonen Uhr.
+"""
+
+import math
+from typing import Callable, Dict, Optional
+
+from Clock import SystemClock
+
+
+class TickScheduler:
+    """
+    Ruft `tick` zu festen Zeitpunkten start + k · period auf. Gewartet wird bis zur nächsten Deadline,
+    nicht eine feste Zeit nach dem Tick – die Arbeitszeit verschiebt den Takt also nicht, und
+    Korrekturen der Wanduhr (NTP) wirken sich nicht aus.
+
+    Verpasste Deadlines (Tick länger als eine Periode) werden nach `policy` behandelt:
+        skip      verpasste Ticks entfallen, weiter im ursprünglichen Raster
+        catch_up  verpasste Ticks werden sofort nachgeholt (höchstens max_catch_up hintereinander)
+        degrade   wie skip, aber die folgenden Ticks laufen ohne optionale Stufen, bis wieder einer
+                  rechtzeitig fertig ist
+    """
+
+    SKIP = "skip"
+    CATCH_UP = "catch_up"
+    DEGRADE = "degrade"
+    POLICIES = (SKIP, CATCH_UP, DEGRADE)
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        policy: str = SKIP,
+        clock=None,
+        max_catch_up: int = 5
+    ) -> None:
+        """
+        :param rate: Ticks pro Sekunde
+        :param policy: Verhalten bei verpassten Deadlines (skip, catch_up, degrade)
+        :param clock: Zeitquelle mit monotonic() und sleep(), Standard: SystemClock
+        :param max_catch_up: maximal nachgeholte Ticks in Folge, danach wird übersprungen
+        :raises ValueError: bei unbekannter Policy oder Rate <= 0
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unbekannte Policy {policy!r}, erlaubt: {', '.join(self.POLICIES)}")
+        if rate <= 0:
+            raise ValueError("Rate muss positiv sein")
+        self.period = 1.0 / rate
+        self.policy = policy
+        self.clock = clock if clock is not None else SystemClock()
+        self.max_catch_up = max_catch_up
+
+        # Metriken
+        self.ticks = 0
+        self.missed = 0
+        self.skipped = 0
+        self.caught_up = 0
+        self.degraded_ticks = 0
+        self.max_lateness = 0.0
+
+    def run(
+        self,
+        tick: Callable[[bool], None],
+        stop_condition: Optional[Callable[[], bool]] = None
+    ) -> None:
+        """
+        :param tick: wird je Takt mit `degraded` aufgerufen (True: optionale Stufen auslassen)
+        :param stop_condition: beendet die Schleife, sobald sie True liefert (Standard: läuft endlos)
+        """
+        start = self.clock.monotonic()
+        k = 0
+        degraded = False
+        catch_up_run = 0
+        while stop_condition is None or not stop_condition():
+            tick(degraded)
+            self.ticks += 1
+            if degraded:
+                self.degraded_ticks += 1
+            k += 1
+
+            now = self.clock.monotonic()
+            deadline = start + k * self.period
+            if now <= deadline:
+                degraded = False
+                catch_up_run = 0
+                self.clock.sleep(deadline - now)
+                continue
+
+            # Deadline verpasst
+            lateness = now - deadline
+            self.missed += 1
+            self.max_lateness = max(self.max_lateness, lateness)
+            if self.policy == self.CATCH_UP and catch_up_run < self.max_catch_up:
+                catch_up_run += 1
+                self.caught_up += 1
+                continue
+
+            # Auf den nächsten Rasterpunkt nach jetzt springen
+            catch_up_run = 0
+            next_k = math.floor((now - start) / self.period) + 1
+            self.skipped += next_k - k
+            k = next_k
+            degraded = self.policy == self.DEGRADE
+            self.clock.sleep(start + k * self.period - now)
+
+    def get_metrics(self) -> Dict[str, float]:
+        return {
+            "ticks": self.ticks,
+            "missed": self.missed,
+            "skipped": self.skipped,
+            "caught_up": self.caught_up,
+            "degraded_ticks": self.degraded_ticks,
+            "max_lateness_s": self.max_lateness,
+        }
@@ -1,9 +1,21 @@
-import datetime
 from datetime import timedelta
 from typing import Tuple, List
 
+_MS = timedelta(milliseconds=1)
+
 
 class TrafficLight:
+    """
+    Ampel mit Position und festem Zyklus. Ein Zyklus beginnt (um `offset` verschoben) mit der Grünphase,
+    danach folgt die Rotphase. Alle Zeiten werden intern als ganze Millisekunden gehalten.
+    """
+
+    __slots__ = (
+        "id", "latitude", "longitude",
+        "green_ms", "red_ms", "offset_ms", "cycle_ms",
+        "mock_initialized",
+    )
+
     def __init__(self, id: str, lat: float, lon: float) -> None:
         """
         Initialisiert eine Ampel mit Position und individuellen Zyklusparametern.
@@ -13,62 +25,110 @@ class TrafficLight:
         self.longitude: float = lon
 
         # Mock-Parameter
-        self.green_duration: datetime.timedelta = datetime.timedelta(seconds=10)
-        self.red_duration: datetime.timedelta = datetime.timedelta(seconds=40)
-        self.offset: datetime.timedelta = datetime.timedelta(seconds=0)
+        self.set_timing_ms(10000, 40000, 0)
         self.mock_initialized: bool = False
 
+    def set_timing_ms(self, green_ms: int, red_ms: int, offset_ms: int) -> None:
+        """
+        Setzt Grün-, Rotphase und Versatz in Millisekunden und berechnet die Zykluslänge vor.
+        """
+        self.green_ms: int = int(green_ms)
+        self.red_ms: int = int(red_ms)
+        self.cycle_ms: int = self.green_ms + self.red_ms
+        self.offset_ms: int = int(offset_ms)
+
+    def set_timing(self, green_s: float, red_s: float, offset_s: float) -> None:
+        """
+        Setzt Grün-, Rotphase und Versatz in Sekunden.
+        """
+        self.set_timing_ms(round(green_s * 1000), round(red_s * 1000), round(offset_s * 1000))
+
+    # timedelta-Sicht auf die Zyklusparameter
+    @property
+    def green_duration(self) -> timedelta:
+        return timedelta(milliseconds=self.green_ms)
+
+    @green_duration.setter
+    def green_duration(self, value: timedelta) -> None:
+        self.set_timing_ms(value // _MS, self.red_ms, self.offset_ms)
+
+    @property
+    def red_duration(self) -> timedelta:
+        return timedelta(milliseconds=self.red_ms)
+
+    @red_duration.setter
+    def red_duration(self, value: timedelta) -> None:
+        self.set_timing_ms(self.green_ms, value // _MS, self.offset_ms)
+
+    @property
+    def offset(self) -> timedelta:
+        return timedelta(milliseconds=self.offset_ms)
+
+    @offset.setter
+    def offset(self, value: timedelta) -> None:
+        self.set_timing_ms(self.green_ms, self.red_ms, value // _MS)
+
     def get_location(self) -> Tuple[float, float]:
         return (self.latitude, self.longitude)
 
     def get_id(self) -> str:
         return f"{self.id}"
 
+    def get_phase_ms(self, now_ms: int) -> Tuple[bool, int]:
+        """
+        Phase zum Zeitpunkt now_ms ohne timedelta-Objekte.
+        :param now_ms: Zeit in Millisekunden
+        :return: (True bei Grün, verbleibende Millisekunden der aktuellen Phase)
+        """
+        time_in_cycle = (now_ms - self.offset_ms) % self.cycle_ms
+        if time_in_cycle < self.green_ms:
+            return True, self.green_ms - time_in_cycle
+        return False, self.cycle_ms - time_in_cycle
+
     def get_phase(
             self,
             current_time: timedelta
-    ) -> Tuple[str, timedelta.seconds]:  # 'green' or 'red', phase rest duration
+    ) -> Tuple[str, timedelta]:  # 'green' or 'red', phase rest duration
         """
         Bestimmt die aktuelle Phase der Ampel und die verbleibende Zeit bis zum Phasenwechsel.
         :param current_time:
         :returns : Tuple mit Phase ('green' oder 'red') und verbleibender Zeit in der Phase als timedelta
         """
-        cycle_duration = self.green_duration + self.red_duration
-        # Zyklusstartzeit so berechnen, dass offset mit eingerechnet wird
-        start_time = timedelta(seconds=0) + self.offset
-        time_in_cycle = (current_time - start_time) % cycle_duration
+        is_green, remaining_ms = self.get_phase_ms(current_time // _MS)
+        return ('green' if is_green else 'red'), timedelta(milliseconds=remaining_ms)
 
-        if time_in_cycle < self.green_duration:
-            phase = 'green'
-            remaining = self.green_duration - time_in_cycle
+    def green_window_ms(self, now_ms: int, k: int = 0) -> Tuple[int, int]:
+        """
+        Geschlossene Form für das k-te Grünfenster ab now_ms. k=0 ist die aktuelle Grünphase, falls die
+        Ampel gerade grün ist (Start dann <= 0), sonst die nächste.
+        :param now_ms: Zeit in Millisekunden
+        :param k: Index des Grünfensters
+        :return: (Start, Ende) des Fensters in Millisekunden relativ zu now_ms
+        """
+        time_in_cycle = (now_ms - self.offset_ms) % self.cycle_ms
+        if time_in_cycle < self.green_ms:
+            start = -time_in_cycle
         else:
-            phase = 'red'
-            time_in_red = time_in_cycle - self.green_duration
-            remaining = self.red_duration - time_in_red
+            start = self.cycle_ms - time_in_cycle
+        start += k * self.cycle_ms
+        return start, start + self.green_ms
 
-        return phase, remaining
+    def next_green_start_ms(self, now_ms: int, k: int = 0) -> int:
+        """
+        Millisekunden bis zum Beginn der k-ten zukünftigen Grünphase (k=0: nächster Grünstart nach now_ms).
+        """
+        return self.cycle_ms - (now_ms - self.offset_ms) % self.cycle_ms + k * self.cycle_ms
 
     def get_next_green_starts(
         self,
         current_time: timedelta,
+        count: int = 50
     ) -> List[timedelta]:
         """
-        Gibt für die kommenden 50 Zyklen die Zeit in Sekunden bis zum Grünstart zurück.
+        Gibt für die kommenden `count` Zyklen die Zeit bis zum Grünstart zurück.
+        Für Abfragen pro Tick besser next_green_start_ms bzw. green_window_ms nutzen.
         :param current_time:
-        :return: Liste von timedeltas in sekunden bis zum Beginn der nächsten 50 Grünphasen
+        :return: Liste von timedeltas bis zum Beginn der nächsten Grünphasen
         """
-        cycle_duration = self.green_duration + self.red_duration
-        # Zeit innerhalb des Zyklus unter Berücksichtigung des Offsets
-        time_in_cycle = (current_time - self.offset) % cycle_duration
-        # Verzögerung bis zum nächsten Grünstart
-        # first_delay = cycle_duration - time_in_cycle
-
-        if time_in_cycle < self.red_duration:
-            first_delay = self.red_duration - time_in_cycle
-        else:
-            first_delay = cycle_duration - (time_in_cycle - self.red_duration)
-
-        starts: List[timedelta] = []
-        for i in range(50):
-            starts.append(first_delay + i * cycle_duration)
-        return starts
+        first_ms = self.next_green_start_ms(current_time // _MS)
+        return [timedelta(milliseconds=first_ms + i * self.cycle_ms) for i in range(count)]
@@ -4,18 +4,33 @@ Lädt Ampeldaten aus einer GeoJSON-Datei und liefert relevante Ampeln entlang ei
 """
 # from datetime import datetime #nur zum messen
 import json
-from datetime import timedelta
-from typing import List, Tuple
+import logging
+from typing import List, Optional, Sequence, Tuple
 
+import numpy as np
+
+from RideLog import get_logger
+from RouteCorridor import RouteCorridor
+from SignalTimingProvider import StaticTimingProvider
 from TrafficLight import TrafficLight  # , Phase
+from TrafficLightIndex import TrafficLightIndex
+from TrafficLightStore import TrafficLightStore, write_store
+from utils import as_route_array, haversine
+
+log = get_logger("fetcher")
 
+# Zeitentabelle aus PhaseFitter.py (gemessene Grün-/Rotphasen und Versätze, nach OSM-Knotennummer)
+SIGNAL_TIMINGS_FILE = "signal_timings.json"
 
 class TrafficLightFetcher:
     def __init__(self) -> None:
         """
         Initialisiert den Fetcher mit leerer Ampelliste.
         """
-        self._all_traffic_lights: List[TrafficLight] = []
+        # Liste aus load_from_json oder ein TrafficLightStore, der Ampeln erst bei Zugriff erzeugt
+        self._all_traffic_lights: Sequence[TrafficLight] = []
+        self._locations: List[Tuple[float, float]] = []
+        self._index: Optional[TrafficLightIndex] = None
 
     def haversine_distance(
         self, lat1: float, lon1: float, lat2: float, lon2: float
@@ -23,19 +38,14 @@ class TrafficLightFetcher:
         """
         Berechnet die Entfernung (Meter) zwischen zwei Koordinaten via Haversine-Formel.
         """
-        from math import radians, sin, cos, sqrt, atan2
-        R = 6371000.0  # Erdradius in Metern
-        dlat = radians(lat2 - lat1)
-        dlon = radians(lon2 - lon1)
-        a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
-        return R * c
+        return haversine((lat1, lon1), (lat2, lon2))
 
-    def load_from_json(self, filename: str) -> bool:
+    def load_from_json(self, filename: str, timings_file: Optional[str] = SIGNAL_TIMINGS_FILE) -> bool:
         """
         Lädt Ampeln aus einer GeoJSON-Datei im Overpass-Format.
 
         :param filename: Pfad zur JSON-Datei
+        :param timings_file: Zeitentabelle, die danach übernommen wird (siehe load_timings), None für keine
         :return: True, wenn Laden erfolgreich war, sonst False
         """
         try:
@@ -44,14 +54,8 @@ class TrafficLightFetcher:
         except (OSError, json.JSONDecodeError):
             return False
 
-        # gemessene werte für strecke innere kanalstr, erste ampel venloer bis letzte ampel aachener
-        mock_configs = {
-            "venloer/4279001084": (57, 53, 0),  # venloer
-            "vogelsanger/2107720091": (65, 45, 6),  # vogelsanger
-            "weinsberg/2603639844": (70, 40, 60),  # weinsberg
-            # "hollar/8546960460": (90, 20, 32),  # hollar
-            # "aachener/750549269": (55, 55, 65), #aachener
-        }
+        if not isinstance(self._all_traffic_lights, list):
+            self._all_traffic_lights = [self._all_traffic_lights[i] for i in range(len(self._all_traffic_lights))]
 
         # Erstelle die Ampel Objekte
         for feature in data.get('features', []):
@@ -63,18 +67,72 @@ class TrafficLightFetcher:
             id_ = feature.get("id", "unknown")
 
             tl = TrafficLight(id_, float(lat), float(lon))
+            self._all_traffic_lights.append(tl)
 
-            if id_ in mock_configs:
-                grn, red, off = mock_configs[id_]
-                tl.green_duration = timedelta(seconds=grn)
-                tl.red_duration = timedelta(seconds=red)
-                tl.offset = timedelta(seconds=off)
-                tl.mock_initialized = True
+        self._locations = [tl.get_location() for tl in self._all_traffic_lights]
+        self._index = TrafficLightIndex(self._locations)
+        if timings_file is not None:
+            self.load_timings(timings_file)
+        return True
 
-            self._all_traffic_lights.append(tl)
+    def load_from_binary(self, filename: str, timings_file: Optional[str] = SIGNAL_TIMINGS_FILE) -> bool:
+        """
+        Lädt Ampeln aus einer mit save_binary bzw. TrafficLightStore.py erzeugten Binärdatei per mmap.
+        Ersetzt bereits geladene Ampeln.
 
+        :param filename: Pfad zur Binärdatei
+        :param timings_file: Zeitentabelle, die danach übernommen wird (siehe load_timings), None für keine
+        :return: True, wenn Laden erfolgreich war, sonst False
+        """
+        try:
+            store = TrafficLightStore(filename)
+        except (OSError, ValueError):
+            return False
+
+        self._all_traffic_lights = store
+        self._locations = store.locations()
+        self._index = store.load_index()
+        if self._index is None:
+            self._index = TrafficLightIndex(self._locations)
+        if timings_file is not None:
+            self.load_timings(timings_file)
         return True
 
+    def load_timings(self, filename: str) -> int:
+        """
+        Übernimmt gemessene Zyklen aus einer mit PhaseFitter.py erzeugten Zeitentabelle (über StaticTimingProvider).
+        Zugeordnet wird über die volle ID oder die OSM-Knotennummer am Ende der Ampel-ID ("venloer/4279001084",
+        "node/4279001084"); die Ampeln gelten danach als initialisiert. Aus einem TrafficLightStore werden nur
+        die betroffenen Ampeln erzeugt.
+
+        :param filename: Pfad zur Zeitentabelle
+        :return: Anzahl der Ampeln, deren Zyklus gesetzt wurde (0, wenn die Datei fehlt)
+        """
+        lights = self._all_traffic_lights
+        get_id = lights.get_id if isinstance(lights, TrafficLightStore) else (lambda i: lights[i].get_id())
+        ids = [get_id(i) for i in range(len(lights))]
+        # Zuordnung über ID bzw. Knotennummer wie bei allen Zeitenquellen, siehe parse_timings
+        timings = StaticTimingProvider(filename).fetch(ids)
+        applied = 0
+        for i, light_id in enumerate(ids):
+            timing = timings.get(light_id)
+            if timing is None:
+                continue
+            light = lights[i]
+            light.set_timing(timing.green_s, timing.red_s, timing.offset_s)
+            light.mock_initialized = True
+            applied += 1
+        log.info("%d gemessene Ampelzyklen aus %s übernommen", applied, filename)
+        return applied
+
+    def save_binary(self, filename: str) -> None:
+        """
+        Schreibt alle geladenen Ampeln samt Gitterindex als Binärdatei für load_from_binary.
+        """
+        if self._index is None:
+            self._index = TrafficLightIndex([tl.get_location() for tl in self._all_traffic_lights])
+        write_store(self._all_traffic_lights, filename, self._index)
+
     def get_relevant_traffic_lights(
             self,
             route: List[Tuple[float, float]],
@@ -83,28 +141,35 @@ class TrafficLightFetcher:
         """
         Gibt alle Ampeln zurück, die maximal `buffer` Meter links und rechts entlang
         der Route (als Polyline) liegen, sortiert nach ihrem Auftreten entlang der Route.
+        In der Update-Schleife besser einmal pro Route build_corridor() nutzen.
+        """
+        return self.build_corridor(route, buffer).lights
+
+    def build_corridor(
+            self,
+            route: List[Tuple[float, float]],
+            buffer: float = 2.0,
+            cum_distances: Optional[np.ndarray] = None
+    ) -> RouteCorridor:
+        """
+        Sucht alle Ampeln, die maximal `buffer` Meter links und rechts entlang der Route (als Polyline)
+        liegen, und legt sie sortiert mit Segment, t und Distanz ab Routenanfang in einem Korridor ab.
         """
         # start_time = datetime.now() #nur zum messen
 
+        route_arr = as_route_array(route)
         relevant = []
-        if not route:
-            return []
+        if len(route_arr) == 0:
+            return RouteCorridor(route_arr, [], [], [], cum_distances)
+        route = route_arr.tolist()
 
         from math import radians, cos, sqrt
 
         R = 6371000.0  # Erdradius in Metern
 
-        # --- Bounding Box vorbereiten (ca. 50–100m Sicherheitsabstand je nach Buffer) ---
-        margin_deg = buffer / 111111.0  # grob 1° ~ 111 km → in Grad umrechnen
-        lat_vals = [lat for lat, _ in route]
-        lon_vals = [lon for _, lon in route]
-        lat_min = min(lat_vals) - margin_deg
-        lat_max = max(lat_vals) + margin_deg
-        lon_min = min(lon_vals) - margin_deg
-        lon_max = max(lon_vals) + margin_deg
-
-        def is_within_bbox(lat: float, lon: float) -> bool:
-            return lat_min <= lat <= lat_max and lon_min <= lon <= lon_max
+        if self._index is None:
+            self._locations = [tl.get_location() for tl in self._all_traffic_lights]
+            self._index = TrafficLightIndex(self._locations)
 
         def proj_and_distance(
                 lat_p: float, lon_p: float,
@@ -130,27 +195,38 @@ class TrafficLightFetcher:
             dist = sqrt((xp - proj_x) ** 2 + (yp - proj_y) ** 2)
             return t_clamped, dist
 
-        # --- Nur relevante Ampeln in BBox prüfen ---
-        for light in self._all_traffic_lights:
-            lat_l, lon_l = light.get_location()
-
-            # Skip if not in bounding box
-            if not is_within_bbox(lat_l, lon_l):
-                continue
+        # --- Nur Ampeln aus Gitterzellen nahe der Route prüfen, jeweils nur gegen die Segmente,
+        # in deren Nähe sie gefunden wurden ---
+        candidates = self._index.candidates_along_route(route, buffer)
+        for light_idx in sorted(candidates):
+            lat_l, lon_l = self._locations[light_idx]
 
             best = None
-            for idx, ((lat1, lon1), (lat2, lon2)) in enumerate(zip(route, route[1:])):
+            for idx in sorted(candidates[light_idx]):
+                (lat1, lon1), (lat2, lon2) = route[idx], route[idx + 1]
                 t, d = proj_and_distance(lat_l, lon_l, lat1, lon1, lat2, lon2)
                 if d <= buffer:
                     if best is None or (idx, t) < best:
                         best = (idx, t)
             if best is not None:
-                relevant.append((light, best[0], best[1]))
+                # Erst hier wird die Ampel (ggf. aus dem Store) materialisiert
+                relevant.append((self._all_traffic_lights[light_idx], best[0], best[1]))
 
         relevant.sort(key=lambda item: (item[1], item[2]))
 
-        print('relevante Ampeln:')
-        for i, (light, segment, t_val) in enumerate(relevant):
-            print(f"Ampel Nr. {i}: {light.get_id()}, Segment: {segment}, t: {t_val}")
-
-        return [item[0] for item in relevant]
+        corridor = RouteCorridor(
+            route_arr,
+            [item[0] for item in relevant],
+            [item[1] for item in relevant],
+            [item[2] for item in relevant],
+            cum_distances
+        )
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("relevante Ampeln", extra={"stage": "corridor", "data": {"lights": [
+                {"id": light.get_id(), "segment": int(corridor.segments[i]),
+                 "t": float(corridor.ts[i]), "distance_m": round(offset, 1)}
+                for i, (light, offset) in enumerate(zip(corridor.lights, corridor.offsets.tolist()))
+            ]}})
+
+        return corridor
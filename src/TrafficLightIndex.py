@@ -0,0 +1,113 @@
+# traffic_light_index.py
+"""
+Räumlicher Index (uniformes Gitter) über alle geladenen Ampeln.
+"""
+
+from math import radians, cos, sqrt, ceil, floor
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+R = 6371000.0  # Erdradius in Metern
+
+
+class TrafficLightIndex:
+    """
+    Legt die Ampeln in ein uniformes Gitter mit Zellen von `cell_size` Metern.
+    Eine Abfrage entlang einer Route besucht nur die Zellen, die von den Segmenten
+    (plus Puffer) berührt werden, statt jede Ampel gegen jedes Segment zu prüfen.
+    """
+
+    def __init__(
+        self,
+        locations: Sequence[Tuple[float, float]],
+        cell_size: float = 100.0,
+        ref_lat: Optional[float] = None
+    ) -> None:
+        """
+        :param locations: (lat, lon) je Ampel, der Index in dieser Liste ist die Ampel-ID im Gitter
+        :param cell_size: Kantenlänge einer Gitterzelle in Metern
+        :param ref_lat: Referenzbreite der Projektion, Standard: mittlere Breite der Ampeln
+        """
+        self.cell_size: float = cell_size
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+
+        # Lokale, flächentreue Näherung: eine Referenzbreite für den ganzen Datensatz
+        if ref_lat is None:
+            ref_lat = sum(lat for lat, _ in locations) / len(locations) if locations else 0.0
+        self.ref_lat: float = ref_lat
+        self._kx: float = radians(1.0) * R * cos(radians(ref_lat))
+        self._ky: float = radians(1.0) * R
+
+        for i, (lat, lon) in enumerate(locations):
+            self._cells.setdefault(self._cell_of(lat, lon), []).append(i)
+
+    @classmethod
+    def from_cells(
+        cls,
+        cells: Dict[Tuple[int, int], List[int]],
+        cell_size: float,
+        ref_lat: float
+    ) -> "TrafficLightIndex":
+        """
+        Erzeugt den Index aus bereits berechneten Zellen (z. B. aus einem TrafficLightStore).
+        """
+        index = cls([], cell_size, ref_lat)
+        index._cells = cells
+        return index
+
+    def cells(self) -> Dict[Tuple[int, int], List[int]]:
+        """
+        Zellen des Gitters: (x, y) -> Ampel-Indizes.
+        """
+        return self._cells
+
+    def __len__(self) -> int:
+        return sum(len(members) for members in self._cells.values())
+
+    def _cell_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (
+            floor(lon * self._kx / self.cell_size),
+            floor(lat * self._ky / self.cell_size),
+        )
+
+    def candidates_along_route(
+        self,
+        route: List[Tuple[float, float]],
+        buffer: float
+    ) -> Dict[int, Set[int]]:
+        """
+        Sammelt alle Ampeln, die in einer Zelle nahe der Route liegen.
+
+        Jedes Segment wird in Schritten von höchstens einer Zellbreite abgetastet; um jeden
+        Abtastpunkt werden die Nachbarzellen besucht, die den Puffer abdecken. Jede Ampel mit
+        Abstand <= `buffer` zu einem Segment ist damit garantiert enthalten.
+
+        :param route: Liste von (lat, lon)-Wegpunkten
+        :param buffer: Pufferbreite in Metern
+        :return: Dict Ampel-Index -> Menge der Segmentindizes, in deren Nähe sie liegt
+        """
+        candidates: Dict[int, Set[int]] = {}
+        if not self._cells or len(route) < 2:
+            return candidates
+
+        # Zwischen zwei Abtastpunkten liegt jeder Segmentpunkt höchstens cell_size / 2 vom
+        # nächsten Abtastpunkt entfernt → Nachbarschaftsradius in Zellen
+        ring = int(ceil((self.cell_size / 2 + buffer) / self.cell_size))
+
+        for idx, ((lat1, lon1), (lat2, lon2)) in enumerate(zip(route, route[1:])):
+            dx = (lon2 - lon1) * self._kx
+            dy = (lat2 - lat1) * self._ky
+            steps = max(1, int(ceil(sqrt(dx * dx + dy * dy) / self.cell_size)))
+
+            visited: Set[Tuple[int, int]] = set()
+            for s in range(steps + 1):
+                f = s / steps
+                cx, cy = self._cell_of(lat1 + (lat2 - lat1) * f, lon1 + (lon2 - lon1) * f)
+                for gx in range(cx - ring, cx + ring + 1):
+                    for gy in range(cy - ring, cy + ring + 1):
+                        visited.add((gx, gy))
+
+            for cell in visited:
+                for light_idx in self._cells.get(cell, ()):
+                    candidates.setdefault(light_idx, set()).add(idx)
+
+        return candidates
@@ -1,8 +1,11 @@
-import math
-from typing import Tuple, List, Optional
+from typing import Dict, Tuple, List, Optional
 
+import numpy as np
+
+from RouteCorridor import RouteCorridor
+from RouteCursor import RouteCursor
 from TrafficLight import TrafficLight
-from utils import haversine
+from utils import as_route_array, cumulative_distances, project_onto_route
 
 
 class TrafficLightSelector:
@@ -11,51 +14,54 @@ class TrafficLightSelector:
     """
 
     def __init__(self):
-        self.route: List[Tuple[float, float]] = []
-        self._cum_distances: List[float] = []
+        self.route: np.ndarray = as_route_array([])
+        self._cum_distances: np.ndarray = np.zeros(0)
+        self._cursor: RouteCursor = RouteCursor(self.route, self._cum_distances)
+        # Distanz entlang der aktuellen Route je Ampel-ID, gilt bis zur nächsten Route
+        self._light_offsets: Dict[str, float] = {}
+        self.corridor: Optional[RouteCorridor] = None
+        # Distanz der zuletzt zugeordneten Position ab Routenanfang
+        self.position_along: float = 0.0
 
     def set_route(self, route: List[Tuple[float, float]]) -> None:
         """
         Legt die aktuelle Route fest und berechnet die akkumulierten Distanzen für Wegpunkte.
         :param route: Liste von GPS-Koordinaten der Route in Fahrtrichtung.
         """
-        self.route = route
+        self.route = as_route_array(route)
         self._compute_cumulative_distances()
+        self._cursor = RouteCursor(self.route, self._cum_distances)
+        self._light_offsets = {}
+        self.corridor = None
+        self.position_along = 0.0
+
+    def set_corridor(self, corridor: RouteCorridor) -> None:
+        """
+        Übernimmt Route, akkumulierte Distanzen und Ampel-Offsets aus einem vorab gebauten Korridor,
+        ohne sie neu zu berechnen.
+        """
+        self.route = corridor.route
+        self._cum_distances = corridor.cum_distances
+        self._cursor = RouteCursor(self.route, self._cum_distances)
+        self._light_offsets = {light.id: off for light, off in zip(corridor.lights, corridor.offsets.tolist())}
+        self.corridor = corridor
+        self.position_along = 0.0
 
     def _compute_cumulative_distances(self) -> None:
         """
-        Erzeugt eine Liste, in der jeder Eintrag die Distanz ab Routenanfang bis zu diesem Waypoint ist.
+        Erzeugt ein Array, in dem jeder Eintrag die Distanz ab Routenanfang bis zu diesem Waypoint ist.
         """
-        self._cum_distances = [0.0]
-        for a, b in zip(self.route, self.route[1:]):
-            dist = haversine(a, b)
-            self._cum_distances.append(self._cum_distances[-1] + dist)
+        self._cum_distances = cumulative_distances(self.route)
 
     def _distance_along_route(self, point: Tuple[float, float]) -> float:
         """
         Findet auf welchem Segment der Punkt am nächsten liegt, projiziert ihn darauf
         und gibt die Strecke ab Start bis zum Projektionspunkt zurück.
         """
-        best_dist = float('inf')
-        best_along = 0.0
-
-        for i, (a, b) in enumerate(zip(self.route, self.route[1:])):
-            dx, dy = b[0] - a[0], b[1] - a[1]
-            seg_len2 = dx * dx + dy * dy
-            if seg_len2 == 0:
-                continue
-
-            # Projektion von point auf AB
-            t = ((point[0] - a[0]) * dx + (point[1] - a[1]) * dy) / seg_len2
-            t_clamped = max(0.0, min(1.0, t))
-            proj = (a[0] + t_clamped * dx, a[1] + t_clamped * dy)
-
-            d = haversine(point, proj)
-            if d < best_dist:
-                best_dist = d
-                best_along = self._cum_distances[i] + math.sqrt(seg_len2) * t_clamped
-
-        return best_along
+        if len(self.route) < 2:
+            return 0.0
+        _, _, along, _ = project_onto_route([point], self.route, self._cum_distances)
+        return float(along[0])
 
     def get_next_traffic_light(
         self,
@@ -69,15 +75,29 @@ class TrafficLightSelector:
         :param lights: Sortierte Liste relevanter TrafficLight-Objekte
         :return: Nächste Ampel oder None, falls keine vorhanden
         """
-        if not self.route or not lights:
+        if len(self.route) == 0 or not lights:
             return None
+        if len(self.route) < 2:
+            return lights[-1]
+
+        # Ampeln des eigenen Korridors: Offsets liegen sortiert vor → binäre Suche
+        if self.corridor is not None and lights is self.corridor.lights:
+            self.position_along = self._cursor.locate(current_pos)
+            return lights[min(self.corridor.next_index(self.position_along), len(lights) - 1)]
+
+        # Noch unbekannte Ampeln gesammelt projizieren
+        missing = [light for light in lights if light.id not in self._light_offsets]
+        if missing:
+            _, _, along, _ = project_onto_route(
+                [light.get_location() for light in missing], self.route, self._cum_distances
+            )
+            for light, light_dist in zip(missing, along):
+                self._light_offsets[light.id] = float(light_dist)
 
-        pos_dist = self._distance_along_route(current_pos)
+        pos_dist = self._cursor.locate(current_pos)
+        self.position_along = pos_dist
         for light in lights:
-            # Verwende get_location() statt direkten Zugriff auf Attribute
-            light_loc = light.get_location()
-            light_dist = self._distance_along_route(light_loc)
-            if light_dist > pos_dist:
+            if self._light_offsets[light.id] > pos_dist:
                 return light
 
         # Alle Ampeln passiert -> letzte zurückgeben
@@ -0,0 +1,189 @@
+# traffic_light_store.py
+"""
+Spaltenorientierte Binärdatei für Ampeldaten, die per mmap geladen wird.
+
+Aufbau (little endian):
+    Header:   magic "RSTL", Version (u32), Anzahl Ampeln (u32), Anzahl Sektionen (u32)
+    Tabelle:  je Sektion Name (8 Byte), Offset (u64), Länge in Byte (u64)
+    Sektionen, jeweils auf 8 Byte ausgerichtet:
+        idoff   u64[n+1]  Start jeder ID im idblob
+        idblob  UTF-8-IDs hintereinander
+        lat     f8[n]
+        lon     f8[n]
+        green   i4[n]     Grünphase in ms
+        red     i4[n]     Rotphase in ms
+        offset  i4[n]     Versatz in ms
+        init    u1[n]     1, wenn Zyklusparameter gesetzt sind (mock_initialized)
+    Optional der Gitterindex (TrafficLightIndex):
+        gridmeta f8[2]     Zellgröße in Metern, Referenzbreite
+        cellkey  i8[c, 2]  Zellkoordinaten
+        cellptr  u64[c+1]  Start der Zelle in cellmem
+        cellmem  u4[...]   Ampel-Indizes je Zelle
+
+Erzeugen:  python TrafficLightStore.py traffic_light.json traffic_light.bin
+"""
+
+import mmap
+import struct
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from TrafficLight import TrafficLight
+from TrafficLightIndex import TrafficLightIndex
+
+MAGIC = b"RSTL"
+VERSION = 1
+_HEADER = struct.Struct("<4sIII")
+_SECTION = struct.Struct("<8sQQ")
+
+
+def write_store(
+    lights: Sequence[TrafficLight],
+    filename: str,
+    index: Optional[TrafficLightIndex] = None
+) -> None:
+    """
+    Schreibt Ampeln (und optional deren Gitterindex) als Binärdatei.
+    :param lights: Ampeln, ihre Reihenfolge bestimmt die Indizes im Store
+    :param filename: Zieldatei
+    :param index: Gitterindex über genau diese Ampeln, wird mitgespeichert
+    """
+    ids = [light.get_id().encode("utf-8") for light in lights]
+    id_offsets = np.zeros(len(ids) + 1, dtype="<u8")
+    np.cumsum([len(i) for i in ids], out=id_offsets[1:])
+
+    sections: List[Tuple[bytes, bytes]] = [
+        (b"idoff", id_offsets.tobytes()),
+        (b"idblob", b"".join(ids)),
+        (b"lat", np.array([light.latitude for light in lights], dtype="<f8").tobytes()),
+        (b"lon", np.array([light.longitude for light in lights], dtype="<f8").tobytes()),
+        (b"green", np.array([light.green_ms for light in lights], dtype="<i4").tobytes()),
+        (b"red", np.array([light.red_ms for light in lights], dtype="<i4").tobytes()),
+        (b"offset", np.array([light.offset_ms for light in lights], dtype="<i4").tobytes()),
+        (b"init", np.array([light.mock_initialized for light in lights], dtype="u1").tobytes()),
+    ]
+
+    if index is not None:
+        cells = sorted(index.cells().items())
+        keys = np.array([key for key, _ in cells], dtype="<i8").reshape(-1, 2)
+        ptr = np.zeros(len(cells) + 1, dtype="<u8")
+        np.cumsum([len(members) for _, members in cells], out=ptr[1:])
+        members = np.array([m for _, ms in cells for m in ms], dtype="<u4")
+        sections += [
+            (b"gridmeta", np.array([index.cell_size, index.ref_lat], dtype="<f8").tobytes()),
+            (b"cellkey", keys.tobytes()),
+            (b"cellptr", ptr.tobytes()),
+            (b"cellmem", members.tobytes()),
+        ]
+
+    # Offsets der Sektionen nach Header und Tabelle, jeweils auf 8 Byte ausgerichtet
+    pos = _HEADER.size + _SECTION.size * len(sections)
+    table = []
+    for name, payload in sections:
+        pos = (pos + 7) & ~7
+        table.append((name, pos, len(payload)))
+        pos += len(payload)
+
+    with open(filename, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(lights), len(sections)))
+        for name, offset, length in table:
+            f.write(_SECTION.pack(name, offset, length))
+        for (name, offset, _), (_, payload) in zip(table, sections):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(payload)
+
+
+class TrafficLightStore:
+    """
+    Liest eine mit write_store erzeugte Datei per mmap. Die Spalten sind NumPy-Sichten auf die Datei,
+    TrafficLight-Objekte entstehen erst beim Zugriff über store[i] und werden dann wiederverwendet.
+    """
+
+    def __init__(self, filename: str) -> None:
+        """
+        :param filename: Pfad zur Binärdatei
+        :raises ValueError: bei falschem Format oder falscher Version
+        """
+        with open(filename, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, n_sections = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{filename} ist keine Ampel-Binärdatei (Version {VERSION})")
+        self._count: int = count
+
+        self._sections: Dict[str, Tuple[int, int]] = {}
+        for i in range(n_sections):
+            name, offset, length = _SECTION.unpack_from(self._mm, _HEADER.size + i * _SECTION.size)
+            self._sections[name.rstrip(b"\0").decode("ascii")] = (offset, length)
+
+        self._id_offsets = self._column("idoff", "<u8")
+        self.latitudes: np.ndarray = self._column("lat", "<f8")
+        self.longitudes: np.ndarray = self._column("lon", "<f8")
+        self.green_ms: np.ndarray = self._column("green", "<i4")
+        self.red_ms: np.ndarray = self._column("red", "<i4")
+        self.offset_ms: np.ndarray = self._column("offset", "<i4")
+        self.initialized: np.ndarray = self._column("init", "u1")
+        self._lights: Dict[int, TrafficLight] = {}
+
+    def _column(self, name: str, dtype: str) -> np.ndarray:
+        offset, length = self._sections[name]
+        return np.frombuffer(self._mm, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=offset)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get_id(self, i: int) -> str:
+        offset, _ = self._sections["idblob"]
+        start, end = int(self._id_offsets[i]), int(self._id_offsets[i + 1])
+        return self._mm[offset + start:offset + end].decode("utf-8")
+
+    def __getitem__(self, i: int) -> TrafficLight:
+        """
+        Materialisiert die Ampel mit Index i (einmalig, danach aus dem Zwischenspeicher).
+        """
+        light = self._lights.get(i)
+        if light is None:
+            if not 0 <= i < self._count:
+                raise IndexError(i)
+            light = TrafficLight(self.get_id(i), float(self.latitudes[i]), float(self.longitudes[i]))
+            if self.initialized[i]:
+                light.set_timing_ms(int(self.green_ms[i]), int(self.red_ms[i]), int(self.offset_ms[i]))
+                light.mock_initialized = True
+            self._lights[i] = light
+        return light
+
+    def locations(self) -> List[Tuple[float, float]]:
+        return list(zip(self.latitudes.tolist(), self.longitudes.tolist()))
+
+    def load_index(self) -> Optional[TrafficLightIndex]:
+        """
+        Baut den Gitterindex aus der gespeicherten Sektion, None falls die Datei keinen enthält.
+        """
+        if "gridmeta" not in self._sections:
+            return None
+        cell_size, ref_lat = self._column("gridmeta", "<f8").tolist()
+        keys = self._column("cellkey", "<i8").reshape(-1, 2).tolist()
+        ptr = self._column("cellptr", "<u8").tolist()
+        members = self._column("cellmem", "<u4").tolist()
+        cells = {
+            (kx, ky): members[ptr[c]:ptr[c + 1]]
+            for c, (kx, ky) in enumerate(keys)
+        }
+        return TrafficLightIndex.from_cells(cells, cell_size, ref_lat)
+
+
+if __name__ == "__main__":
+    from TrafficLightFetcher import TrafficLightFetcher
+
+    if len(sys.argv) != 3:
+        print("Aufruf: python TrafficLightStore.py <eingabe.json> <ausgabe.bin>", file=sys.stderr)
+        sys.exit(2)
+    fetcher = TrafficLightFetcher()
+    if not fetcher.load_from_json(sys.argv[1]):
+        print(f"Konnte {sys.argv[1]} nicht laden.", file=sys.stderr)
+        sys.exit(1)
+    fetcher.save_binary(sys.argv[2])
+    print(f"{len(fetcher._all_traffic_lights)} Ampeln nach {sys.argv[2]} geschrieben.")
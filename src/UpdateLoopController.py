@@ -1,70 +1,340 @@
 # UpdateLoopController.py
 
-import time
-from datetime import datetime
+import logging
+import math
 from datetime import timedelta
-from typing import List, Tuple, Optional
+from typing import TYPE_CHECKING, Callable, List, Tuple, Optional
 
-from Cyclist import Cyclist
+import numpy as np
+
+from Clock import SystemClock
 from DestinationManager import DestinationManager
-from RoutePlanner import compute_route
+from GpsReader import NO_FIX, GpsFix
+from GreenWavePlanner import GreenWavePlanner
+from RideLog import get_logger, set_tick
+from RouteCorridor import RouteCorridor
+from RoutePlanner import compute_route, ors_metrics, refresh_route
+from RouteRefresher import RouteRefresher
+from SignalEstimator import SignalEstimator
+from SignalTimingProvider import TimingCache
 from SpeedAdvisor import SpeedAdvisor
+from TelemetryRecorder import TelemetryRecorder
+from TickProfiler import NullTickProfiler, TickProfiler
+from TickScheduler import TickScheduler
 from TrafficLight import TrafficLight
 from TrafficLightFetcher import TrafficLightFetcher
 from TrafficLightSelector import TrafficLightSelector
 from utils import haversine_along_route
 
+log = get_logger("controller")
+
+if TYPE_CHECKING:
+    # Cyclist importiert die PI-Hardwarebibliotheken, zur Laufzeit reicht jedes Objekt mit derselben Schnittstelle
+    from Cyclist import Cyclist
+
 
 class UpdateLoopController:
-    def __init__(self, tl_fetcher: TrafficLightFetcher, cyclist: Cyclist) -> None:
+    # Abstand der Routen-Neuberechnungen in Ticks
+    REFRESH_TICKS = 30
+
+    def __init__(
+        self,
+        tl_fetcher: TrafficLightFetcher,
+        cyclist: "Cyclist",
+        green_wave_lights: int = 0,
+        clock=None,
+        route_provider: Callable[[Tuple[float, float], Tuple[float, float]], np.ndarray] = compute_route,
+        interactive: bool = True,
+        background_refresh: bool = True,
+        profiler: Optional[TickProfiler] = None,
+        tick_policy: str = TickScheduler.SKIP,
+        recorder: Optional[TelemetryRecorder] = None,
+        estimator: Optional[SignalEstimator] = None,
+        timings: Optional[TimingCache] = None,
+        initial_route_wait: float = 10.0
+    ) -> None:
+        """
+        :param green_wave_lights: Anzahl der Ampeln, über die eine grüne Welle geplant wird
+                                  (0/1: nur die nächste Ampel über den SpeedAdvisor)
+        :param clock: Zeitquelle mit now() und sleep(), Standard: SystemClock (VirtualClock in der Simulation)
+        :param route_provider: berechnet die Route zwischen Start und Ziel
+        :param interactive: vor der ersten Runde auf Enter warten
+        :param background_refresh: Routen-Neuberechnung im Worker-Thread statt synchron
+        :param profiler: misst die Stufen jedes Ticks, ohne Angabe keine Messung
+        :param tick_policy: Verhalten bei verpassten Deadlines, siehe TickScheduler
+        :param recorder: schreibt Fix, Radgeschwindigkeit, Ampel und Empfehlung jedes Ticks ins Fahrtprotokoll
+        :param estimator: lernt Zyklen aus Halt und Anfahren an der nächsten Ampel und setzt sie in den Ampeln
+        :param timings: Ampelzeiten aus einer externen Quelle, beim Routenaufbau für den ganzen Korridor geholt
+                        und im Tick nur aus dem Speicher übernommen; gehen gelernten Zyklen vor
+        :param initial_route_wait: so viele Sekunden wartet der Fahrtbeginn höchstens auf die erste Route, danach
+                                   startet die Schleife und übernimmt sie, sobald sie da ist
+        """
         self.cyclist = cyclist
         self.tl_fetcher = tl_fetcher
+        self.clock = clock if clock is not None else SystemClock()
+        self.route_provider = route_provider
+        self.interactive = interactive
         self.tl_selector = TrafficLightSelector()
+        self.corridor: Optional[RouteCorridor] = None
+        self.route_refresher = RouteRefresher(
+            # Neuberechnungen unterwegs landen nicht im Routen-Cache, nur die Route ab Fahrtbeginn
+            route_provider=refresh_route if route_provider is compute_route else route_provider,
+            prepare=self._prepare_route,
+            background=background_refresh
+        )
+        self.green_wave_lights = green_wave_lights
+        self.green_wave_planner = GreenWavePlanner()
+        self.speed_advisor = SpeedAdvisor()
+        self.profiler = profiler if profiler is not None else NullTickProfiler()
+        self.tick_policy = tick_policy
+        self.scheduler: Optional[TickScheduler] = None
+        self.recorder = recorder
+        self.estimator = estimator
+        self.timings = timings
+        self.initial_route_wait = initial_route_wait
+        # Radsensor nur beim echten Cyclist vorhanden
+        self._wheel_speed: Optional[Callable[[], float]] = getattr(cyclist, "get_wheel_speed", None)
+        self.last_fix: GpsFix = NO_FIX
+        self.last_advice: Optional[Tuple[TrafficLight, timedelta, float, float]] = None
         self.last_next_light: Optional[TrafficLight] = None
         self.updateTrigger = 0
         self.duration = timedelta(seconds=0)
         self.firstStart = True
-        self.initTime = datetime.now()
+        self.tick_id = 0
+        self.initTime = self.clock.now()
+        self._init_monotonic = self.clock.monotonic()
 
-    def start_loop(self) -> None:
-        old_route: List[Tuple[float, float]] = []
-        time_step = timedelta(seconds=1)
-        print(f"Aktuelle Position: {self.cyclist.get_current_position()}")
-        while True:
-            old_route = self.update_cycle(self.duration, time_step, old_route)
-            time.sleep(time_step.seconds)
-            self.duration = datetime.now() - self.initTime  # + timedelta(seconds=57)
-
-    def update_cycle(self, duration: timedelta, time_step: timedelta, old_route):
-        while (self.cyclist.get_current_position()[0] == 0.0):
-            time.sleep(5)
-        if (self.firstStart):
+    def start_loop(
+        self,
+        stop_condition: Optional[Callable[[], bool]] = None,
+        time_step: timedelta = timedelta(seconds=1)
+    ) -> None:
+        """
+        :param stop_condition: beendet die Schleife, sobald sie True liefert (Standard: läuft endlos)
+        :param time_step: Abstand der Durchläufe
+        """
+        self._start_ride()
+        log.info("Aktuelle Position: %s", self.cyclist.get_current_position())
+        old_route = self._initial_route()
+
+        def tick(degraded: bool) -> None:
+            nonlocal old_route
+            # Fahrtzeit (Zeitbasis der Ampelzyklen) aus der monotonen Uhr, unabhängig von NTP-Korrekturen
+            if not self.firstStart:
+                self.duration = timedelta(seconds=self.clock.monotonic() - self._init_monotonic)
+            old_route = self.update_cycle(self.duration, time_step, old_route, degraded=degraded)
+
+        self.scheduler = TickScheduler(
+            rate=1.0 / time_step.total_seconds(),
+            policy=self.tick_policy,
+            clock=self.clock
+        )
+        try:
+            self.scheduler.run(tick, stop_condition)
+        finally:
+            self.route_refresher.shutdown()
+            log.info("Routen-Neuberechnungen", extra={"stage": "route", "data": self.route_refresher.get_metrics()})
+            if self.route_provider is compute_route:
+                log.info("ORS-Aufrufe", extra={"stage": "route", "data": ors_metrics()})
+
+    def _start_ride(self) -> None:
+        """
+        Wartet auf den ersten GPS-Fix und ggf. auf Enter und setzt dann den Nullpunkt der Fahrtzeit. Läuft vor
+        dem TickScheduler, sonst zählte die Wartezeit als verpasste Ticks (catch_up holte sie am Stück nach).
+        """
+        while self.cyclist.get_fix().lat == 0.0:
+            self.clock.sleep(5)
+        if self.interactive:
             input("Press enter to continue")
-            self.firstStart = False
-            self.initTime = datetime.now()
-            # duration = timedelta(seconds=60)
+        self.firstStart = False
+        self.initTime = self.clock.now()
+        self._init_monotonic = self.clock.monotonic()
+        if self.estimator is not None:
+            self.estimator.start_ride(self.initTime.timestamp())
+
+    def _initial_route(self) -> List[Tuple[float, float]]:
+        """
+        Holt die Route ab Fahrtbeginn über den RouteRefresher (Korridor samt gebündeltem Abruf der Ampelzeiten im
+        Worker) und wartet höchstens initial_route_wait Sekunden darauf, bevor der TickScheduler startet. Mit
+        allen Wiederholungen von OrsClient kann ein Abruf ein Vielfaches dauern; kommt die Route später, übernimmt
+        sie der Tick über poll().
+        :return: Route, leer wenn sie (noch) nicht da ist
+        """
         current_position = self.cyclist.get_current_position()
+        destination: Tuple[float, float] = DestinationManager.get_destination()
+        # mit der eigentlichen Routenquelle, damit die Route ab Fahrtbeginn in den Routen-Cache kommt
+        self.route_refresher.request(current_position, destination, provider=self.route_provider)
+        waited = 0.0
+        while True:
+            refreshed = self.route_refresher.poll()
+            if refreshed is not None:
+                route, prepared = refreshed
+                self._adopt_route(prepared)
+                return route
+            if not self.route_refresher.pending:
+                # fehlgeschlagen (siehe Warnung des RouteRefresher): neuer Versuch gleich im ersten Tick
+                self.updateTrigger = self.REFRESH_TICKS
+                return []
+            if waited >= self.initial_route_wait:
+                log.warning("Route nach %.0f s noch nicht da, Fahrt startet ohne", waited, extra={"stage": "route"})
+                self.updateTrigger = 0
+                return []
+            self.clock.sleep(0.1)
+            waited += 0.1
+
+    def _prepare_route(self, route) -> Tuple[RouteCorridor, TrafficLightSelector]:
+        """
+        Baut Korridor und Selector für eine neue Route; läuft auch im Worker des RouteRefresher und schreibt
+        deshalb nichts in die Ampeln (siehe _adopt_route).
+        """
+        corridor = self.tl_fetcher.build_corridor(route)
+        if self.timings is not None:
+            # ein gebündelter Abruf für alle Ampeln der Route, übernommen wird erst im Tick
+            self.timings.prefetch(corridor.lights)
+        selector = TrafficLightSelector()
+        selector.set_corridor(corridor)
+        return corridor, selector
+
+    def _adopt_route(self, prepared: Tuple[RouteCorridor, TrafficLightSelector]) -> None:
+        """
+        Übernimmt Korridor und Selector im Thread der Schleife. Gelernte Zyklen werden erst hier in die Ampeln
+        geschrieben, nicht im Worker, damit ein Tick nie eine halb aktualisierte Ampel sieht.
+        """
+        self.corridor, self.tl_selector = prepared
+        if self.estimator is not None:
+            # gelernte Zyklen vor dem Mock, ensure_timing lässt initialisierte Ampeln unverändert
+            for light in self.corridor.lights:
+                self.estimator.apply(light)
+
+    def _ensure_timing(self, light: TrafficLight) -> None:
+        # Zeiten aus dem Cache (nur Speicher), sonst Mock für noch unbekannte Ampeln
+        if self.timings is not None:
+            self.timings.apply(light, self.initTime.timestamp())
+        self.ensure_timing(light)
+
+    @staticmethod
+    def ensure_timing(light: TrafficLight) -> None:
+        if not light.mock_initialized:
+            log.info("Neue Ampel erkannt: %s", light.get_id(), extra={"stage": "selection"})
+
+            #todo Mock muss letztendlich entfernt werden
+            green, red, offset = 10, 20, 0
+
+            light.set_timing(green, red, offset)
+            light.mock_initialized = True
+
+    def _advise(
+        self,
+        next_light: TrafficLight,
+        current_position,
+        duration: timedelta,
+        distance_to_next_tl: float,
+        degraded: bool = False
+    ):
+        """
+        Empfehlung für die nächste Ampel; mit green_wave_lights > 1 über die nächsten Ampeln gemeinsam geplant
+        (nicht im degradierten Tick).
+        :return: (Verzögerung bis zur genutzten Grünphase, Geschwindigkeit in m/s, Distanz in m)
+        """
+        if self.green_wave_lights > 1 and not degraded:
+            lights, distances = self.corridor.upcoming(self.tl_selector.position_along, self.green_wave_lights)
+            if len(lights) > 1 and lights[0] is next_light:
+                for light in lights:
+                    self._ensure_timing(light)
+                plan = self.green_wave_planner.plan(
+                    lights, distances,
+                    now=duration,
+                    preferred_speed=self.cyclist.preferred_speed,
+                    min_speed=self.cyclist.min_speed,
+                    max_speed=self.cyclist.max_speed
+                )
+                if log.isEnabledFor(logging.DEBUG):
+                    greens = sum(1 for p in plan if p.green)
+                    log.debug("grüne Welle", extra={"stage": "advice", "data": {"greens": greens, "lights": len(plan)}})
+                first = plan[0]
+                return timedelta(seconds=max(0.0, first.window_start)), first.speed, distances[0]
+
+        return self.speed_advisor.choose_best_phase_and_speed(
+            current_position=current_position,
+            next_light=next_light,
+            now=duration,
+            preferred_speed=self.cyclist.preferred_speed,
+            min_speed=self.cyclist.min_speed,
+            max_speed=self.cyclist.max_speed,
+            distance=distance_to_next_tl
+        )
+
+    def update_cycle(self, duration: timedelta, time_step: timedelta, old_route, degraded: bool = False):
+        """
+        Ein Durchlauf der Schleife.
+        :param degraded: vorheriger Tick hat seine Deadline verpasst – optionale Stufen (Routen-Neuberechnung,
+                         grüne Welle über mehrere Ampeln, Debug-Ausgaben) entfallen
+        """
+        self.tick_id += 1
+        set_tick(self.tick_id)
+
+        self.profiler.start_tick()
+        try:
+            return self._run_tick(duration, old_route, degraded)
+        finally:
+            if self.recorder is not None:
+                self._record(duration, degraded)
+                self.profiler.mark("record")
+            self.profiler.end_tick()
+
+    def _record(self, duration: timedelta, degraded: bool) -> None:
+        wheel_speed = self._wheel_speed() / 3.6 if self._wheel_speed is not None else math.nan
+        if self.last_advice is None:
+            self.recorder.record(duration.total_seconds(), self.tick_id, self.last_fix, wheel_speed, degraded=degraded)
+            return
+        light, delay, v_opt, distance = self.last_advice
+        self.recorder.record(
+            duration.total_seconds(), self.tick_id, self.last_fix, wheel_speed,
+            light_id=light.get_id(),
+            v_opt=v_opt,
+            distance=distance,
+            delay=delay.total_seconds(),
+            degraded=degraded
+        )
+
+    def _run_tick(self, duration: timedelta, old_route, degraded: bool):
+        profiler = self.profiler
+        # Ein Fix pro Tick: Position und Geschwindigkeit stammen immer aus derselben Messung
+        fix = self.cyclist.get_fix()
+        current_position = fix.position
+        self.last_fix = fix
+        self.last_advice = None
+        profiler.mark("gps")
+        if fix.stale:
+            log.warning("GPS-Fix veraltet, keine Empfehlung in diesem Durchlauf", extra={"stage": "gps"})
+            return old_route
 
         # nur damit die plot achsen sich nicht immer ändern
         conserved_start_point_for_plausible_plotting = current_position
 
-        # if duration.seconds == 60 and current_position[0] != 0.0 and current_position[1] != 0.0:
-        if duration.seconds == 0.0 and current_position[0] != 0.0 and current_position[1] != 0.0:
-            destination: Tuple[float, float] = DestinationManager.get_destination()
-            old_route: List[Tuple[float, float]] = compute_route(current_position, destination)
-            self.tl_selector.set_route(old_route)
+        # Fertige Hintergrund-Neuberechnung übernehmen: Route, Korridor und Selector werden gemeinsam getauscht
+        refreshed = self.route_refresher.poll()
+        if refreshed is not None:
+            old_route, prepared = refreshed
+            self._adopt_route(prepared)
+        if self.estimator is not None:
+            # im Worker fertig angepasste Ampelzyklen übernehmen (nur Speicher, kein Rechnen im Tick)
+            self.estimator.poll()
 
         destination = DestinationManager.get_destination()
-        if (self.updateTrigger >= 30):
-            route = compute_route(current_position, destination)
+        if (self.updateTrigger >= self.REFRESH_TICKS) and not degraded:
+            # Bis die neue Route da ist, wird auf der alten weiter beraten. Fehlt noch jede Route, ist es weiter
+            # die Route ab Fahrtbeginn und geht über die eigentliche Routenquelle (und damit in den Routen-Cache)
+            provider = self.route_provider if self.corridor is None else None
+            self.route_refresher.request(current_position, destination, provider=provider)
             self.updateTrigger = 0
-            old_route = route
-            self.tl_selector.set_route(route)
-        else:
-            route = old_route
+        route = old_route
         self.updateTrigger = self.updateTrigger + 1
+        profiler.mark("route")
 
-        traffic_lights: List[TrafficLight] = self.tl_fetcher.get_relevant_traffic_lights(route)
+        if self.corridor is None:
+            return old_route
+        traffic_lights: List[TrafficLight] = self.corridor.lights
         if not traffic_lights:
             return old_route
 
@@ -72,59 +342,61 @@ class UpdateLoopController:
         if next_light is None:
             return old_route
 
-        if not next_light.mock_initialized:
-            print(f"\nNeue Ampel erkannt: {next_light.get_id()}")
-
-            #todo Mock muss letztendlich entfernt werden
-            green, red, offset = 10, 20, 0
-
-            next_light.green_duration = timedelta(seconds=green)
-            next_light.red_duration = timedelta(seconds=red)
-            next_light.offset = timedelta(seconds=offset)
-            next_light.mock_initialized = True
+        self._ensure_timing(next_light)
+        profiler.mark("selection")
 
         distance_to_next_tl = haversine_along_route(
             start_point=current_position,
             end_point=next_light.get_location(),
-            route=route
+            route=route,
+            cum_distances=self.corridor.cum_distances,
+            start_along=self.tl_selector.position_along,
+            end_along=self.corridor.offset_of(next_light)
         )
+        profiler.mark("distance")
+
+        v_actual = fix.speed * 3.6
+        profiler.mark("speed")
 
-        v_actual = self.cyclist.get_current_speed()
-        print(f"aktuelle Geschwindigkeit: {v_actual}")
+        if self.estimator is not None:
+            self.estimator.observe(next_light, distance_to_next_tl, fix.speed, duration.total_seconds())
+            profiler.mark("estimate")
 
         try:
-            advisor = SpeedAdvisor()
-            delay, v_opt, distance = advisor.choose_best_phase_and_speed(
-                current_position=current_position,
-                next_light=next_light,
-                green_starts=next_light.get_next_green_starts(duration),
-                now=duration,
-                preferred_speed=self.cyclist.preferred_speed,
-                min_speed=self.cyclist.min_speed,
-                max_speed=self.cyclist.max_speed
+            delay, v_opt, distance = self._advise(
+                next_light, current_position, duration, distance_to_next_tl, degraded
             )
-            print(f"delay: {delay}, v_opt: {v_opt}, distance: {distance}")
-            self.cyclist.set_advicde_speed(v_opt * 3.6, distance)
-            print(f"delay bis zur nächsten Grünphase: {delay}, optimale Geschwindigkeit: {v_opt * 3.6}")
-
-            # DEBUG block start#####################################################################################
-            # Berechne die Geschwindigkeitsdifferenz und übersetze sie in eine Anweisung
-            def calculate_speed_diff(v_opt: float, v_actual: float) -> float:
-                return v_opt - v_actual
-
-            def translate_to_instruction(v_diff: float) -> str:
-                if v_diff > 0.01:  # kleine Toleranz, um Rundungsfehler zu vermeiden
-                    return f"Beschleunige um {v_diff * 3.6 :.2f} km/h, um die Ampel zu erreichen."
-                elif v_diff < -0.01:  # kleine Toleranz, um Rundungsfehler zu vermeiden
-                    return f"Reduziere die Geschwindigkeit um {-v_diff * 3.6:.2f} km/h, um die Ampel nicht zu überfahren."
-                else:
-                    return "Halte deine aktuelle Geschwindigkeit bei."
-
-            print(translate_to_instruction(calculate_speed_diff(v_opt, v_actual)))
-        # DEBUG block ende#####################################################################################
-        except Exception as e:
-            print(f"An unexpected error occurred: {e}")
-            print("Skipped one cycle")
+            profiler.mark("advice")
+            self.last_advice = (next_light, delay, v_opt, distance)
+            # Ist-Geschwindigkeit aus demselben Fix wie Position und Empfehlung
+            self.cyclist.set_advicde_speed(v_opt * 3.6, distance, current_speed=v_actual)
+            profiler.mark("display")
+            # Debug-Ausgaben sind optional und entfallen im degradierten Tick
+            if not degraded and log.isEnabledFor(logging.DEBUG):
+                # Berechne die Geschwindigkeitsdifferenz und übersetze sie in eine Anweisung
+                def calculate_speed_diff(v_opt: float, v_actual: float) -> float:
+                    return v_opt - v_actual
+
+                def translate_to_instruction(v_diff: float) -> str:
+                    if v_diff > 0.01:  # kleine Toleranz, um Rundungsfehler zu vermeiden
+                        return f"Beschleunige um {v_diff * 3.6 :.2f} km/h, um die Ampel zu erreichen."
+                    elif v_diff < -0.01:  # kleine Toleranz, um Rundungsfehler zu vermeiden
+                        return f"Reduziere die Geschwindigkeit um {-v_diff * 3.6:.2f} km/h, um die Ampel nicht zu überfahren."
+                    else:
+                        return "Halte deine aktuelle Geschwindigkeit bei."
+
+                log.debug(translate_to_instruction(calculate_speed_diff(v_opt, fix.speed)), extra={
+                    "stage": "advice",
+                    "data": {
+                        "light": next_light.get_id(),
+                        "v_actual_kmh": v_actual,
+                        "v_opt_kmh": v_opt * 3.6,
+                        "delay_s": delay.total_seconds(),
+                        "distance_m": distance,
+                    },
+                })
+        except Exception:
+            log.warning("Empfehlung fehlgeschlagen, Durchlauf übersprungen", exc_info=True, extra={"stage": "advice"})
 
         self.last_next_light = next_light
         return old_route
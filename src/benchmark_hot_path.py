@@ -0,0 +1,272 @@
+# benchmark_hot_path.py
+"""
+Microbenchmarks für die Funktionen der Update-Schleife auf synthetischen Routen und Ampelmengen.
+
+Misst je Funktion und Größe die Operationen pro Sekunde, schätzt die Skalierung (Exponent k in
+Zeit ~ n^k) und prüft, ob ein Tick mit Sicherheitsfaktor (PI statt Entwicklungsrechner) ins Budget passt.
+
+Aufruf:
+    python benchmark_hot_path.py                                   # messen und mit baseline.json vergleichen
+    python benchmark_hot_path.py --save-baseline baseline.json     # Referenz neu speichern
+    python benchmark_hot_path.py --baseline "" --threshold 0.25 --slowdown 10   # ohne Vergleich
+Exit-Code 1, wenn eine Funktion um mehr als `threshold` langsamer als die Referenz ist oder der
+hochgerechnete Tick das Budget überschreitet.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import timeit
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from GreenWavePlanner import GreenWavePlanner
+from SpeedAdvisor import SpeedAdvisor
+from TrafficLight import TrafficLight
+from TrafficLightFetcher import TrafficLightFetcher
+from TrafficLightSelector import TrafficLightSelector
+from utils import cumulative_distances, haversine, haversine_along_route
+
+ROUTE_SIZES = (100, 1000, 10000)
+LIGHT_SIZES = (1000, 10000, 50000)
+
+# eingecheckte Referenz (Entwicklungsrechner); nach gewollten Änderungen mit --save-baseline neu schreiben
+BASELINE_FILE = "baseline.json"
+
+# Funktionen, die pro Tick laufen, mit der Größe, die für die Tick-Abschätzung zählt
+TICK_FUNCTIONS = {
+    "haversine": None,
+    "haversine_along_route": 1000,
+    "get_next_traffic_light": 1000,
+    "choose_best_phase_and_speed": None,
+}
+
+
+def synthetic_route(n: int, seed: int = 0, step: float = 10.0) -> np.ndarray:
+    """
+    Zufallsweg mit n Wegpunkten im Abstand von etwa `step` Metern um Köln.
+    """
+    rng = random.Random(seed)
+    lat, lon, heading = 50.94, 6.93, 0.0
+    points = []
+    for _ in range(n):
+        points.append((lat, lon))
+        heading += rng.uniform(-0.3, 0.3)
+        lat += step * math.cos(heading) / 111195.0
+        lon += step * math.sin(heading) / (111195.0 * math.cos(math.radians(lat)))
+    return np.array(points)
+
+
+def synthetic_fetcher(route: np.ndarray, count: int, on_route: int = 50, seed: int = 0) -> TrafficLightFetcher:
+    """
+    Fetcher mit `count` Ampeln, davon `on_route` direkt an der Route, der Rest zufällig im Umkreis.
+    """
+    rng = random.Random(seed)
+    lat_min, lon_min = route.min(axis=0) - 0.01
+    lat_max, lon_max = route.max(axis=0) + 0.01
+    features = []
+    for i in range(count):
+        if i < on_route:
+            lat, lon = route[rng.randrange(len(route))]
+        else:
+            lat, lon = rng.uniform(lat_min, lat_max), rng.uniform(lon_min, lon_max)
+        features.append({
+            "type": "Feature",
+            "id": f"bench/{i}",
+            "geometry": {"type": "Point", "coordinates": [float(lon), float(lat)]},
+        })
+
+    fetcher = TrafficLightFetcher()
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+    try:
+        fetcher.load_from_json(f.name)
+    finally:
+        os.unlink(f.name)
+    return fetcher
+
+
+def measure(func: Callable[[], object], repeat: int = 3) -> float:
+    """
+    :return: Operationen pro Sekunde (bester von `repeat` Durchläufen)
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return number / best
+
+
+def _route_walker(route: np.ndarray) -> Callable[[], Tuple[float, float]]:
+    """
+    Liefert bei jedem Aufruf die nächste Position entlang der Route (wie ein fahrender Radfahrer).
+    """
+    positions = [tuple(p) for p in route.tolist()]
+    state = {"i": 0}
+
+    def next_position() -> Tuple[float, float]:
+        state["i"] = (state["i"] + 1) % len(positions)
+        return positions[state["i"]]
+    return next_position
+
+
+def run_benchmarks(repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """
+    :return: Funktionsname -> {Größe (als String, "-" ohne Größe) -> Operationen pro Sekunde}
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    now = timedelta(seconds=1234.5)
+
+    a, b = (50.9481, 6.9320), (50.9391, 6.9251)
+    results["haversine"] = {"-": measure(lambda: haversine(a, b), repeat)}
+
+    light = TrafficLight("bench/0", 50.94, 6.93)
+    light.set_timing(57, 53, 0)
+    results["get_next_green_starts"] = {"-": measure(lambda: light.get_next_green_starts(now), repeat)}
+    results["green_window_ms"] = {"-": measure(lambda: light.green_window_ms(1234500), repeat)}
+
+    advisor = SpeedAdvisor()
+    results["choose_best_phase_and_speed"] = {"-": measure(
+        lambda: advisor.choose_best_phase_and_speed(a, light, now, 6.0, 0.0, 8.0, distance=400.0), repeat
+    )}
+
+    planner = GreenWavePlanner()
+    lights = [TrafficLight(f"bench/{i}", 0.0, 0.0) for i in range(10)]
+    for i, tl in enumerate(lights):
+        tl.set_timing(30 + 7 * i % 30, 40 + 11 * i % 30, 13 * i % 60)
+    distances = [250.0 * (i + 1) for i in range(10)]
+    results["green_wave_plan_k10"] = {"-": measure(
+        lambda: planner.plan(lights, distances, now, 6.0, 0.0, 8.0), repeat
+    )}
+
+    results["haversine_along_route"] = {}
+    results["get_next_traffic_light"] = {}
+    for n in ROUTE_SIZES:
+        route = synthetic_route(n)
+        cum = cumulative_distances(route)
+        end = tuple(route[n // 2])
+        walker = _route_walker(route)
+        results["haversine_along_route"][str(n)] = measure(
+            lambda: haversine_along_route(walker(), end, route, cum_distances=cum), repeat
+        )
+
+        fetcher = synthetic_fetcher(route, 1000)
+        with contextlib.redirect_stdout(io.StringIO()):
+            corridor = fetcher.build_corridor(route, cum_distances=cum)
+        selector = TrafficLightSelector()
+        selector.set_corridor(corridor)
+        walker = _route_walker(route)
+        results["get_next_traffic_light"][str(n)] = measure(
+            lambda: selector.get_next_traffic_light(walker(), corridor.lights), repeat
+        )
+
+    # pro Route, nicht pro Tick – aber bei großen Ampeldateien der teuerste Schritt
+    results["get_relevant_traffic_lights"] = {}
+    route = synthetic_route(1000)
+    for count in LIGHT_SIZES:
+        fetcher = synthetic_fetcher(route, count)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results["get_relevant_traffic_lights"][str(count)] = measure(
+                lambda: fetcher.get_relevant_traffic_lights(route), repeat
+            )
+    return results
+
+
+def scaling_exponent(sizes_ops: Dict[str, float]) -> Optional[float]:
+    """
+    Exponent k aus Zeit ~ n^k zwischen kleinster und größter gemessener Größe.
+    """
+    points = sorted((int(size), ops) for size, ops in sizes_ops.items() if size != "-")
+    if len(points) < 2:
+        return None
+    (n1, ops1), (n2, ops2) = points[0], points[-1]
+    return math.log(ops1 / ops2) / math.log(n2 / n1)
+
+
+def tick_estimate(results: Dict[str, Dict[str, float]]) -> float:
+    """
+    Summe der Laufzeiten (Sekunden) aller Funktionen eines Ticks bei realistischer Routengröße.
+    """
+    total = 0.0
+    for name, size in TICK_FUNCTIONS.items():
+        total += 1.0 / results[name]["-" if size is None else str(size)]
+    return total
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float
+) -> List[str]:
+    """
+    :return: Beschreibung jeder Messung, die mehr als `threshold` (Anteil) langsamer als die Referenz ist
+    """
+    regressions = []
+    for name, sizes in results.items():
+        for size, ops in sizes.items():
+            reference = baseline.get(name, {}).get(size)
+            if reference and ops < reference * (1.0 - threshold):
+                regressions.append(f"{name}[{size}]: {ops:,.0f} ops/s statt {reference:,.0f} ops/s "
+                                   f"({ops / reference - 1:+.0%})")
+    return regressions
+
+
+def print_report(results: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'Funktion':32s} {'Größe':>8s} {'ops/s':>14s} {'µs/op':>10s}")
+    for name, sizes in results.items():
+        for size, ops in sizes.items():
+            print(f"{name:32s} {size:>8s} {ops:14,.0f} {1e6 / ops:10.2f}")
+        exponent = scaling_exponent(sizes)
+        if exponent is not None:
+            print(f"{'':32s} {'':>8s} Skalierung ~ n^{exponent:.2f}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmarks der Update-Schleife.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save-baseline", metavar="DATEI", help="Ergebnisse als Referenz speichern")
+    parser.add_argument("--baseline", metavar="DATEI", default=BASELINE_FILE,
+                        help="mit gespeicherter Referenz vergleichen, leer für keinen Vergleich")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="erlaubter Rückgang der ops/s gegenüber der Referenz (Anteil)")
+    parser.add_argument("--tick-budget", type=float, default=1.0, help="Budget eines Ticks in Sekunden")
+    parser.add_argument("--slowdown", type=float, default=10.0,
+                        help="Faktor, um den die Zielhardware (PI) langsamer ist als dieser Rechner")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.repeat)
+    print_report(results)
+
+    failed = False
+    tick = tick_estimate(results) * args.slowdown
+    print(f"\nTick (hochgerechnet, x{args.slowdown:g}): {tick * 1000:.3f} ms von {args.tick_budget * 1000:.0f} ms")
+    if tick > args.tick_budget:
+        print("Tick-Budget überschritten!", file=sys.stderr)
+        failed = True
+
+    if args.baseline and not os.path.exists(args.baseline):
+        print(f"Keine Referenz {args.baseline}, Vergleich übersprungen.", file=sys.stderr)
+    elif args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"Regression: {line}", file=sys.stderr)
+        failed = failed or bool(regressions)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Referenz in {args.save_baseline} gespeichert.")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,29 @@
 """
 Hauptskript für den Grüne-Welle-Assistenten.
 """
+import logging
+import os
 import sys
+from datetime import datetime
 
 from Cyclist import Cyclist
 from DestinationManager import DestinationManager
+from RideLog import setup_logging
+from SignalEstimator import SIGNAL_ESTIMATES_FILE, SignalEstimator
+from SignalTimingProvider import HttpTimingProvider, TimingCache
 from Speedometer import Speedometer
+from TelemetryRecorder import TelemetryRecorder
+from TickProfiler import TickProfiler
 from TrafficLightFetcher import TrafficLightFetcher
 from UpdateLoopController import UpdateLoopController
 
 
 def main():
+    # Log-Level über LOG_LEVEL (z. B. DEBUG), JSON-Lines-Protokoll der Fahrt über RIDE_LOG_FILE
+    setup_logging(
+        level=getattr(logging, os.environ.get("LOG_LEVEL", "INFO").upper(), logging.INFO),
+        log_file=os.environ.get("RIDE_LOG_FILE")
+    )
     print("Grüne-Welle-Assistent startet...")
 
     # === Startposition setzen ===
@@ -35,13 +48,21 @@ def main():
     DestinationManager.set_destination((lat_end, lon_end))
     print(f"Ziel gesetzt: {lat_end}, {lon_end}")
 
-    # TrafficLightFetcher vorbereiten
+    # TrafficLightFetcher vorbereiten, kompilierte Binärdatei bevorzugen, solange sie aktuell ist
+    # (erzeugen mit: python TrafficLightStore.py traffic_lights_venloer_bis_aachener.json traffic_lights_venloer_bis_aachener.bin)
     fetcher = TrafficLightFetcher()
-    if not fetcher.load_from_json("traffic_lights_venloer_bis_aachener.json"):
-        print("Konnte traffic_lights_venloer_bis_aachener.json nicht laden.", file=sys.stderr)
+    json_file = "traffic_lights_venloer_bis_aachener.json"
+    bin_file = os.path.splitext(json_file)[0] + ".bin"
+    if os.path.exists(bin_file) and os.path.getmtime(bin_file) >= os.path.getmtime(json_file):
+        loaded = fetcher.load_from_binary(bin_file)
+    else:
+        loaded = fetcher.load_from_json(json_file)
+    if not loaded:
+        print(f"Konnte {json_file} nicht laden.", file=sys.stderr)
         sys.exit(1)
 
-    #todo wenn schnellerer PI in Benutzung, kann auf die vollständige Köln-JSON umgeswitcht werden
+    # Dank Gitterindex (TrafficLightIndex) ist auch die vollständige Köln-JSON auf dem PI schnell genug.
+    # Gemessene Ampelzyklen kommen aus signal_timings.json (PhaseFitter.py), zugeordnet über die OSM-Knotennummer.
 
     # if not fetcher.load_from_json("traffic_light.json"):
     #     print("Konnte traffic_light.json nicht laden.", file=sys.stderr)
@@ -51,9 +72,38 @@ def main():
     speedometer = Speedometer(2.1)
     cyclist = Cyclist(speedometer)
 
+    # Stufenzeiten pro Tick nur messen, wenn eine Ausgabedatei gesetzt ist
+    profile_file = os.environ.get("TICK_PROFILE_FILE")
+    profiler = TickProfiler(dump_file=profile_file) if profile_file else None
+
+    # Fahrtprotokoll zum späteren Nachspielen (RideReplay), eine Datei je Fahrt in TELEMETRY_DIR
+    telemetry_dir = os.environ.get("TELEMETRY_DIR")
+    recorder = None
+    if telemetry_dir:
+        filename = os.path.join(telemetry_dir, datetime.now().strftime("ride_%Y%m%d_%H%M%S.rtl"))
+        recorder = TelemetryRecorder(filename, cyclist.preferred_speed, cyclist.min_speed, cyclist.max_speed,
+                                     destination=(lat_end, lon_end))
+
+    # Aus Halt und Anfahren gelernte Ampelzyklen, bleiben über Fahrten hinweg erhalten
+    estimator = SignalEstimator(os.environ.get("SIGNAL_ESTIMATES_FILE", SIGNAL_ESTIMATES_FILE))
+
+    # Ampelzeiten aus einem Zeiten-Dienst (SPaT), z. B. timing_stub_server.py; ohne URL nur die Zeitentabelle
+    timing_url = os.environ.get("SIGNAL_TIMING_URL")
+    timings = TimingCache(HttpTimingProvider(timing_url)) if timing_url else None
+
     # === Hauptkontrollschleife starten ===
-    controller = UpdateLoopController(fetcher, cyclist)
-    controller.start_loop()
+    controller = UpdateLoopController(fetcher, cyclist, profiler=profiler, recorder=recorder, estimator=estimator,
+                                      timings=timings)
+    try:
+        controller.start_loop()
+    finally:
+        estimator.close()
+        if profiler is not None:
+            profiler.close()
+        if timings is not None:
+            timings.close()
+        if recorder is not None:
+            recorder.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+# ors_stub_server.py
+"""
+Lokaler Stub des OpenRouteService-Directions-Endpunkts zum Testen ohne Netzwerk.
+
+Start:  python ors_stub_server.py --port 8099 [--delay 0.5] [--fail 2]
+Nutzung: ORS_BASE_URL=http://127.0.0.1:8099/v2/directions/driving-car ORS_API_KEY=stub python main.py
+"""
+
+import argparse
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from utils import haversine
+
+DIRECTIONS_PATH = "/v2/directions/driving-car"
+
+
+def straight_route(start: Tuple[float, float], end: Tuple[float, float], step: float = 20.0) -> List[List[float]]:
+    """
+    Gerade Linie von start nach end mit einem Wegpunkt etwa alle `step` Meter, im ORS-Format [lon, lat].
+    """
+    n = max(1, int(haversine(start, end) // step))
+    return [
+        [start[1] + (end[1] - start[1]) * i / n, start[0] + (end[0] - start[0]) * i / n]
+        for i in range(n + 1)
+    ]
+
+
+class OrsStubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1, damit die Verbindungen des Clients offen bleiben
+    protocol_version = "HTTP/1.1"
+    # Header und Body gehen getrennt raus; ohne Nagle wartet die offene Verbindung nicht auf das verzögerte ACK
+    disable_nagle_algorithm = True
+    request_count = 0
+    # Fehlerinjektion: künstliche Antwortzeit, die nächsten fail_next Requests scheitern mit fail_status,
+    # die nächsten invalid_next bekommen 200 mit einem JSON-Array statt einer FeatureCollection
+    delay = 0.0
+    fail_next = 0
+    fail_status = 503
+    invalid_next = 0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != DIRECTIONS_PATH:
+            self.send_error(404)
+            return
+        type(self).request_count += 1
+        if self.delay > 0:
+            time.sleep(self.delay)
+        if self.fail_next > 0:
+            type(self).fail_next -= 1
+            self.send_error(self.fail_status)
+            return
+        if self.invalid_next > 0:
+            type(self).invalid_next -= 1
+            self._send_json(b"[]")
+            return
+        query = parse_qs(url.query)
+        try:
+            start_lon, start_lat = map(float, query["start"][0].split(","))
+            end_lon, end_lat = map(float, query["end"][0].split(","))
+        except (KeyError, ValueError):
+            self.send_error(400, "start/end fehlen oder sind ungültig")
+            return
+
+        body = json.dumps({
+            "type": "FeatureCollection",
+            "features": [{
+                "type": "Feature",
+                "properties": {},
+                "geometry": {
+                    "type": "LineString",
+                    "coordinates": straight_route((start_lat, start_lon), (end_lat, end_lon)),
+                },
+            }],
+        }).encode("utf-8")
+        self._send_json(body)
+
+    def _send_json(self, body: bytes) -> None:
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipped:
+            body = gzip.compress(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/geo+json")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port: int = 0, delay: float = 0.0, fail: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Startet den Stub in einem Hintergrund-Thread.
+    :param port: Port, 0 wählt einen freien Port
+    :param delay: künstliche Antwortzeit je Request in Sekunden
+    :param fail: so viele der folgenden Requests mit OrsStubHandler.fail_status beantworten
+    :return: (Server, Basis-URL für ORS_BASE_URL)
+    """
+    OrsStubHandler.delay = delay
+    OrsStubHandler.fail_next = fail
+    OrsStubHandler.invalid_next = 0
+    server = ThreadingHTTPServer(("127.0.0.1", port), OrsStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}{DIRECTIONS_PATH}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokaler ORS-Stub")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--delay", type=float, default=0.0, help="künstliche Antwortzeit in s")
+    parser.add_argument("--fail", type=int, default=0, help="so viele Requests zuerst mit 503 beantworten")
+    args = parser.parse_args()
+    OrsStubHandler.delay = args.delay
+    OrsStubHandler.fail_next = args.fail
+    stub = ThreadingHTTPServer(("127.0.0.1", args.port), OrsStubHandler)
+    print(f"ORS-Stub läuft auf http://127.0.0.1:{args.port}{DIRECTIONS_PATH}")
+    stub.serve_forever()
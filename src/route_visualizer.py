@@ -21,7 +21,7 @@ def plot_route(
     conserved_start_point_for_plausible_plotting=None,
     duration: timedelta = None
 ):
-    if not route:
+    if route is None or len(route) == 0:
         print("Keine Route zum Plotten übergeben.")
         return
 
@@ -0,0 +1,95 @@
+# timing_stub_server.py
+"""
+Lokaler Stub eines Ampelzeiten-Dienstes (SPaT-artig) zum Testen von HttpTimingProvider ohne Netzwerk.
+Beantwortet GET /v1/timings?ids=a,b,c aus einer Zeitentabelle im Format von PhaseFitter.py.
+
+Start:  python timing_stub_server.py --port 8098 [--table signal_timings.json]
+Nutzung: SIGNAL_TIMING_URL=http://127.0.0.1:8098/v1/timings python main.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from TrafficLightFetcher import SIGNAL_TIMINGS_FILE
+
+TIMINGS_PATH = "/v1/timings"
+
+
+class TimingStubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1, damit die Verbindungen des Clients offen bleiben
+    protocol_version = "HTTP/1.1"
+    # Header und Body gehen getrennt raus; ohne Nagle wartet die offene Verbindung nicht auf das verzögerte ACK
+    disable_nagle_algorithm = True
+    lights: dict = {}
+    delay = 0.0
+    request_count = 0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != TIMINGS_PATH:
+            self.send_error(404)
+            return
+        ids = [i for i in parse_qs(url.query).get("ids", [""])[0].split(",") if i]
+        if not ids:
+            self.send_error(400, "ids fehlt")
+            return
+
+        type(self).request_count += 1
+        if self.delay > 0:
+            time.sleep(self.delay)
+        found = {}
+        for light_id in ids:
+            entry = self.lights.get(light_id, self.lights.get(light_id.rpartition("/")[2]))
+            if entry is not None:
+                found[light_id] = entry
+        body = json.dumps({"lights": found}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def load_table(filename: str) -> dict:
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f).get("lights", {})
+
+
+def start_stub_server(
+    port: int = 0,
+    table: Optional[str] = SIGNAL_TIMINGS_FILE,
+    delay: float = 0.0
+) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Startet den Stub in einem Hintergrund-Thread.
+    :param port: Port, 0 wählt einen freien Port
+    :param table: Zeitentabelle, die ausgeliefert wird (None: keine Ampeln bekannt)
+    :param delay: künstliche Antwortzeit je Request in Sekunden
+    :return: (Server, URL für SIGNAL_TIMING_URL)
+    """
+    TimingStubHandler.lights = load_table(table) if table is not None else {}
+    TimingStubHandler.delay = delay
+    server = ThreadingHTTPServer(("127.0.0.1", port), TimingStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}{TIMINGS_PATH}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokaler Stub für Ampelzeiten")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--table", default=SIGNAL_TIMINGS_FILE, help="Zeitentabelle im Format von PhaseFitter.py")
+    parser.add_argument("--delay", type=float, default=0.0, help="künstliche Antwortzeit in s")
+    args = parser.parse_args()
+    TimingStubHandler.lights = load_table(args.table)
+    TimingStubHandler.delay = args.delay
+    stub = ThreadingHTTPServer(("127.0.0.1", args.port), TimingStubHandler)
+    print(f"Zeiten-Stub läuft auf http://127.0.0.1:{args.port}{TIMINGS_PATH} ({len(TimingStubHandler.lights)} Ampeln)")
+    stub.serve_forever()
@@ -1,7 +1,126 @@
 # utils.py
 
 import math
-from typing import Tuple, List
+from typing import Tuple, List, Optional, Sequence, Union
+
+import numpy as np
+
+EARTH_RADIUS = 6371000.0  # Earth radius in meters
+
+RouteLike = Union[np.ndarray, Sequence[Tuple[float, float]]]
+
+
+def as_route_array(route: RouteLike) -> np.ndarray:
+    """
+    Wandelt eine Route (Liste von (lat, lon)-Tupeln oder Array) in ein kompaktes N×2-float64-Array um.
+    Ein bereits passendes Array wird ohne Kopie zurückgegeben.
+    :param route: Wegpunkte (latitude, longitude)
+    :return: Array der Form (N, 2) mit Spalten (lat, lon)
+    """
+    arr = np.asarray(route, dtype=np.float64)
+    if arr.size == 0:
+        return np.empty((0, 2), dtype=np.float64)
+    return arr.reshape(-1, 2)
+
+
+def haversine_np(
+        lat1: np.ndarray,
+        lon1: np.ndarray,
+        lat2: np.ndarray,
+        lon2: np.ndarray
+) -> np.ndarray:
+    """
+    Vectorized Haversine distance (in meters) between pairs of points, arrays are broadcast.
+    :param lat1: latitudes of the first points in degrees
+    :param lon1: longitudes of the first points in degrees
+    :param lat2: latitudes of the second points in degrees
+    :param lon2: longitudes of the second points in degrees
+    :return: array of distances in meters
+    """
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    dlat = lat2 - lat1
+    dlon = np.radians(lon2) - np.radians(lon1)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return EARTH_RADIUS * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def segment_lengths(route: RouteLike) -> np.ndarray:
+    """
+    Länge jedes Routensegments in Metern.
+    :param route: N×2-Array oder Liste von Wegpunkten
+    :return: Array der Länge N-1
+    """
+    arr = as_route_array(route)
+    if len(arr) < 2:
+        return np.empty(0, dtype=np.float64)
+    return haversine_np(arr[:-1, 0], arr[:-1, 1], arr[1:, 0], arr[1:, 1])
+
+
+def cumulative_distances(route: RouteLike) -> np.ndarray:
+    """
+    Akkumulierte Distanz ab Routenanfang bis zu jedem Wegpunkt (erster Eintrag 0.0).
+    :param route: N×2-Array oder Liste von Wegpunkten
+    :return: Array der Länge N
+    """
+    arr = as_route_array(route)
+    cum = np.zeros(len(arr), dtype=np.float64)
+    if len(arr) > 1:
+        np.cumsum(segment_lengths(arr), out=cum[1:])
+    return cum
+
+
+def project_onto_route(
+        points: RouteLike,
+        route: RouteLike,
+        cum_distances: Optional[np.ndarray] = None,
+        seg_start: int = 0,
+        seg_stop: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Projiziert viele Punkte gleichzeitig auf die Route (Polyline) und bestimmt je Punkt das nächste Segment.
+
+    Die Projektion erfolgt je Segment in einer lokalen, metrischen Näherung (Equirektangularprojektion um
+    die mittlere Segmentbreite). Bei gleichem Abstand gewinnt das frühere Segment.
+
+    :param points: M×2-Array oder Liste von (lat, lon)
+    :param route: N×2-Array oder Liste von Wegpunkten, N >= 2
+    :param cum_distances: vorab berechnete cumulative_distances(route), wird sonst neu berechnet
+    :param seg_start: erstes zu berücksichtigendes Segment
+    :param seg_stop: Segment, vor dem die Suche endet (exklusiv), Standard: alle
+    :return: (Segmentindex, Parameter t in [0, 1], Distanz entlang der Route, seitlicher Abstand) je Punkt
+    """
+    pts = as_route_array(points)
+    arr = as_route_array(route)
+    if cum_distances is None:
+        cum_distances = cumulative_distances(arr)
+    if seg_stop is None:
+        seg_stop = len(arr) - 1
+
+    a = arr[seg_start:seg_stop]
+    b = arr[seg_start + 1:seg_stop + 1]
+
+    k = np.radians(1.0) * EARTH_RADIUS
+    kx = k * np.cos(np.radians((a[:, 0] + b[:, 0]) / 2))  # (S,)
+    ax, ay = a[:, 1] * kx, a[:, 0] * k
+    dx, dy = b[:, 1] * kx - ax, b[:, 0] * k - ay
+    len2 = dx * dx + dy * dy
+
+    px = pts[:, 1:2] * kx  # (M, S)
+    py = pts[:, 0:1] * k
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = ((px - ax) * dx + (py - ay) * dy) / len2
+    t = np.where(len2 > 0, np.clip(t, 0.0, 1.0), 0.0)
+
+    offset = np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+    best = np.argmin(offset, axis=1)
+    rows = np.arange(len(pts))
+
+    best_t = t[rows, best]
+    seg_idx = best + seg_start
+    seg_len = cum_distances[seg_idx + 1] - cum_distances[seg_idx]
+    along = cum_distances[seg_idx] + best_t * seg_len
+    return seg_idx, best_t, along, offset[rows, best]
 
 
 def haversine(
@@ -10,68 +129,52 @@ def haversine(
 ) -> float:
     """
     Calculate the great-circle distance between two points on the Earth (in meters) using the Haversine formula.
+    Scalar counterpart of haversine_np for single pairs.
     :param coord1: (latitude, longitude)
     :param coord2: (latitude, longitude)
     :return: distance in meters
     """
-    r = 6371000.0  # Earth radius in meters
     lat1, lon1 = map(math.radians, coord1)
     lat2, lon2 = map(math.radians, coord2)
     dlat = lat2 - lat1
     dlon = lon2 - lon1
     a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return r * c
+    return EARTH_RADIUS * c
 
 
 def haversine_along_route(
     start_point: Tuple[float, float],
     end_point: Tuple[float, float],
-    route: List[Tuple[float, float]]
+    route: RouteLike,
+    cum_distances: Optional[np.ndarray] = None,
+    start_along: Optional[float] = None,
+    end_along: Optional[float] = None
 ) -> float:
     """
     Berechnet die Distanz entlang einer Route zwischen zwei Punkten (auch wenn diese nicht exakt auf der Route liegen).
-    Die Route wird dabei segmentweise mit der Haversine-Formel ausgewertet.
+    Beide Punkte werden in einem Aufruf auf die Route projiziert, die Distanz ist die Differenz
+    ihrer Positionen entlang der Route.
 
-    :param start_point: Startkoordinate (z. B. aktuelle Position)
-    :param end_point: Endkoordinate (z. B. Ampelposition)
-    :param route: Liste der Wegpunkte der Route
+    :param start_point: Startkoordinate (z. B. aktuelle Position)
+    :param end_point: Endkoordinate (z. B. Ampelposition)
+    :param route: Wegpunkte der Route (Liste oder N×2-Array)
+    :param cum_distances: optional vorab berechnete cumulative_distances(route)
+    :param start_along: bereits bekannte Distanz des Startpunkts ab Routenanfang (z. B. aus dem Selector)
+    :param end_along: bereits bekannte Distanz des Endpunkts ab Routenanfang (z. B. aus dem RouteCorridor)
     :return: Entfernung in Metern entlang der Route
     """
-    if not route or len(route) < 2:
+    # Vorab bekannte Offsets brauchen keine Projektion
+    if start_along is not None and end_along is not None:
+        return abs(end_along - start_along)
+
+    arr = as_route_array(route)
+    if len(arr) < 2:
         return 0.0
 
-    # Nächstes Segment zum Startpunkt finden
-    min_start_dist = float('inf')
-    start_index = 0
-    for i in range(len(route) - 1):
-        dist = haversine(start_point, route[i])
-        if dist < min_start_dist:
-            min_start_dist = dist
-            start_index = i
-
-    # Nächstes Segment zum Endpunkt finden
-    min_end_dist = float('inf')
-    end_index = 0
-    for i in range(len(route) - 1):
-        dist = haversine(end_point, route[i])
-        if dist < min_end_dist:
-            min_end_dist = dist
-            end_index = i
-
-    # Sicherstellen, dass start_index vor end_index liegt
-    if start_index > end_index:
-        start_index, end_index = end_index, start_index
-        start_point, end_point = end_point, start_point
-
-    # 1. Startpunkt bis Segmentstart
-    total_distance = haversine(start_point, route[start_index])
-
-    # 2. Volle Segmente dazwischen
-    for i in range(start_index, end_index):
-        total_distance += haversine(route[i], route[i + 1])
-
-    # 3. Letztes Segmentende bis Endpunkt
-    total_distance += haversine(route[end_index], end_point)
-
-    return total_distance
+    _, _, along, _ = project_onto_route([start_point, end_point], arr, cum_distances)
+    if start_along is not None:
+        return float(abs(along[1] - start_along))
+    if end_along is not None:
+        return float(abs(end_along - along[0]))
+    return float(abs(along[1] - along[0]))
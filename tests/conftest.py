@@ -0,0 +1,10 @@
+# conftest.py
+"""
+Die Module liegen flach in src/ und importieren sich gegenseitig ohne Paket (from utils import ...), wie beim
+Start aus src/. Für die Tests wird src/ deshalb vorne in den Suchpfad gestellt.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
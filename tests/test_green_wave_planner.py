@@ -0,0 +1,50 @@
+# test_green_wave_planner.py
+import random
+from datetime import timedelta
+
+from GreenWavePlanner import GreenWavePlanner
+from TrafficLight import TrafficLight
+
+
+def _light(light_id: str, green: float, red: float, offset: float) -> TrafficLight:
+    light = TrafficLight(light_id, 0.0, 0.0)
+    light.set_timing(green, red, offset)
+    return light
+
+
+def _in_green(light: TrafficLight, now: float, t: float) -> bool:
+    in_cycle = (now + t - light.offset_ms / 1000) % (light.cycle_ms / 1000)
+    return in_cycle <= light.green_ms / 1000 + 1e-6 or in_cycle >= light.cycle_ms / 1000 - 1e-6
+
+
+def test_green_pass_before_stop_stays_in_its_window():
+    # Grün an a nur 30..39 s ab jetzt, danach Halt an Rot bei b bis 70 s: die Abfahrt an b darf nicht als
+    # Ankunft zählen, sonst landet die Passage an a mit min_speed-Schranke im Rot (vorher 45 s)
+    a = _light("x/a", 10, 60, 40)
+    b = _light("x/b", 20, 55, 0)
+    plan = GreenWavePlanner().plan([a, b], [100, 150], timedelta(seconds=80), 5.0, 2.0, 8.0)
+
+    assert plan[0].green and not plan[1].green
+    assert 30.0 <= plan[0].arrival <= 39.0
+    assert plan[1].departure == 70.0
+    assert plan[0].arrival + 50 / 8.0 <= plan[1].arrival <= plan[1].departure
+
+
+def test_random_plans_never_pass_green_during_red():
+    rnd = random.Random(1)
+    planner = GreenWavePlanner()
+    for _ in range(2000):
+        lights, distances, distance = [], [], 0.0
+        for j in range(rnd.randint(1, 4)):
+            lights.append(_light(f"x/{j}", rnd.randint(5, 40), rnd.randint(10, 80), rnd.randint(0, 60)))
+            distance += rnd.uniform(20, 400)
+            distances.append(distance)
+        now = rnd.uniform(0, 500)
+        min_speed = rnd.choice([0.0, 1.0, 2.0, 3.0])
+        max_speed = rnd.uniform(5, 10)
+        preferred = rnd.uniform(max(min_speed, 3.0), max_speed)
+
+        plan = planner.plan(lights, distances, timedelta(seconds=now), preferred, min_speed, max_speed)
+        for p in plan:
+            if p.green:
+                assert _in_green(p.light, now, p.arrival), p
@@ -0,0 +1,186 @@
+# test_ors_client.py
+import threading
+import time
+
+import pytest
+import requests
+
+from OrsClient import OrsClient, OrsError
+from ors_stub_server import OrsStubHandler, start_stub_server
+
+START = (50.9400, 6.9300)
+END = (50.9420, 6.9350)
+
+
+@pytest.fixture
+def stub():
+    server, url = start_stub_server()
+    OrsStubHandler.request_count = 0
+    OrsStubHandler.fail_status = 503
+    yield url
+    server.shutdown()
+    server.server_close()
+    OrsStubHandler.delay = 0.0
+    OrsStubHandler.fail_next = 0
+    OrsStubHandler.invalid_next = 0
+
+
+def _client(url: str, sleeps=None, **kwargs) -> OrsClient:
+    # ohne echtes Warten zwischen den Versuchen, die Wartezeiten werden mitgeschrieben
+    sleeps = sleeps if sleeps is not None else []
+    return OrsClient(url, "stub", sleep=sleeps.append, **kwargs)
+
+
+def test_route_from_stub(stub):
+    client = _client(stub)
+    route = client.directions(START, END)
+
+    assert route.shape[1] == 2
+    assert tuple(route[0]) == pytest.approx(START)
+    assert tuple(route[-1]) == pytest.approx(END)
+    assert client.get_metrics()["attempts"] == 1
+
+
+def test_retries_server_errors_with_backoff(stub):
+    OrsStubHandler.fail_next = 2
+    sleeps = []
+    client = _client(stub, sleeps, retries=3, backoff=0.5)
+
+    client.directions(START, END)
+
+    assert OrsStubHandler.request_count == 3
+    metrics = client.get_metrics()
+    assert (metrics["attempts"], metrics["retried"], metrics["failed"]) == (3, 2, 0)
+    # Full Jitter: zufällig bis backoff · 2^Versuch
+    assert len(sleeps) == 2
+    assert 0.0 <= sleeps[0] <= 0.5 and 0.0 <= sleeps[1] <= 1.0
+
+
+def test_gives_up_after_all_retries(stub):
+    OrsStubHandler.fail_next = 10
+    client = _client(stub, retries=2)
+
+    with pytest.raises(OrsError):
+        client.directions(START, END)
+    assert OrsStubHandler.request_count == 3
+    assert client.get_metrics()["failed"] == 1
+
+
+def test_client_errors_are_not_retried(stub):
+    OrsStubHandler.fail_next = 1
+    OrsStubHandler.fail_status = 400
+    client = _client(stub, retries=3)
+
+    with pytest.raises(OrsError, match="400"):
+        client.directions(START, END)
+    assert OrsStubHandler.request_count == 1
+
+
+def test_timeouts_are_retried(stub):
+    OrsStubHandler.delay = 0.5
+    client = _client(stub, retries=1, read_timeout=0.1)
+
+    with pytest.raises(OrsError) as info:
+        client.directions(START, END)
+    assert isinstance(info.value.__cause__, requests.Timeout)
+    assert client.get_metrics()["attempts"] == 2
+
+
+def test_invalid_response_is_ors_error(stub):
+    OrsStubHandler.invalid_next = 1
+    client = _client(stub, retries=3)
+
+    with pytest.raises(OrsError, match="TypeError"):
+        client.directions(START, END)
+    # unbrauchbare Antwort wird nicht wiederholt
+    assert OrsStubHandler.request_count == 1
+
+
+def test_circuit_breaker_opens_probes_and_closes(stub):
+    OrsStubHandler.fail_next = 2
+    client = _client(stub, retries=0, failure_threshold=2, reset_timeout=0.2)
+
+    for _ in range(2):
+        with pytest.raises(OrsError):
+            client.directions(START, END)
+    assert client.circuit_open
+
+    # offen: sofort abgewiesen, ohne Request
+    with pytest.raises(OrsError, match="gesperrt"):
+        client.directions(START, END)
+    assert OrsStubHandler.request_count == 2
+    assert client.get_metrics()["rejected"] == 1
+
+    # halb offen: ein Probeaufruf geht durch und schließt bei Erfolg
+    time.sleep(0.25)
+    assert not client.circuit_open
+    client.directions(START, END)
+    assert OrsStubHandler.request_count == 3
+    client.directions(START, END)
+    assert client.get_metrics()["failed"] == 2
+
+
+def test_failed_probe_reopens_and_never_sticks(stub):
+    OrsStubHandler.fail_next = 1
+    client = _client(stub, retries=0, failure_threshold=1, reset_timeout=0.2)
+    with pytest.raises(OrsError):
+        client.directions(START, END)
+
+    # Probe bekommt eine ungültige Antwort: wieder offen, aber keine hängende Probe
+    time.sleep(0.25)
+    OrsStubHandler.invalid_next = 1
+    with pytest.raises(OrsError, match="TypeError"):
+        client.directions(START, END)
+    assert client.circuit_open
+    assert not client._probing
+
+    time.sleep(0.25)
+    client.directions(START, END)
+    assert not client.circuit_open
+
+
+def test_concurrent_identical_requests_are_coalesced(stub):
+    OrsStubHandler.delay = 0.3
+    client = _client(stub)
+    barrier = threading.Barrier(5)
+    results = []
+
+    def call():
+        barrier.wait()
+        results.append(client.directions(START, END))
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(results) == 5
+    assert OrsStubHandler.request_count == 1
+    assert client.get_metrics()["coalesced"] == 4
+    assert all(r is results[0] for r in results)
+
+
+def test_coalesced_callers_share_the_error(stub):
+    OrsStubHandler.delay = 0.3
+    OrsStubHandler.fail_next = 1
+    OrsStubHandler.fail_status = 400
+    client = _client(stub)
+    barrier = threading.Barrier(3)
+    errors = []
+
+    def call():
+        barrier.wait()
+        try:
+            client.directions(START, END)
+        except OrsError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 3
+    assert OrsStubHandler.request_count == 1
@@ -0,0 +1,35 @@
+# test_ride_log.py
+import json
+import logging
+
+from RideLog import RateLimitFilter, get_logger, setup_logging, shutdown_logging
+
+
+def _record(level: int, msg: str, *args) -> logging.LogRecord:
+    return logging.LogRecord("ridesync.test", level, __file__, 1, msg, args, None)
+
+
+def test_rate_limit_only_throttles_warnings():
+    limiter = RateLimitFilter(interval=10.0)
+
+    assert all(limiter.filter(_record(logging.DEBUG, "grüne Welle")) for _ in range(5))
+    assert all(limiter.filter(_record(logging.INFO, "Neue Ampel erkannt: %s", i)) for i in range(5))
+    assert limiter.filter(_record(logging.WARNING, "GPS-Fix veraltet"))
+    assert not limiter.filter(_record(logging.WARNING, "GPS-Fix veraltet"))
+    assert limiter.suppressed == 1
+
+
+def test_ride_log_keeps_every_debug_record(tmp_path):
+    log_file = tmp_path / "ride.jsonl"
+    setup_logging(level=logging.DEBUG, log_file=str(log_file), console=False)
+    log = get_logger("test")
+    try:
+        for i in range(20):
+            log.debug("grüne Welle", extra={"stage": "advice", "data": {"greens": i}})
+            log.warning("GPS-Fix veraltet", extra={"stage": "gps"})
+    finally:
+        shutdown_logging()
+
+    entries = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+    assert [e["greens"] for e in entries if e["msg"] == "grüne Welle"] == list(range(20))
+    assert sum(1 for e in entries if e["msg"] == "GPS-Fix veraltet") == 1
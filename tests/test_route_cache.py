@@ -0,0 +1,120 @@
+# test_route_cache.py
+import numpy as np
+import pytest
+
+import RoutePlanner
+from OrsClient import OrsClient, OrsError
+from RouteCache import RouteCache
+from ors_stub_server import OrsStubHandler, start_stub_server
+
+START = (50.9400, 6.9300)
+END = (50.9420, 6.9350)
+
+
+def _route(*points) -> np.ndarray:
+    return np.array(points, dtype=float)
+
+
+def _expire(cache: RouteCache, start, end) -> None:
+    cache._entries[cache.key(start, end)]["created"] -= cache.ttl + 1
+
+
+def test_nearby_points_share_a_cell():
+    cache = RouteCache(None, cell_size=50.0)
+    route = _route(START, END)
+    cache.put(START, END, route)
+
+    # wenige Meter daneben: gleiche Zelle
+    assert np.array_equal(cache.get((START[0] + 0.00005, START[1]), END), route)
+    assert cache.get((START[0] + 0.01, START[1]), END) is None
+
+
+def test_least_recently_used_route_is_evicted():
+    cache = RouteCache(None, max_entries=2)
+    ends = [(END[0] + i * 0.01, END[1]) for i in range(3)]
+    cache.put(START, ends[0], _route(START, ends[0]))
+    cache.put(START, ends[1], _route(START, ends[1]))
+    # 0 zuletzt benutzt, also fliegt 1
+    assert cache.get(START, ends[0]) is not None
+    cache.put(START, ends[2], _route(START, ends[2]))
+
+    assert cache.get(START, ends[1]) is None
+    assert cache.get(START, ends[0]) is not None
+    assert cache.get(START, ends[2]) is not None
+
+
+def test_expired_route_only_as_stale_fallback():
+    cache = RouteCache(None)
+    cache.put(START, END, _route(START, END))
+    _expire(cache, START, END)
+
+    assert cache.get(START, END) is None
+    assert cache.get(START, END, allow_stale=True) is not None
+    assert (cache.misses, cache.stale_hits) == (1, 1)
+
+
+def test_persistence_round_trip(tmp_path):
+    filename = str(tmp_path / "route_cache.json")
+    route = _route(START, (50.941, 6.932), END)
+    RouteCache(filename).put(START, END, route)
+
+    reloaded = RouteCache(filename)
+    assert np.array_equal(reloaded.get(START, END), route)
+
+
+def test_reload_keeps_size_limit_and_ignores_broken_file(tmp_path):
+    filename = str(tmp_path / "route_cache.json")
+    cache = RouteCache(filename, max_entries=3)
+    for i in range(3):
+        cache.put(START, (END[0] + i * 0.01, END[1]), _route(START, END))
+
+    assert len(RouteCache(filename, max_entries=2)._entries) == 2
+    (tmp_path / "route_cache.json").write_text("{kaputt", encoding="utf-8")
+    assert len(RouteCache(filename)._entries) == 0
+
+
+# === compute_route mit Cache und OrsClient gegen den ORS-Stub ===
+
+@pytest.fixture
+def planner(tmp_path, monkeypatch):
+    server, url = start_stub_server()
+    OrsStubHandler.request_count = 0
+    cache = RouteCache(str(tmp_path / "route_cache.json"))
+    monkeypatch.setattr(RoutePlanner, "_route_cache", cache)
+    monkeypatch.setattr(RoutePlanner, "_ors_client", OrsClient(url, "stub", retries=0, sleep=lambda s: None))
+    monkeypatch.setattr(RoutePlanner, "ORS_API_KEY", "stub")
+    yield cache
+    server.shutdown()
+    server.server_close()
+    OrsStubHandler.fail_next = 0
+
+
+def test_ride_start_route_is_cached(planner):
+    route = RoutePlanner.compute_route(START, END)
+    again = RoutePlanner.compute_route(START, END)
+
+    assert OrsStubHandler.request_count == 1
+    assert np.array_equal(route, again)
+    assert planner.hits == 1
+
+
+def test_refresh_route_is_not_cached(planner, tmp_path):
+    RoutePlanner.refresh_route(START, END)
+
+    assert planner.get(START, END) is None
+    assert not (tmp_path / "route_cache.json").exists()
+
+
+def test_offline_falls_back_to_expired_route(planner):
+    route = RoutePlanner.compute_route(START, END)
+    _expire(planner, START, END)
+    OrsStubHandler.fail_next = 10
+
+    assert np.array_equal(RoutePlanner.compute_route(START, END), route)
+    assert planner.stale_hits == 1
+
+
+def test_offline_without_cached_route_raises(planner):
+    OrsStubHandler.fail_next = 10
+    with pytest.raises(OrsError):
+        RoutePlanner.compute_route(START, END)
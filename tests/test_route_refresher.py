@@ -0,0 +1,61 @@
+# test_route_refresher.py
+import threading
+
+import numpy as np
+
+from RouteRefresher import RouteRefresher
+
+START = (50.94, 6.93)
+END = (50.95, 6.94)
+
+
+def _route(start, end) -> np.ndarray:
+    return np.array([start, end])
+
+
+def test_unpolled_result_counts_as_superseded():
+    refresher = RouteRefresher(route_provider=_route, prepare=len, background=False)
+    assert refresher.request(START, END)
+    # das fertige Ergebnis wird nie abgeholt, die nächste Anfrage überholt es
+    assert refresher.request(START, END)
+
+    route, prepared = refresher.poll()
+    assert prepared == 2
+    metrics = refresher.get_metrics()
+    assert (metrics["requested"], metrics["completed"], metrics["superseded"]) == (2, 1, 1)
+
+
+def test_invalidated_result_is_not_adopted():
+    refresher = RouteRefresher(route_provider=_route, prepare=len, background=False)
+    refresher.request(START, END)
+    refresher.invalidate()
+
+    assert refresher.poll() is None
+    assert refresher.get_metrics()["superseded"] == 1
+
+
+def test_request_while_running_is_dropped():
+    release = threading.Event()
+
+    def slow(start, end):
+        release.wait(5)
+        return _route(start, end)
+
+    refresher = RouteRefresher(route_provider=slow, prepare=len)
+    try:
+        assert refresher.request(START, END)
+        assert not refresher.request(START, END)
+        assert refresher.pending
+        release.set()
+        refresher._future.result(timeout=5)
+        assert refresher.poll() is not None
+        assert refresher.get_metrics()["dropped"] == 1
+    finally:
+        release.set()
+        refresher.shutdown()
+
+
+def test_provider_override_for_one_request():
+    refresher = RouteRefresher(route_provider=_route, prepare=len, background=False)
+    refresher.request(START, END, provider=lambda start, end: np.array([start, start, end]))
+    assert refresher.poll()[1] == 3
@@ -0,0 +1,69 @@
+# test_signal_estimator.py
+import random
+
+import pytest
+
+from SignalEstimator import SignalEstimator
+from TrafficLight import TrafficLight
+
+CYCLE = 90.0
+GREEN = 40.0
+PHASE = 1.7e9 + 13.0
+
+
+def _ride_events(estimator: SignalEstimator, light: TrafficLight, rides: int, seed: int = 1) -> None:
+    """
+    Eine Begegnung mit der Ampel je Fahrt, Fahrten Tage auseinander: bei Grün durchfahren, bei Rot halten
+    und mit etwas Streuung beim Grünbeginn anfahren.
+    """
+    rnd = random.Random(seed)
+    for ride in range(rides):
+        t = 1.7e9 + ride * 86400 + rnd.uniform(7 * 3600, 9 * 3600)
+        in_cycle = (t - PHASE) % CYCLE
+        if in_cycle < GREEN:
+            estimator.on_green(light, t)
+        else:
+            estimator.on_red(light, t)
+            estimator.on_green_start(light, t + CYCLE - in_cycle + rnd.gauss(0, 0.7), t)
+
+
+def test_learns_cycle_across_rides():
+    estimator = SignalEstimator(background=False)
+    light = TrafficLight("x/1", 0.0, 0.0)
+    _ride_events(estimator, light, rides=30)
+
+    estimate = estimator.get("x/1")
+    assert estimate.confidence >= estimator.min_confidence
+    assert estimate.cycle == pytest.approx(CYCLE, abs=0.11)
+    assert (estimate.anchor - PHASE + 1.0) % CYCLE < 2.0
+    # übernommen in Fahrtzeit der (hier zu Beginn der Epoche gestarteten) Fahrt
+    assert light.cycle_ms == pytest.approx(CYCLE * 1000, abs=110)
+    assert light.mock_initialized
+
+
+def test_few_starts_stay_unconfident():
+    estimator = SignalEstimator(background=False)
+    light = TrafficLight("x/1", 0.0, 0.0)
+    _ride_events(estimator, light, rides=3)
+
+    estimate = estimator.get("x/1")
+    assert estimate.confidence < estimator.min_confidence
+    assert not light.mock_initialized
+
+
+def test_background_fit_is_applied_on_poll_and_saved_on_close(tmp_path):
+    filename = str(tmp_path / "estimates.json")
+    estimator = SignalEstimator(filename)
+    light = TrafficLight("x/1", 0.0, 0.0)
+    _ride_events(estimator, light, rides=30)
+    # Ereignisse rechnen nicht selbst, der Stand kommt erst mit poll() bzw. close()
+    estimator.close()
+
+    estimate = estimator.get("x/1")
+    assert estimate.cycle == pytest.approx(CYCLE, abs=0.11)
+    assert estimate.confidence >= estimator.min_confidence
+    assert light.cycle_ms == pytest.approx(CYCLE * 1000, abs=110)
+
+    reloaded = SignalEstimator(filename, background=False).get("x/1")
+    assert reloaded.cycle == estimate.cycle
+    assert reloaded.starts == estimate.starts
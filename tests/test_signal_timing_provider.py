@@ -0,0 +1,146 @@
+# test_signal_timing_provider.py
+import json
+
+import pytest
+
+import SignalTimingProvider
+from SignalTimingProvider import HttpTimingProvider, SignalTiming, StaticTimingProvider, TimingCache, TimingProvider
+from TrafficLight import TrafficLight
+from timing_stub_server import TimingStubHandler, start_stub_server
+
+TABLE = {"lights": {
+    str(node): {"green_s": 20 + node % 10, "red_s": 40, "offset_s": node % 7} for node in range(100, 112)
+}}
+
+
+@pytest.fixture
+def table_file(tmp_path):
+    filename = tmp_path / "signal_timings.json"
+    filename.write_text(json.dumps(TABLE), encoding="utf-8")
+    return str(filename)
+
+
+@pytest.fixture
+def stub(table_file):
+    server, url = start_stub_server(table=table_file)
+    TimingStubHandler.request_count = 0
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.t = 1000.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(SignalTimingProvider.time, "monotonic", fake)
+    return fake
+
+
+class CountingProvider(TimingProvider):
+    def __init__(self) -> None:
+        self.calls = []
+
+    def fetch(self, light_ids):
+        self.calls.append(list(light_ids))
+        return {i: SignalTiming(30.0, 60.0, 5.0) for i in light_ids}
+
+
+def _lights(*nodes: int):
+    return [TrafficLight(f"venloer/{node}", 0.0, 0.0) for node in nodes]
+
+
+def test_http_provider_batches_and_matches_node_numbers(stub):
+    provider = HttpTimingProvider(stub, batch_size=5)
+    ids = [f"venloer/{node}" for node in range(100, 112)] + ["venloer/999"]
+    try:
+        timings = provider.fetch(ids)
+    finally:
+        provider.close()
+
+    # 13 IDs in Blöcken zu 5
+    assert TimingStubHandler.request_count == 3
+    assert provider.requests == 3 and provider.errors == 0
+    assert set(timings) == set(ids[:-1])
+    assert timings["venloer/103"] == SignalTiming(23.0, 40.0, 5.0)
+
+
+def test_http_provider_error_returns_empty(stub):
+    provider = HttpTimingProvider(stub.replace("/v1/timings", "/falsch"), timeout=1.0)
+    try:
+        assert provider.fetch(["venloer/100"]) == {}
+    finally:
+        provider.close()
+    assert provider.errors == 1
+
+
+def test_http_provider_unreachable_returns_empty(stub):
+    # Port ohne Server
+    provider = HttpTimingProvider("http://127.0.0.1:9/v1/timings", timeout=0.5)
+    try:
+        assert provider.fetch(["venloer/100"]) == {}
+    finally:
+        provider.close()
+    assert provider.errors == 1
+
+
+def test_static_provider_reads_table(table_file, tmp_path):
+    assert StaticTimingProvider(table_file).fetch(["node/101"])["node/101"].green_s == 21.0
+    assert StaticTimingProvider(str(tmp_path / "fehlt.json")).fetch(["node/101"]) == {}
+
+
+def test_cache_prefetches_only_missing_and_applies_from_memory(clock):
+    provider = CountingProvider()
+    cache = TimingCache(provider, ttl=300.0)
+    lights = _lights(1, 2, 3)
+
+    assert cache.prefetch(lights[:2]) == 2
+    assert cache.prefetch(lights) == 1
+    assert provider.calls == [["venloer/1", "venloer/2"], ["venloer/3"]]
+
+    assert cache.apply(lights[0], ride_start=0.0)
+    assert (lights[0].green_ms, lights[0].red_ms, lights[0].offset_ms) == (30000, 60000, 5000)
+    assert lights[0].mock_initialized
+    assert not cache.apply(TrafficLight("venloer/4", 0.0, 0.0), ride_start=0.0)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_entries_expire_after_ttl(clock):
+    provider = CountingProvider()
+    cache = TimingCache(provider, ttl=10.0)
+    lights = _lights(1)
+    cache.prefetch(lights)
+
+    clock.t += 9.0
+    assert cache.get("venloer/1") is not None
+    assert cache.prefetch(lights) == 0
+
+    clock.t += 2.0
+    assert cache.get("venloer/1") is None
+    assert cache.prefetch(lights) == 1
+    assert len(provider.calls) == 2
+
+
+def test_cache_evicts_least_recently_used(clock):
+    cache = TimingCache(CountingProvider(), max_entries=2)
+    cache.prefetch(_lights(1, 2))
+    # 1 zuletzt benutzt, also fliegt 2
+    assert cache.get("venloer/1") is not None
+    cache.prefetch(_lights(3))
+
+    assert cache.evicted == 1
+    assert cache.get("venloer/2") is None
+    assert cache.get("venloer/1") is not None
+    assert cache.get("venloer/3") is not None
+
+
+def test_timing_provider_is_abstract():
+    with pytest.raises(TypeError):
+        TimingProvider()
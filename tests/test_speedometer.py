@@ -0,0 +1,51 @@
+# test_speedometer.py
+import pytest
+
+from Speedometer import Speedometer
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.t = 100.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def _speedometer(clock: FakeClock) -> Speedometer:
+    return Speedometer(2.1, clock=clock, setup_gpio=False)
+
+
+def test_first_pulse_gives_no_speed_spike():
+    clock = FakeClock()
+    meter = _speedometer(clock)
+    meter._pulse_detected_callback(11)
+    clock.t += 0.02
+
+    assert meter.read_speed() == 0.0
+    # bis zum zweiten Impuls zählt nur GPS
+    assert meter.fuse(18.0) == 18.0
+
+
+def test_speed_from_pulses():
+    clock = FakeClock()
+    meter = _speedometer(clock)
+    for _ in range(5):
+        meter._pulse_detected_callback(11)
+        clock.t += 0.5
+    clock.t -= 0.5
+
+    # 2,1 m je 0,5 s
+    assert meter.read_speed() == pytest.approx(2.1 / 0.5 * 3.6)
+    assert meter.fuse(10.0) == pytest.approx(0.8 * 2.1 / 0.5 * 3.6 + 0.2 * 10.0)
+
+
+def test_speed_drops_to_zero_after_timeout():
+    clock = FakeClock()
+    meter = _speedometer(clock)
+    for _ in range(3):
+        meter._pulse_detected_callback(11)
+        clock.t += 0.5
+    clock.t += 3.0
+
+    assert meter.read_speed() == 0.0
@@ -0,0 +1,54 @@
+# test_tick_profiler.py
+import json
+import threading
+
+from TickProfiler import TickProfiler
+
+
+def _tick(profiler: TickProfiler) -> None:
+    profiler.start_tick()
+    profiler.mark("gps")
+    profiler.mark("advice")
+    profiler.end_tick()
+
+
+def test_end_tick_writes_profile_off_the_tick_thread(tmp_path, monkeypatch):
+    path = tmp_path / "profile.json"
+    profiler = TickProfiler(dump_file=str(path), dump_interval=0.0)
+    writers = []
+    original = profiler._write
+
+    def recording_write(filename, snapshot):
+        writers.append(threading.current_thread())
+        original(filename, snapshot)
+
+    monkeypatch.setattr(profiler, "_write", recording_write)
+    _tick(profiler)
+    profiler.close()
+
+    # der periodische Dump lief im Worker, nur der Endstand aus close() im aufrufenden Thread
+    assert writers[0] is not threading.current_thread()
+    assert writers[-1] is threading.current_thread()
+    summary = json.loads(path.read_text(encoding="utf-8"))
+    assert summary["tick"]["ticks"] == 1
+    assert set(summary) == {"tick", "gps", "advice"}
+
+
+def test_snapshot_is_independent_of_later_ticks(tmp_path):
+    profiler = TickProfiler(capacity=4)
+    _tick(profiler)
+    snapshot = profiler._snapshot()
+    for _ in range(8):
+        _tick(profiler)
+
+    # der Worker rechnet auf der Kopie, auch wenn der Ringpuffer inzwischen überschrieben ist
+    assert TickProfiler._summarize(*snapshot)["tick"]["count"] == 1
+    assert profiler.summary()["tick"]["count"] == 4
+
+
+def test_close_without_dump_file_writes_nothing(tmp_path):
+    profiler = TickProfiler()
+    _tick(profiler)
+    profiler.close()
+
+    assert list(tmp_path.iterdir()) == []